@@ -13,6 +13,7 @@ class Ajuda(commands.Cog):
                 "comandos": {
                     "🛠️ **Configuração:**": [
                         "`!configurarcanal`, `!setbdchannel` - Define canal de aniversários",
+                        "`!fusoaniversario <fuso> [hora]`, `!setbdtimezone` - Define fuso e hora do envio",
                         "`!testeaniversario`, `!testbd` - Testa mensagem de aniversário",
                         "`!statuscanal`, `!bdchannelinfo` - Mostra status do canal"
                     ],
@@ -23,7 +24,7 @@ class Ajuda(commands.Cog):
                     "🔍 **Consulta:**": [
                         "`!aniversariantes`, `!bds` - Lista todos os aniversários",
                         "`!meuaniversario`, `!mybd` - Mostra seu aniversário",
-                        "`!proximosaniversarios`, `!nextbds` - Próximos aniversários",
+                        "`!proximosaniversarios [dias] [página]`, `!nextbds` - Próximos aniversários",
                         "`!aniversariohoje`, `!bdtoday` - Aniversários de hoje"
                     ]
                 }
@@ -45,9 +46,10 @@ class Ajuda(commands.Cog):
                 "nome": "Sorteios",
                 "comandos": {
                     "🎲 **Gerenciar Sorteios:**": [
-                        "`!comecarsorteio <premio>` - Inicia um sorteio",
-                        "`!vencedor` - Sorteia um vencedor",
-                        "`!encerrarsorteio` - Encerra o sorteio atual",
+                        "`!comecarsorteio [duração] [Nv] [vipN] <premio>` - Inicia um sorteio (ex: `2h 3v vip2 Nitro`)",
+                        "`!sorteios` - Lista os sorteios em andamento",
+                        "`!vencedor [número]` - Encerra e sorteia os vencedores",
+                        "`!encerrarsorteio [número]` - Encerra sem sortear",
                         "`!canaldecomando #canal` - Define canal de comandos",
                         "`!canaldosorteio #canal` - Define canal do sorteio"
                     ]
@@ -63,6 +65,11 @@ class Ajuda(commands.Cog):
                         "`!adicionarxppornivel <valor>` - XP adicional por nível",
                         "`!tempodexp <normal> [vip]` - Tempo entre ganhos de XP",
                         "`!configxp` - Mostra configurações atuais"
+                    ],
+                    "📊 **Consulta:**": [
+                        "`!xp [@user]` - Mostra XP e level",
+                        "`!topxp [página]` - Ranking de XP",
+                        "`!rankxp [@user]`, `!meurank` - Sua posição no ranking"
                     ]
                 }
             },
@@ -123,6 +130,9 @@ class Ajuda(commands.Cog):
                 "comandos": {
                     "💵 **Básico:**": [
                         "`!saldo`, `!bal` - Ver saldo",
+                        "`!extrato [@user]` - Últimas movimentações",
+                        "`!ricos [página]` - Ranking dos mais ricos",
+                        "`!ricosservidor [página]` - Ranking do servidor",
                         "`!diario`, `!daily` - Bônus diário",
                         "`!inventario`, `!inv` - Ver inventário",
                         "`!depositar <valor>`, `!dep <valor>` - Depositar no banco",
@@ -137,7 +147,10 @@ class Ajuda(commands.Cog):
                     "🛒 **Loja:**": [
                         "`!loja`, `!shop` - Ver loja",
                         "`!comprar <item>`, `!buy <item>` - Comprar item",
-                        "`!vender <item>`, `!sell <item>` - Vender item"
+                        "`!vender <item>`, `!sell <item>` - Vender item",
+                        "`!adicionaritem <item> <preço> <descrição>` - Adicionar item (admin)",
+                        "`!removeritem <item>` - Remover item (admin)",
+                        "`!precoitem <item> <preço>` - Alterar preço (admin)"
                     ],
                     "🎰 **Riscos:**": [
                         "`!crime` - Cometer crime",
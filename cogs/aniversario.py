@@ -1,12 +1,58 @@
 import discord
-from discord.ext import commands, tasks
-import os
-from datetime import datetime, timedelta
+from discord.ext import commands
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import asyncio
 import calendar
-from motor.motor_asyncio import AsyncIOMotorClient
+import heapq
 import random
 
+# Calendário fixo de 366 dias: 29/02 é o dia 60 e 01/03 é sempre o 61
+CALENDAR_YEAR = 2024
+PAGE_SIZE = 15
+DEFAULT_TIMEZONE = 'America/Sao_Paulo'
+DEFAULT_HOUR = 9
+# Espera antes de tentar de novo um envio que falhou
+RETRY_DELAY = timedelta(minutes=1)
+SEND_RETRY_DELAY = timedelta(minutes=10)
+
+
+def day_of_year(day, month):
+    """Ordinal (1-366) da data no calendário fixo de ano bissexto"""
+    return date(CALENDAR_YEAR, month, day).timetuple().tm_yday
+
+
+def celebration_date(day, month, year):
+    """Data em que o aniversário é comemorado no ano: 29/02 vira 28/02 fora de ano bissexto"""
+    if month == 2 and day == 29 and not calendar.isleap(year):
+        day = 28
+    return date(year, month, day)
+
+
+def calendar_doy(when):
+    """Ordinal de um dia real; em ano comum 28/02 também cobre os nascidos em 29/02"""
+    doy = day_of_year(when.day, when.month)
+    if when.month == 2 and when.day == 28 and not calendar.isleap(when.year):
+        doy += 1
+    return doy
+
+
+def doy_ranges(today, days):
+    """Faixas de doy (inclusivas) dos próximos days dias, quebradas na virada do ano"""
+    end = today + timedelta(days=days)
+    start_doy = day_of_year(today.day, today.month)
+    if end >= celebration_date(today.day, today.month, today.year + 1):
+        # Ano inteiro: continua começando por hoje
+        if start_doy == 1:
+            return [(1, 366)]
+        return [(start_doy, 366), (1, start_doy - 1)]
+    
+    end_doy = calendar_doy(end)
+    if end.year == today.year:
+        return [(start_doy, end_doy)]
+    return [(start_doy, 366), (1, end_doy)]
+
+
 class Aniversario(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -15,32 +61,53 @@ class Aniversario(commands.Cog):
         self.collection = None
         self.config_collection = None
         self._connection_ready = False
+        # Próximo envio de cada servidor (guild_id -> instante UTC) e a heap que o agendador consome
+        self.next_delivery = {}
+        self.delivery_heap = []
+        self._delivery_wakeup = asyncio.Event()
+        self.scheduler_task = None
         # Inicializa a conexão com MongoDB
         self.bot.loop.create_task(self.init_database())
-        # Inicia a task de verificação de aniversários
-        self.check_birthdays.start()
 
     async def init_database(self):
         """Inicializa a conexão com MongoDB"""
         try:
-            # URL de conexão do MongoDB (vem de variável de ambiente)
-            mongo_uri = os.getenv("MONGO_URI")
-            
-            if not mongo_uri:
+            # Cliente compartilhado do bot (configurado via variáveis de ambiente)
+            if not self.bot.mongo.is_configured:
                 print("❌ MONGO_URI não encontrada nas variáveis de ambiente!")
                 return
             
             print("🔄 Conectando ao MongoDB (Aniversários)...")
-            self.client = AsyncIOMotorClient(mongo_uri)
+            self.client = self.bot.mongo.client
             
             # Testa a conexão
-            await self.client.admin.command('ping')
+            await self.bot.mongo.ping()
             
-            self.db = self.client['discord_bot']
+            self.db = self.bot.mongo.get_database('discord_bot')
             self.collection = self.db['aniversarios']
             self.config_collection = self.db['birthday_config']
             self._connection_ready = True
             
+            # (month, day, guild_id): aniversariantes do dia de todos os servidores numa consulta
+            await self.collection.create_index([('month', 1), ('day', 1), ('guild_id', 1)])
+            await self.collection.create_index([('guild_id', 1), ('month', 1), ('day', 1)])
+            await self.collection.create_index([('user_id', 1), ('guild_id', 1)])
+            await self.collection.create_index([('guild_id', 1), ('doy', 1), ('user_id', 1)])
+            
+            # Aniversários antigos ganham o doy calculado no próprio servidor
+            await self.collection.update_many(
+                {'doy': {'$exists': False}},
+                [{'$set': {'doy': {'$dayOfYear': {
+                    '$dateFromParts': {'year': CALENDAR_YEAR, 'month': '$month', 'day': '$day'}
+                }}}}]
+            )
+            await self.config_collection.create_index('guild_id')
+            
+            # Agenda os envios de todos os servidores com canal configurado
+            await self.load_delivery_schedule()
+            if self.scheduler_task is None or self.scheduler_task.done():
+                self.scheduler_task = asyncio.create_task(self.birthday_scheduler())
+            
             print("✅ Conectado ao MongoDB (Aniversários) com sucesso!")
             
         except Exception as e:
@@ -49,6 +116,9 @@ class Aniversario(commands.Cog):
 
     async def ensure_connection(self):
         """Garante que a conexão com MongoDB está ativa"""
+        # Falha rápido enquanto o circuito do MongoDB estiver aberto
+        if not await self.bot.mongo.available():
+            return False
         if not self._connection_ready:
             await self.init_database()
         return self._connection_ready
@@ -86,6 +156,7 @@ class Aniversario(commands.Cog):
                         'date': date,
                         'day': day,
                         'month': month,
+                        'doy': day_of_year(day, month),
                         'updated_at': datetime.utcnow()
                     }
                 },
@@ -107,16 +178,36 @@ class Aniversario(commands.Cog):
             return None
 
     async def get_all_birthdays(self, guild_id):
-        """Busca todos os aniversários do servidor no MongoDB"""
+        """Busca todos os aniversários do servidor no MongoDB, em ordem de mês e dia"""
         try:
             if not await self.ensure_connection():
                 return []
-            cursor = self.collection.find({'guild_id': guild_id})
+            cursor = self.collection.find({'guild_id': guild_id}).sort([('month', 1), ('day', 1)])
             return await cursor.to_list(length=None)
         except Exception as e:
             print(f"❌ Erro ao buscar aniversários: {e}")
             return []
 
+    async def get_birthdays_on(self, when, guild_ids=None):
+        """Aniversariantes de um dia, agrupados por servidor (uma consulta para todos)"""
+        try:
+            if not await self.ensure_connection():
+                return {}
+            days = [when.day]
+            if when.month == 2 and when.day == 28 and not calendar.isleap(when.year):
+                days.append(29)  # Em ano comum os nascidos em 29/02 comemoram em 28/02
+            query = {'month': when.month, 'day': {'$in': days}}
+            if guild_ids is not None:
+                query['guild_id'] = {'$in': list(guild_ids)}
+            
+            by_guild = {}
+            async for data in self.collection.find(query, {'_id': 0, 'user_id': 1, 'guild_id': 1, 'name': 1}):
+                by_guild.setdefault(data['guild_id'], []).append(data)
+            return by_guild
+        except Exception as e:
+            print(f"❌ Erro ao buscar aniversariantes do dia: {e}")
+            return {}
+
     async def delete_birthday(self, user_id, guild_id):
         """Remove aniversário do MongoDB"""
         try:
@@ -133,12 +224,33 @@ class Aniversario(commands.Cog):
         try:
             if not await self.ensure_connection():
                 return None
-            config = await self.config_collection.find_one({'guild_id': guild_id})
+            config = await self.bot.mongo.config_cache.get_or_load(
+                self.config_collection, guild_id,
+                lambda: self.config_collection.find_one({'guild_id': guild_id})
+            )
             return config.get('channel_id') if config else None
         except Exception as e:
             print(f"❌ Erro ao buscar canal de aniversários: {e}")
             return None
 
+    async def get_birthday_configs(self, guild_ids):
+        """Configurações de vários servidores: usa o cache e busca o resto numa consulta"""
+        cache = self.bot.mongo.config_cache
+        configs = {}
+        missing = []
+        for guild_id in guild_ids:
+            config = cache.peek(self.config_collection, guild_id)
+            if config is None:
+                missing.append(guild_id)
+            else:
+                configs[guild_id] = config
+        
+        if missing:
+            async for config in self.config_collection.find({'guild_id': {'$in': missing}}):
+                cache.set(self.config_collection, config['guild_id'], config)
+                configs[config['guild_id']] = config
+        return configs
+
     async def set_birthday_channel(self, guild_id, channel_id):
         """Define o canal para envio de mensagens de aniversário"""
         try:
@@ -155,11 +267,92 @@ class Aniversario(commands.Cog):
                 },
                 upsert=True
             )
+            self.bot.mongo.config_cache.invalidate(self.config_collection, guild_id)
+            await self.reschedule_guild(guild_id)
             return True
         except Exception as e:
             print(f"❌ Erro ao salvar canal de aniversários: {e}")
             return False
 
+    async def set_birthday_schedule(self, guild_id, tz_name, hour):
+        """Define o fuso horário e a hora local de envio do servidor"""
+        try:
+            if not await self.ensure_connection():
+                return False
+            await self.config_collection.update_one(
+                {'guild_id': guild_id},
+                {
+                    '$set': {
+                        'guild_id': guild_id,
+                        'timezone': tz_name,
+                        'hour': hour,
+                        'updated_at': datetime.utcnow()
+                    }
+                },
+                upsert=True
+            )
+            self.bot.mongo.config_cache.invalidate(self.config_collection, guild_id)
+            await self.reschedule_guild(guild_id)
+            return True
+        except Exception as e:
+            print(f"❌ Erro ao salvar fuso de aniversários: {e}")
+            return False
+
+    @staticmethod
+    def guild_timezone(config):
+        """Fuso do servidor (padrão: horário de Brasília)"""
+        try:
+            return ZoneInfo((config or {}).get('timezone') or DEFAULT_TIMEZONE)
+        except (ZoneInfoNotFoundError, ValueError):
+            return ZoneInfo(DEFAULT_TIMEZONE)
+
+    def compute_next_delivery(self, config, now=None):
+        """Próximo instante UTC de envio e a data local a que ele se refere
+
+        Se a hora de hoje já passou e o dia ainda não foi entregue (ex.: o bot
+        reiniciou às 10:00), o envio é imediato em vez de pular o dia.
+        """
+        tz = self.guild_timezone(config)
+        hour = (config or {}).get('hour', DEFAULT_HOUR)
+        local_now = (now or datetime.now(timezone.utc)).astimezone(tz)
+        today = local_now.date()
+        
+        if (config or {}).get('last_delivered', '') >= today.isoformat():
+            target_day = today + timedelta(days=1)
+        else:
+            target_day = today
+        fire_at = datetime.combine(target_day, time(hour), tzinfo=tz).astimezone(timezone.utc)
+        return max(fire_at, local_now.astimezone(timezone.utc)), target_day
+
+    def schedule_delivery(self, guild_id, fire_at):
+        """Agenda o próximo envio do servidor (entradas antigas na heap são ignoradas)"""
+        timestamp = fire_at.timestamp()
+        self.next_delivery[guild_id] = timestamp
+        heapq.heappush(self.delivery_heap, (timestamp, guild_id))
+        # Acorda o agendador se esse envio for o próximo
+        if self.delivery_heap[0][0] == timestamp:
+            self._delivery_wakeup.set()
+
+    async def load_delivery_schedule(self):
+        """Calcula o próximo envio de todos os servidores com canal configurado"""
+        self.next_delivery = {}
+        self.delivery_heap = []
+        cache = self.bot.mongo.config_cache
+        async for config in self.config_collection.find({'channel_id': {'$exists': True}}):
+            cache.set(self.config_collection, config['guild_id'], config)
+            fire_at, _ = self.compute_next_delivery(config)
+            self.schedule_delivery(config['guild_id'], fire_at)
+        print(f"⏰ Envios de aniversário agendados para {len(self.next_delivery)} servidor(es)")
+
+    async def reschedule_guild(self, guild_id):
+        """Recalcula o envio de um servidor depois de mudar a configuração"""
+        config = await self.config_collection.find_one({'guild_id': guild_id})
+        if not config or not config.get('channel_id'):
+            self.next_delivery.pop(guild_id, None)
+            return
+        fire_at, _ = self.compute_next_delivery(config)
+        self.schedule_delivery(guild_id, fire_at)
+
     def get_birthday_messages(self):
         """Retorna mensagens aleatórias de parabéns"""
         messages = [
@@ -176,76 +369,233 @@ class Aniversario(commands.Cog):
         ]
         return random.choice(messages)
 
-    @tasks.loop(hours=24)
-    async def check_birthdays(self):
-        """Task que verifica aniversários diariamente"""
+    def build_birthday_embeds(self, members):
+        """Um embed com todos os aniversariantes do canal (dividido só se passar do limite)"""
+        embeds = []
+        lines = []
+        size = 0
+        for member in members:
+            line = self.get_birthday_messages().format(nome=member.mention)
+            # Limite de 4096 caracteres por descrição de embed
+            if lines and size + len(line) + 2 > 4000:
+                embeds.append(lines)
+                lines, size = [], 0
+            lines.append(line)
+            size += len(line) + 2
+        if lines:
+            embeds.append(lines)
+        
+        result = []
+        for chunk in embeds:
+            embed = discord.Embed(
+                title="🎉 FELIZ ANIVERSÁRIO! 🎉",
+                description="\n\n".join(chunk),
+                color=0xFF69B4
+            )
+            if len(members) == 1:
+                embed.set_thumbnail(url=members[0].display_avatar.url)
+                embed.set_footer(text=f"🎂 Aniversário de {members[0].display_name}")
+            else:
+                embed.set_footer(text=f"🎂 {len(members)} aniversariantes hoje")
+            result.append(embed)
+        return result
+
+    async def deliver_birthdays(self, when, guilds):
+        """Envia os parabéns do dia para os servidores informados
+
+        Retorna (parabenizados, ids dos servidores em que o envio falhou).
+        """
+        guilds = {str(guild.id): guild for guild in guilds}
+        birthdays = await self.get_birthdays_on(when, guilds.keys())
+        if not birthdays:
+            return 0, set()
+        configs = await self.get_birthday_configs(list(birthdays))
+        
+        # Agrupa por canal: um envio por canal com todos os aniversariantes
+        per_channel = {}
+        for guild_id, entries in birthdays.items():
+            channel_id = configs.get(guild_id, {}).get('channel_id')
+            guild = guilds[guild_id]
+            channel = guild.get_channel(int(channel_id)) if channel_id else None
+            if not channel:
+                continue
+            members = [guild.get_member(int(data['user_id'])) for data in entries]
+            members = [member for member in members if member]
+            if members:
+                per_channel.setdefault(channel, []).extend(members)
+        
+        sent = 0
+        failed = set()
+        for channel, members in per_channel.items():
+            embeds = self.build_birthday_embeds(members)
+            try:
+                # Até 10 embeds por mensagem
+                for start in range(0, len(embeds), 10):
+                    await channel.send(embeds=embeds[start:start + 10])
+                sent += len(members)
+                print(f"🎂 {len(members)} aniversariante(s) parabenizado(s) em {channel.guild.name}")
+            except Exception as e:
+                failed.add(str(channel.guild.id))
+                print(f"❌ Erro ao enviar mensagem de aniversário em {channel.guild.name}: {e}")
+        return sent, failed
+
+    async def birthday_scheduler(self):
+        """Dorme até o próximo envio da heap e entrega todos os servidores que vencem juntos
+
+        Servidores com o mesmo fuso e hora vencem no mesmo instante e saem da
+        heap no mesmo despertar: uma consulta de aniversariantes para todos.
+        """
+        await self.bot.wait_until_ready()
+        while True:
+            self._delivery_wakeup.clear()
+            
+            now = datetime.now(timezone.utc).timestamp()
+            if self.delivery_heap:
+                # Limite de 1h para corrigir eventuais ajustes de relógio
+                delay = min(self.delivery_heap[0][0] - now, 3600)
+            else:
+                delay = None
+            
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._delivery_wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            due = []
+            while self.delivery_heap and self.delivery_heap[0][0] <= now:
+                timestamp, guild_id = heapq.heappop(self.delivery_heap)
+                # Entrada obsoleta: configuração mudou depois de agendada
+                if self.next_delivery.get(guild_id) == timestamp:
+                    del self.next_delivery[guild_id]
+                    due.append(guild_id)
+            
+            if due:
+                try:
+                    await self.deliver_due(due)
+                except Exception as e:
+                    print(f"❌ Erro na entrega de aniversários: {e}")
+
+    async def claim_delivery(self, guild_id, local_day):
+        """Marca o dia como entregue; False se outro processo/execução já entregou"""
+        result = await self.config_collection.update_one(
+            {'guild_id': guild_id, 'last_delivered': {'$not': {'$gte': local_day.isoformat()}}},
+            {'$set': {'last_delivered': local_day.isoformat()}}
+        )
+        return result.modified_count > 0
+
+    async def release_delivery(self, guild_id, local_day, previous):
+        """Desfaz claim_delivery quando o envio falhou, para o dia poder ser entregue de novo"""
+        update = {'$set': {'last_delivered': previous}} if previous else {'$unset': {'last_delivered': ""}}
+        await self.config_collection.update_one(
+            {'guild_id': guild_id, 'last_delivered': local_day.isoformat()}, update
+        )
+
+    async def deliver_due(self, guild_ids):
+        """Entrega os parabéns dos servidores vencidos, agrupados por data local
+
+        Todo servidor recebido é reagendado: se algo falhar no meio, quem
+        ainda não foi reagendado tenta de novo em RETRY_DELAY, e os dias
+        reclamados que não chegaram a ser entregues são devolvidos.
+        """
+        pending = set(guild_ids)
+        # guild_id -> (dia reclamado, last_delivered anterior) ainda sem entrega
+        claimed = {}
         try:
-            hoje = datetime.now()
-            print(f"🔍 Verificando aniversários para {hoje.strftime('%d/%m/%Y')}...")
+            if not await self.ensure_connection():
+                # Banco fora: tenta de novo em 1 minuto
+                return
             
-            # Busca todos os servidores que o bot está
-            for guild in self.bot.guilds:
-                guild_id = str(guild.id)
-                
-                # Busca canal configurado para aniversários
-                channel_id = await self.get_birthday_channel(guild_id)
-                if not channel_id:
+            configs = {}
+            async for config in self.config_collection.find({'guild_id': {'$in': guild_ids}}):
+                configs[config['guild_id']] = config
+            
+            now = datetime.now(timezone.utc)
+            by_day = {}
+            local_days = {}
+            for guild_id, config in configs.items():
+                fire_at, local_day = self.compute_next_delivery(config, now)
+                if fire_at > now:
+                    # O dia de hoje já foi entregue (ex.: repetição após erro): só reagenda
+                    pending.discard(guild_id)
+                    self.schedule_delivery(guild_id, fire_at)
                     continue
-                
-                channel = guild.get_channel(int(channel_id))
-                if not channel:
+                local_days[guild_id] = local_day
+                guild = self.bot.get_guild(int(guild_id))
+                # Reclama o dia antes de enviar: um reinício no meio nunca envia duas vezes
+                if guild and config.get('channel_id') and await self.claim_delivery(guild_id, local_day):
+                    claimed[guild_id] = (local_day, config.get('last_delivered'))
+                    by_day.setdefault(local_day, []).append(guild)
+            
+            failed = set()
+            for local_day, guilds in by_day.items():
+                print(f"🔍 Verificando aniversários de {local_day.strftime('%d/%m/%Y')} em {len(guilds)} servidor(es)...")
+                try:
+                    _, day_failed = await self.deliver_birthdays(local_day, guilds)
+                except Exception as e:
+                    print(f"❌ Erro ao entregar aniversários de {local_day.strftime('%d/%m/%Y')}: {e}")
+                    day_failed = {str(guild.id) for guild in guilds}
+                for guild in guilds:
+                    if str(guild.id) not in day_failed:
+                        del claimed[str(guild.id)]
+                # Envio falhou: devolve o dia para ser tentado de novo em vez de pulá-lo
+                for guild_id in day_failed:
+                    await self.release_delivery(guild_id, *claimed[guild_id])
+                    del claimed[guild_id]
+                failed |= day_failed
+            
+            # Agenda o dia seguinte de cada servidor, mesmo os que não puderam receber hoje
+            for guild_id in guild_ids:
+                self.bot.mongo.config_cache.invalidate(self.config_collection, guild_id)
+                if guild_id in failed or guild_id not in pending:
                     continue
-                
-                # Busca aniversariantes de hoje
-                birthdays = await self.get_all_birthdays(guild_id)
-                aniversariantes_hoje = []
-                
-                for data in birthdays:
-                    if data['day'] == hoje.day and data['month'] == hoje.month:
-                        member = guild.get_member(int(data['user_id']))
-                        if member:
-                            aniversariantes_hoje.append(member)
-                
-                # Envia mensagens para cada aniversariante
-                for member in aniversariantes_hoje:
-                    try:
-                        message = self.get_birthday_messages().format(nome=member.mention)
-                        
-                        embed = discord.Embed(
-                            title="🎉 FELIZ ANIVERSÁRIO! 🎉",
-                            description=message,
-                            color=0xFF69B4
-                        )
-                        embed.set_thumbnail(url=member.display_avatar.url)
-                        embed.set_footer(text=f"🎂 Aniversário de {member.display_name}")
-                        
-                        await channel.send(embed=embed)
-                        print(f"🎂 Mensagem de aniversário enviada para {member.display_name} em {guild.name}")
-                        
-                        # Pequena pausa entre mensagens
-                        await asyncio.sleep(1)
-                        
-                    except Exception as e:
-                        print(f"❌ Erro ao enviar mensagem de aniversário para {member.display_name}: {e}")
-                
-        except Exception as e:
-            print(f"❌ Erro na verificação de aniversários: {e}")
+                pending.discard(guild_id)
+                config = configs.get(guild_id)
+                if not config or not config.get('channel_id'):
+                    continue
+                next_day = local_days[guild_id] + timedelta(days=1)
+                fire_at = datetime.combine(next_day, time(config.get('hour', DEFAULT_HOUR)), tzinfo=self.guild_timezone(config))
+                self.schedule_delivery(guild_id, fire_at.astimezone(timezone.utc))
+            
+            retry = datetime.now(timezone.utc) + SEND_RETRY_DELAY
+            for guild_id in failed:
+                pending.discard(guild_id)
+                self.schedule_delivery(guild_id, retry)
+        finally:
+            # Erro no meio: os dias reclamados e não entregues voltam a ficar livres
+            for guild_id, (local_day, previous) in claimed.items():
+                try:
+                    await self.release_delivery(guild_id, local_day, previous)
+                except Exception as e:
+                    print(f"❌ Erro ao liberar o envio de aniversários de {guild_id}: {e}")
+            retry = datetime.now(timezone.utc) + RETRY_DELAY
+            for guild_id in pending:
+                self.schedule_delivery(guild_id, retry)
 
-    @check_birthdays.before_loop
-    async def before_check_birthdays(self):
-        """Aguarda o bot estar pronto antes de iniciar a task"""
-        await self.bot.wait_until_ready()
-        
-        # Calcula quando executar pela primeira vez (próximas 9:00)
-        now = datetime.now()
-        target_time = now.replace(hour=9, minute=0, second=0, microsecond=0)
-        
-        if now >= target_time:
-            target_time += timedelta(days=1)
-        
-        wait_seconds = (target_time - now).total_seconds()
-        print(f"⏰ Próxima verificação de aniversários: {target_time.strftime('%d/%m/%Y às %H:%M')}")
-        await asyncio.sleep(wait_seconds)
+    async def local_today(self, guild_id):
+        """Data de hoje no fuso configurado do servidor"""
+        config = self.bot.mongo.config_cache.peek(self.config_collection, guild_id)
+        if config is None and await self.ensure_connection():
+            try:
+                config = await self.bot.mongo.config_cache.get_or_load(
+                    self.config_collection, guild_id,
+                    lambda: self.config_collection.find_one({'guild_id': guild_id})
+                )
+            except Exception as e:
+                print(f"❌ Erro ao buscar fuso de aniversários: {e}")
+        return datetime.now(self.guild_timezone(config)).date()
+
+    def describe_schedule(self, guild_id, config):
+        """Texto com fuso, hora e próximo envio do servidor"""
+        tz = self.guild_timezone(config)
+        hour = (config or {}).get('hour', DEFAULT_HOUR)
+        text = f"• Envio diário às {hour:02d}:00 ({tz.key})"
+        timestamp = self.next_delivery.get(guild_id)
+        if timestamp:
+            proximo = datetime.fromtimestamp(timestamp, tz)
+            text += f"\n• Próximo envio: {proximo.strftime('%d/%m/%Y às %H:%M')}"
+        return text
 
     @commands.command(name='configurarcanal', aliases=['setbdchannel'])
     @commands.has_permissions(administrator=True)
@@ -260,13 +610,16 @@ class Aniversario(commands.Cog):
         success = await self.set_birthday_channel(guild_id, channel_id)
         
         if success:
+            config = await self.config_collection.find_one({'guild_id': guild_id})
+            hour = (config or {}).get('hour', DEFAULT_HOUR)
             embed = discord.Embed(
                 title="✅ Canal Configurado",
                 description=f"Canal {channel.mention} configurado para receber mensagens automáticas de aniversário!\n\n"
                            f"🤖 **Como funciona:**\n"
-                           f"• O bot verifica aniversários diariamente às 9:00\n"
+                           f"• O bot verifica aniversários diariamente às {hour:02d}:00 ({self.guild_timezone(config).key})\n"
                            f"• Mensagens automáticas serão enviadas neste canal\n"
-                           f"• Cada aniversariante receberá uma mensagem personalizada",
+                           f"• Cada aniversariante receberá uma mensagem personalizada\n"
+                           f"• Use `!fusoaniversario <fuso> [hora]` para mudar o horário",
                 color=0x00ff7f
             )
             embed.set_footer(text=f"Configurado por {ctx.author.display_name}")
@@ -279,6 +632,50 @@ class Aniversario(commands.Cog):
         
         await ctx.send(embed=embed)
 
+    @commands.command(name='fusoaniversario', aliases=['setbdtimezone'])
+    @commands.has_permissions(administrator=True)
+    async def fuso_aniversario(self, ctx, fuso: str, hora: int = DEFAULT_HOUR):
+        """Define o fuso horário (ex: America/Sao_Paulo) e a hora local das mensagens"""
+        try:
+            ZoneInfo(fuso)
+            valido = 0 <= hora <= 23
+        except (ZoneInfoNotFoundError, ValueError):
+            valido = False
+        
+        if not valido:
+            embed = discord.Embed(
+                title="❌ Fuso ou Hora Inválidos",
+                description="Use um fuso IANA e uma hora entre 0 e 23.\n\n**Exemplos:**\n"
+                           "• `!fusoaniversario America/Sao_Paulo 9`\n"
+                           "• `!fusoaniversario America/Manaus 8`\n"
+                           "• `!fusoaniversario Europe/Lisbon 10`",
+                color=0xff4444
+            )
+            await ctx.send(embed=embed)
+            return
+        
+        guild_id = str(ctx.guild.id)
+        success = await self.set_birthday_schedule(guild_id, fuso, hora)
+        
+        if success:
+            config = await self.config_collection.find_one({'guild_id': guild_id})
+            embed = discord.Embed(
+                title="✅ Horário Configurado",
+                description=f"🤖 **Mensagens de aniversário:**\n{self.describe_schedule(guild_id, config)}",
+                color=0x00ff7f
+            )
+            if not config.get('channel_id'):
+                embed.add_field(name="⚠️ Atenção", value="Configure também o canal com `!configurarcanal #canal`", inline=False)
+            embed.set_footer(text=f"Configurado por {ctx.author.display_name}")
+        else:
+            embed = discord.Embed(
+                title="❌ Erro de Configuração",
+                description="Não foi possível salvar a configuração. Verifique a conexão com o banco de dados.",
+                color=0xff4444
+            )
+        
+        await ctx.send(embed=embed)
+
     @commands.command(name='testeaniversario', aliases=['testbd'])
     @commands.has_permissions(administrator=True)
     async def teste_aniversario(self, ctx):
@@ -343,13 +740,13 @@ class Aniversario(commands.Cog):
         else:
             channel = ctx.guild.get_channel(int(channel_id))
             if channel:
+                config = self.bot.mongo.config_cache.peek(self.config_collection, guild_id)
                 embed = discord.Embed(
                     title="📋 Status do Canal de Aniversários",
                     description=f"✅ **Canal configurado:** {channel.mention}\n\n"
                                f"🤖 **Funcionamento:**\n"
-                               f"• Verificação diária às 9:00\n"
                                f"• Mensagens automáticas para aniversariantes\n"
-                               f"• Próxima verificação: {self.check_birthdays.next_iteration.strftime('%d/%m/%Y às %H:%M') if self.check_birthdays.next_iteration else 'Carregando...'}",
+                               f"{self.describe_schedule(guild_id, config)}",
                     color=0x00ff7f
                 )
             else:
@@ -436,15 +833,9 @@ class Aniversario(commands.Cog):
             await ctx.send(embed=embed)
             return
         
-        # Ordena por mês e dia
-        sorted_birthdays = sorted(
-            birthdays,
-            key=lambda x: (x['month'], x['day'])
-        )
-        
-        # Agrupa por mês
+        # Já vem ordenado por mês e dia pelo índice (guild_id, month, day)
         months = {}
-        for data in sorted_birthdays:
+        for data in birthdays:
             member = ctx.guild.get_member(int(data['user_id']))
             if member:  # Só mostra se o membro ainda está no servidor
                 month_name = calendar.month_name[data['month']]
@@ -486,23 +877,14 @@ class Aniversario(commands.Cog):
             data = birthday['date']
             
             # Calcula próximo aniversário
-            hoje = datetime.now()
-            try:
-                proximo = datetime(hoje.year, birthday['month'], birthday['day'])
-                if proximo < hoje:
-                    proximo = datetime(hoje.year + 1, birthday['month'], birthday['day'])
-                
-                dias_restantes = (proximo - hoje).days
-                
-                if dias_restantes == 0:
-                    status = "🎉 **HOJE É SEU ANIVERSÁRIO!** 🎉"
-                elif dias_restantes == 1:
-                    status = "🎂 Seu aniversário é **amanhã**!"
-                else:
-                    status = f"🗓️ Faltam **{dias_restantes} dias** para seu aniversário"
-                
-            except ValueError:
-                status = "📅 Aniversário cadastrado"
+            dias_restantes = self.days_until(birthday, await self.local_today(guild_id))
+            
+            if dias_restantes == 0:
+                status = "🎉 **HOJE É SEU ANIVERSÁRIO!** 🎉"
+            elif dias_restantes == 1:
+                status = "🎂 Seu aniversário é **amanhã**!"
+            else:
+                status = f"🗓️ Faltam **{dias_restantes} dias** para seu aniversário"
             
             embed = discord.Embed(
                 title="🎂 Seu Aniversário",
@@ -552,8 +934,40 @@ class Aniversario(commands.Cog):
         
         await ctx.send(embed=embed)
 
+    def days_until(self, data, today):
+        """Dias até a próxima comemoração (0 = hoje)"""
+        proximo = celebration_date(data['day'], data['month'], today.year)
+        if proximo < today:
+            proximo = celebration_date(data['day'], data['month'], today.year + 1)
+        return (proximo - today).days
+
+    async def get_upcoming_birthdays(self, guild_id, today, dias, pagina):
+        """Página dos próximos aniversários em ordem de data e o total na janela
+
+        Usa consultas por faixa de doy no índice (guild_id, doy, user_id); quando
+        a janela passa da virada do ano são duas faixas, lidas em sequência.
+        user_id desempata quem faz aniversário no mesmo dia e mantém as
+        páginas estáveis.
+        """
+        offset = (pagina - 1) * PAGE_SIZE
+        rows = []
+        total = 0
+        for low, high in doy_ranges(today, dias):
+            query = {'guild_id': guild_id, 'doy': {'$gte': low, '$lte': high}}
+            count = await self.collection.count_documents(query)
+            total += count
+            if offset >= count:
+                offset -= count
+                continue
+            limit = PAGE_SIZE - len(rows)
+            if limit > 0:
+                cursor = self.collection.find(query).sort([('doy', 1), ('user_id', 1)]).skip(offset).limit(limit)
+                rows += await cursor.to_list(length=limit)
+            offset = 0
+        return rows, total
+
     @commands.command(name='proximosaniversarios', aliases=['nextbds'])
-    async def proximos_aniversarios(self, ctx, dias: int = 30):
+    async def proximos_aniversarios(self, ctx, dias: int = 30, pagina: int = 1):
         """Mostra os próximos aniversários (padrão: próximos 30 dias)"""
         if dias < 1 or dias > 365:
             embed = discord.Embed(
@@ -563,80 +977,69 @@ class Aniversario(commands.Cog):
             )
             await ctx.send(embed=embed)
             return
+        pagina = max(pagina, 1)
         
-        guild_id = str(ctx.guild.id)
-        birthdays = await self.get_all_birthdays(guild_id)
-        
-        if not birthdays:
+        if not await self.ensure_connection():
             embed = discord.Embed(
-                title="📅 Próximos Aniversários",
-                description="Nenhum aniversário cadastrado neste servidor.",
-                color=0xffaa00
+                title="❌ Erro de Conexão",
+                description="Não foi possível acessar o banco de dados.",
+                color=0xff4444
             )
             await ctx.send(embed=embed)
             return
         
-        hoje = datetime.now()
-        proximos = []
+        guild_id = str(ctx.guild.id)
+        hoje = await self.local_today(guild_id)
+        try:
+            birthdays, total = await self.get_upcoming_birthdays(guild_id, hoje, dias, pagina)
+        except Exception as e:
+            print(f"❌ Erro ao buscar próximos aniversários: {e}")
+            birthdays, total = [], 0
         
-        for data in birthdays:
-            # Calcula próximo aniversário
-            try:
-                aniversario = datetime(hoje.year, data['month'], data['day'])
-                if aniversario < hoje:
-                    aniversario = datetime(hoje.year + 1, data['month'], data['day'])
-                
-                dias_restantes = (aniversario - hoje).days
-                if dias_restantes <= dias:
-                    member = ctx.guild.get_member(int(data['user_id']))
-                    if member:
-                        proximos.append((dias_restantes, data['name'], data['date']))
-            except ValueError:
-                continue  # Data inválida (ex: 29/02 em ano não bissexto)
-        
-        if not proximos:
+        if not birthdays:
             embed = discord.Embed(
                 title=f"📅 Próximos Aniversários ({dias} dias)",
-                description=f"Nenhum aniversário nos próximos {dias} dias.",
+                description=f"Nenhum aniversário nos próximos {dias} dias." if pagina == 1 else "Nenhum aniversário nesta página.",
                 color=0xffaa00
             )
             await ctx.send(embed=embed)
             return
         
-        # Ordena por dias restantes
-        proximos.sort(key=lambda x: x[0])
-        
         description = ""
-        for dias_restantes, nome, data in proximos:
+        for data in birthdays:
+            # Só mostra se o membro ainda está no servidor
+            if not ctx.guild.get_member(int(data['user_id'])):
+                continue
+            dias_restantes = self.days_until(data, hoje)
+            nome = data['name']
             if dias_restantes == 0:
-                description += f"🎉 **{nome}** - **HOJE!** ({data})\n"
+                description += f"🎉 **{nome}** - **HOJE!** ({data['date']})\n"
             elif dias_restantes == 1:
-                description += f"🎂 **{nome}** - **amanhã** ({data})\n"
+                description += f"🎂 **{nome}** - **amanhã** ({data['date']})\n"
             else:
-                description += f"🗓️ **{nome}** - em **{dias_restantes} dias** ({data})\n"
+                description += f"🗓️ **{nome}** - em **{dias_restantes} dias** ({data['date']})\n"
         
+        paginas = (total + PAGE_SIZE - 1) // PAGE_SIZE
         embed = discord.Embed(
             title=f"📅 Próximos Aniversários ({dias} dias)",
-            description=description,
+            description=description or "Os aniversariantes desta página não estão mais no servidor.",
             color=0x00ff7f
         )
-        embed.set_footer(text=f"Total: {len(proximos)} aniversários encontrados")
+        embed.set_footer(text=f"Página {pagina}/{paginas} | Total: {total} aniversários encontrados")
         await ctx.send(embed=embed)
 
     @commands.command(name='aniversariohoje', aliases=['bdtoday'])
     async def aniversario_hoje(self, ctx):
         """Mostra quem faz aniversário hoje"""
         guild_id = str(ctx.guild.id)
-        birthdays = await self.get_all_birthdays(guild_id)
+        hoje = await self.local_today(guild_id)
+        birthdays = await self.get_birthdays_on(hoje, [guild_id])
         
-        hoje = datetime.now()
         aniversariantes_hoje = []
-        
-        for data in birthdays:
-            if data['day'] == hoje.day and data['month'] == hoje.month:
-                member = ctx.guild.get_member(int(data['user_id']))
-                if member:
-                    aniversariantes_hoje.append(data['name'])
+        for data in birthdays.get(guild_id, []):
+            member = ctx.guild.get_member(int(data['user_id']))
+            if member:
+                aniversariantes_hoje.append(data['name'])
         
         if aniversariantes_hoje:
             nomes = ", ".join([f"**{nome}**" for nome in aniversariantes_hoje])
@@ -655,11 +1058,9 @@ class Aniversario(commands.Cog):
         await ctx.send(embed=embed)
 
     async def cog_unload(self):
-        """Fecha a conexão com MongoDB quando o cog é descarregado"""
-        self.check_birthdays.cancel()
-        if self.client:
-            self.client.close()
-            print("🔌 Conexão com MongoDB (Aniversários) fechada")
+        """Para o agendador de aniversários quando o cog é descarregado"""
+        if self.scheduler_task:
+            self.scheduler_task.cancel()
 
 async def setup(bot):
     await bot.add_cog(Aniversario(bot))
\ No newline at end of file
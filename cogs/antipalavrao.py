@@ -3,7 +3,6 @@ from discord.ext import commands
 import json
 import os
 import re
-from motor.motor_asyncio import AsyncIOMotorClient
 
 class Antipalavrao(commands.Cog):
     def __init__(self, bot):
@@ -18,6 +17,8 @@ class Antipalavrao(commands.Cog):
         
         # In-memory data
         self.palavroes = []
+        self.guild_palavroes = {}  # guild_id -> list (None = uses global list)
+        self.matchers = {}         # guild_id -> compiled regex (None key = global list)
         self.configuracoes = {
             'ativo': True,
             'deletar_mensagem': True,
@@ -30,20 +31,18 @@ class Antipalavrao(commands.Cog):
     async def init_database(self):
         """Initialize MongoDB connection"""
         try:
-            mongo_uri = os.getenv("MONGO_URI")
-            
-            if not mongo_uri:
+            if not self.bot.mongo.is_configured:
                 print("❌ MONGO_URI não encontrada nas variáveis de ambiente!")
                 self.load_data()
                 return
             
             print("🔄 Conectando ao MongoDB...")
-            self.client = AsyncIOMotorClient(mongo_uri)
+            self.client = self.bot.mongo.client
             
             # Test connection
-            await self.client.admin.command('ping')
+            await self.bot.mongo.ping()
             
-            self.db = self.client['discord_bot']
+            self.db = self.bot.mongo.get_database('discord_bot')
             self.collection = self.db['antipalavrao']
             self._connection_ready = True
             
@@ -58,24 +57,34 @@ class Antipalavrao(commands.Cog):
 
     async def ensure_connection(self):
         """Ensure MongoDB connection is active"""
+        # Fail fast while the MongoDB circuit is open
+        if not await self.bot.mongo.available():
+            return False
         if not self._connection_ready:
             await self.init_database()
         return self._connection_ready
 
     async def get_guild_palavroes(self, guild_id):
-        """Get guild specific words from MongoDB"""
+        """Get guild specific words (cached after the first MongoDB read)"""
+        guild_id = str(guild_id)
+        if guild_id in self.guild_palavroes:
+            cached = self.guild_palavroes[guild_id]
+            return list(cached if cached is not None else self.palavroes)
+        
         try:
             if not await self.ensure_connection():
-                return self.palavroes
+                return list(self.palavroes)
                 
-            doc = await self.collection.find_one({"guild_id": str(guild_id)})
+            doc = await self.collection.find_one({"guild_id": guild_id})
             if doc and 'palavroes' in doc:
-                return doc['palavroes']
-            return self.palavroes
+                self.guild_palavroes[guild_id] = list(doc['palavroes'])
+            else:
+                self.guild_palavroes[guild_id] = None
+            return await self.get_guild_palavroes(guild_id)
             
         except Exception as e:
             print(f"❌ Erro ao buscar palavrões: {e}")
-            return self.palavroes
+            return list(self.palavroes)
 
     async def save_guild_palavroes(self, guild_id, palavroes_list):
         """Save guild specific words to MongoDB"""
@@ -88,12 +97,69 @@ class Antipalavrao(commands.Cog):
                 {"$set": {"palavroes": palavroes_list}},
                 upsert=True
             )
+            
+            # Only this guild's matcher has to be rebuilt
+            self.guild_palavroes[str(guild_id)] = list(palavroes_list)
+            self.matchers.pop(str(guild_id), None)
             return True
                 
         except Exception as e:
             print(f"❌ Erro ao salvar palavrões: {e}")
             return False
 
+    @staticmethod
+    def compile_matcher(palavroes):
+        """Compile a word list into a single trie-shaped regex
+        
+        Shared prefixes are merged, so each position of the message is tested
+        against the next character instead of against every word.
+        """
+        trie = {}
+        for palavra in palavroes:
+            if not palavra:
+                continue
+            node = trie
+            for char in palavra:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        
+        if not trie:
+            return None
+        
+        def build(node):
+            branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+            if not branches:
+                return ''
+            if len(branches) == 1 and '' not in node:
+                return branches[0]
+            pattern = '(?:' + '|'.join(branches) + ')'
+            return pattern + '?' if '' in node else pattern
+        
+        return re.compile(r'\b' + build(trie) + r'\b')
+
+    def invalidate_global_matcher(self):
+        """Drop matchers built from the global word list"""
+        self.matchers.pop(None, None)
+        for guild_id, cached in self.guild_palavroes.items():
+            if cached is None:
+                self.matchers.pop(guild_id, None)
+
+    async def get_guild_matcher(self, guild_id):
+        """Get the compiled matcher for a guild (built once, reused per message)"""
+        guild_id = str(guild_id)
+        if guild_id in self.matchers:
+            return self.matchers[guild_id]
+        
+        palavroes = await self.get_guild_palavroes(guild_id)
+        if guild_id not in self.guild_palavroes:
+            # MongoDB unavailable: use the global list without caching per guild
+            if None not in self.matchers:
+                self.matchers[None] = self.compile_matcher(self.palavroes)
+            return self.matchers[None]
+        
+        self.matchers[guild_id] = self.compile_matcher(palavroes)
+        return self.matchers[guild_id]
+
     async def get_guild_config(self, guild_id):
         """Get guild configuration from MongoDB"""
         try:
@@ -143,6 +209,7 @@ class Antipalavrao(commands.Cog):
             palavroes_doc = await self.collection.find_one({"type": "global_palavroes"})
             if palavroes_doc:
                 self.palavroes = palavroes_doc.get('lista', [])
+                self.invalidate_global_matcher()
             
             print(f"📊 Carregados {len(self.palavroes)} palavrões do MongoDB")
             
@@ -187,6 +254,7 @@ class Antipalavrao(commands.Cog):
             with open(self.data_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
                 self.palavroes = data.get('palavroes', [])
+                self.invalidate_global_matcher()
                 self.configuracoes = data.get('configuracoes', {
                     'ativo': True,
                     'deletar_mensagem': True,
@@ -242,6 +310,7 @@ class Antipalavrao(commands.Cog):
         # Update global list if not there
         if palavra not in self.palavroes:
             self.palavroes.append(palavra)
+            self.invalidate_global_matcher()
             await self.save_data_to_mongodb()
         
         embed = discord.Embed(
@@ -364,19 +433,13 @@ class Antipalavrao(commands.Cog):
         if message.author.guild_permissions.manage_messages:
             return
         
-        # Get guild specific words
-        guild_palavroes = await self.get_guild_palavroes(message.guild.id)
+        # Get the guild's compiled matcher (one regex for the whole list)
+        matcher = await self.get_guild_matcher(message.guild.id)
+        if matcher is None:
+            return
         
         # Check if message contains profanity
-        conteudo = message.content.lower()
-        palavrao_encontrado = None
-        
-        for palavrao in guild_palavroes:
-            # Use regex to find word as complete word
-            padrao = r'\b' + re.escape(palavrao) + r'\b'
-            if re.search(padrao, conteudo):
-                palavrao_encontrado = palavrao
-                break
+        palavrao_encontrado = matcher.search(message.content.lower())
         
         if palavrao_encontrado:
             # Delete message if configured
@@ -415,11 +478,5 @@ class Antipalavrao(commands.Cog):
             )
             await ctx.send(embed=embed)
     
-    async def cog_unload(self):
-        """Cleanup when cog is unloaded"""
-        if self.client:
-            self.client.close()
-            print("🔌 Conexão com MongoDB fechada")
-
 async def setup(bot):
     await bot.add_cog(Antipalavrao(bot))
\ No newline at end of file
@@ -1,6 +1,5 @@
 import discord
 from discord.ext import commands
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import json
 import asyncio
@@ -8,12 +7,10 @@ from datetime import datetime
 import zipfile
 import io
 
-MONGO_URI = os.getenv("MONGO_URI")
-
 class Backup(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.db = AsyncIOMotorClient(MONGO_URI)["backup_bot"]
+        self.db = bot.mongo.get_database("backup_bot")
     
     async def create_full_backup(self, guild, save_to_db=True):
         """Cria backup completo do servidor"""
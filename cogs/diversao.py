@@ -1,8 +1,6 @@
 import discord
 from discord.ext import commands
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
 import random
 import json
 from datetime import datetime, timedelta
@@ -50,20 +48,18 @@ class FunSystem(commands.Cog):
     async def init_database(self):
         """Inicializa a conexão com MongoDB"""
         try:
-            mongo_uri = os.getenv("MONGO_URI")
-            
-            if not mongo_uri:
+            if not self.bot.mongo.is_configured:
                 print("⚠️ MONGO_URI não encontrada - sistema funcionará sem banco de dados")
                 self._connection_ready = False
                 return
             
             print("🔄 Conectando ao MongoDB (Fun System)...")
-            self.client = AsyncIOMotorClient(mongo_uri, serverSelectionTimeoutMS=5000)
+            self.client = self.bot.mongo.client
             
             # Testa a conexão
-            await self.client.admin.command('ping')
+            await self.bot.mongo.ping()
             
-            self.db = self.client['discord_bot']
+            self.db = self.bot.mongo.get_database('discord_bot')
             self.collection = self.db['fun_config']
             self._connection_ready = True
             
@@ -76,6 +72,9 @@ class FunSystem(commands.Cog):
 
     async def ensure_connection(self):
         """Garante que a conexão com MongoDB está ativa"""
+        # Falha rápido enquanto o circuito do MongoDB estiver aberto
+        if not await self.bot.mongo.available():
+            return False
         if not self._connection_ready:
             await self.init_database()
         return self._connection_ready
@@ -504,12 +503,6 @@ class FunSystem(commands.Cog):
         except Exception as e:
             await ctx.send(f"❌ Erro ao mostrar ajuda: {e}")
 
-    async def cog_unload(self):
-        """Fecha a conexão com MongoDB quando o cog é descarregado"""
-        if self.client:
-            self.client.close()
-            print("🔌 Conexão Fun System com MongoDB fechada")
-
 # Função para carregar o cog
 async def setup(bot):
     await bot.add_cog(FunSystem(bot))
\ No newline at end of file
@@ -1,10 +1,10 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import asyncio
 import random
 from datetime import datetime, timedelta
-import os
-from motor.motor_asyncio import AsyncIOMotorClient
+from types import MappingProxyType
+from economy import EconomyStore, RichestPages
 
 class Economia(commands.Cog):
     def __init__(self, bot):
@@ -13,12 +13,22 @@ class Economia(commands.Cog):
         self.db = None
         self.users_collection = None
         self.shop_collection = None
+        self.shop_meta = None
         self.vip_collection = None
+        self.store = None
+        self.richest_pages = RichestPages()
         self._connection_ready = False
+        # Catálogo da loja em memória (somente leitura), recarregado quando a versão muda
+        self.catalog = None
+        self.catalog_version = None
+        self._catalog_lock = asyncio.Lock()
+        self._init_lock = asyncio.Lock()
         self.bot.loop.create_task(self.init_database())
+        self.check_catalog_version.start()
         
         # Configurações base
         self.daily_reward = 1000
+        self.daily_cooldown = 86400
         self.work_cooldown = 3600
         self.crime_cooldown = 7200
         
@@ -38,25 +48,56 @@ class Economia(commands.Cog):
         }
 
     async def init_database(self):
+        """Conecta uma única vez, mesmo com comandos chegando durante a abertura"""
+        async with self._init_lock:
+            if not self._connection_ready:
+                await self._init_database()
+
+    async def _init_database(self):
         try:
-            mongo_uri = os.getenv("MONGO_URI")
-            if not mongo_uri:
+            if not self.bot.mongo.is_configured:
                 return
             
-            self.client = AsyncIOMotorClient(mongo_uri)
-            await self.client.admin.command('ping')
+            self.client = self.bot.mongo.client
+            await self.bot.mongo.ping()
             
-            self.db = self.client['discord_bot']
+            self.db = self.bot.mongo.get_database('discord_bot')
             self.users_collection = self.db['users']
             self.shop_collection = self.db['shop']
+            self.shop_meta = self.db['shop_meta']
             self.vip_collection = self.db['vip_data']
-            self._connection_ready = True
+            defaults = self.get_default_user_data(None)
+            del defaults['user_id']
+            self.store = EconomyStore(self.client, self.users_collection, defaults, ledger=self.bot.economy_ledger)
+            # Preenche net_worth antes de liberar os comandos que o incrementam
+            backfilled = await self.store.backfill_net_worth()
+            if backfilled:
+                print(f"💰 net_worth calculado para {backfilled} usuário(s)")
             
+            try:
+                await self.users_collection.create_index("user_id", unique=True)
+            except Exception as e:
+                print(f"⚠️ Não foi possível criar índice único de users (duplicatas?): {e}")
+            await self.users_collection.create_index([("net_worth", -1), ("user_id", 1)])
+            try:
+                await self.bot.economy_ledger.open_accounts(self.users_collection, self.store.money_fields)
+            except Exception as e:
+                print(f"⚠️ Não foi possível registrar saldos de abertura no livro-razão: {e}")
+            # Só libera os comandos depois da abertura: um delta no meio dela seria contado duas vezes
+            self._connection_ready = True
+            try:
+                await self.shop_collection.create_index("item", unique=True)
+            except Exception as e:
+                print(f"⚠️ Não foi possível criar índice único da loja (duplicatas?): {e}")
             await self.initialize_shop_data()
+            await self.load_catalog()
         except Exception as e:
             self._connection_ready = False
 
     async def ensure_connection(self):
+        # Falha rápido enquanto o circuito do MongoDB estiver aberto
+        if not await self.bot.mongo.available():
+            return False
         if not self._connection_ready:
             await self.init_database()
         return self._connection_ready
@@ -77,8 +118,56 @@ class Economia(commands.Cog):
         except:
             pass
 
+    async def load_catalog(self):
+        """Carrega o catálogo inteiro da loja num mapa imutável"""
+        async with self._catalog_lock:
+            # A versão é lida antes dos itens: uma mudança no meio só causa uma recarga extra
+            meta = await self.shop_meta.find_one({"_id": "catalog"}) or {}
+            items = {}
+            async for item in self.shop_collection.find({}, {"_id": 0}):
+                items[item["item"]] = MappingProxyType({"price": item["price"], "desc": item.get("desc", "")})
+            self.catalog = MappingProxyType(items)
+            self.catalog_version = meta.get("version", 0)
+        return self.catalog
+
+    async def get_catalog(self):
+        """Catálogo em memória; só consulta o banco na primeira vez"""
+        if self.catalog is None and await self.ensure_connection():
+            await self.load_catalog()
+        return self.catalog or MappingProxyType({})
+
+    async def publish_catalog_change(self):
+        """Incrementa a versão do catálogo e recarrega o mapa local"""
+        await self.shop_meta.update_one({"_id": "catalog"}, {"$inc": {"version": 1}}, upsert=True)
+        await self.load_catalog()
+
+    @tasks.loop(seconds=60)
+    async def check_catalog_version(self):
+        """Recarrega o catálogo se ele foi alterado por fora (outra instância ou edição manual)"""
+        if self.catalog is None or not await self.bot.mongo.available():
+            return
+        try:
+            meta = await self.shop_meta.find_one({"_id": "catalog"}) or {}
+            if meta.get("version", 0) != self.catalog_version:
+                await self.load_catalog()
+                print(f"🛒 Catálogo da loja recarregado (versão {self.catalog_version})")
+        except Exception as e:
+            print(f"❌ Erro ao verificar versão do catálogo: {e}")
+
+    @check_catalog_version.before_loop
+    async def before_check_catalog_version(self):
+        await self.bot.wait_until_ready()
+
+    def cog_unload(self):
+        self.check_catalog_version.cancel()
+
     async def is_vip(self, user_id, guild_id):
         """Verifica se usuário é VIP usando a collection VIP"""
+        # Usa o índice em memória do VIPSystem quando o cog está carregado
+        vip_cog = self.bot.get_cog('VIPSystem')
+        if vip_cog:
+            return await vip_cog.is_vip(user_id, guild_id)
+        
         try:
             if not await self.ensure_connection():
                 return False
@@ -128,7 +217,7 @@ class Economia(commands.Cog):
 
     def get_default_user_data(self, user_id):
         return {
-            "user_id": user_id, "balance": 0, "bank": 0, "inventory": {},
+            "user_id": user_id, "balance": 0, "bank": 0, "net_worth": 0, "inventory": {},
             "job": None, "last_daily": None, "last_work": None, "last_crime": None,
             "is_boss": False, "employees": []
         }
@@ -144,6 +233,32 @@ class Economia(commands.Cog):
         except:
             return False
 
+    def user_key(self, user_id):
+        return {"user_id": str(user_id)}
+
+    async def db_unavailable(self, ctx):
+        """Avisa e retorna True se o banco não estiver disponível"""
+        if await self.ensure_connection():
+            return False
+        await ctx.send("❌ Banco de dados indisponível no momento. Tente novamente em instantes.")
+        return True
+
+    def cooldown_left(self, last, seconds, now):
+        """Tempo que falta para o cooldown acabar (None se já acabou)"""
+        if last:
+            left = timedelta(seconds=seconds) - (now - datetime.fromisoformat(last))
+            if left > timedelta(0):
+                return left
+        return None
+
+    def cooldown_guard(self, field, seconds, now):
+        """Condição do update: só casa se o cooldown de field já passou
+
+        Dois comandos simultâneos passam pela checagem de cooldown_left,
+        mas só um casa esta guarda (o outro já encontra o campo gravado).
+        """
+        return {"$or": [{field: None}, {field: {"$lte": (now - timedelta(seconds=seconds)).isoformat()}}]}
+
     def format_money(self, amount):
         return f"R$ {amount:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
@@ -164,28 +279,88 @@ class Economia(commands.Cog):
             embed.add_field(name="👑 Status", value="VIP ATIVO - Bônus em todas atividades!", inline=False)
         await ctx.send(embed=embed)
 
+    @commands.command(name='extrato', aliases=['historico'])
+    async def statement(self, ctx, user: discord.Member = None):
+        """Últimas movimentações registradas no livro-razão"""
+        if user is None:
+            user = ctx.author
+        if await self.db_unavailable(ctx):
+            return
+        
+        try:
+            entries = await self.bot.economy_ledger.history(self.user_key(user.id), limit=10)
+        except Exception as e:
+            print(f"❌ Erro ao buscar extrato: {e}")
+            return await ctx.send("❌ Erro ao buscar o extrato")
+        if not entries:
+            return await ctx.send(f"📒 Nenhuma movimentação registrada para {user.display_name}.")
+        
+        labels = {"balance": "carteira", "bank": "banco"}
+        lines = []
+        for entry in entries:
+            changes = ", ".join(
+                f"{'+' if amount > 0 else '-'}{self.format_money(abs(amount))} {labels.get(field, field)}"
+                for field, amount in entry["deltas"].items()
+            )
+            lines.append(f"`{entry['timestamp'].strftime('%d/%m %H:%M')}` **{entry['kind']}** {changes}")
+        
+        embed = discord.Embed(title=f"📒 Extrato de {user.display_name}", description="\n".join(lines), color=0x00ff00)
+        embed.set_footer(text="Últimas 10 movimentações (horário UTC)")
+        await ctx.send(embed=embed)
+
+    @commands.command(name='ricos', aliases=['rich', 'topmoney'])
+    async def richest(self, ctx, page: int = 1):
+        """Ranking global de patrimônio (carteira + banco)"""
+        if await self.db_unavailable(ctx):
+            return
+        page = max(page, 1)
+        
+        try:
+            rows = await self.richest_pages.page("global", self.users_collection, {}, page)
+        except Exception as e:
+            print(f"❌ Erro ao montar ranking: {e}")
+            return await ctx.send("❌ Erro ao carregar o ranking")
+        if not rows:
+            return await ctx.send("❌ Nenhum usuário nesta página do ranking!")
+        
+        medals = {1: "🥇", 2: "🥈", 3: "🥉"}
+        start = (page - 1) * RichestPages.PAGE_SIZE
+        lines = []
+        for position, row in enumerate(rows, start + 1):
+            member = ctx.guild.get_member(int(row["user_id"]))
+            name = member.display_name if member else f"<@{row['user_id']}>"
+            lines.append(f"{medals.get(position, '')} **#{position}** {name} • {self.format_money(row['net_worth'])}")
+        
+        embed = discord.Embed(title="🏆 Mais Ricos", description="\n".join(lines), color=0xFFD700)
+        embed.set_footer(text=f"Página {page} | Use !ricos {page + 1} para a próxima")
+        await ctx.send(embed=embed)
+
     @commands.command(name='diario', aliases=['daily'])
     async def daily(self, ctx):
         data = await self.get_user_data(ctx.author.id)
         now = datetime.now()
         multipliers = await self.get_vip_multipliers(ctx.author.id, ctx.guild.id)
         
-        if data["last_daily"]:
-            last = datetime.fromisoformat(data["last_daily"])
-            if now - last < timedelta(days=1):
-                left = timedelta(days=1) - (now - last)
-                h, m = int(left.total_seconds() // 3600), int((left.total_seconds() % 3600) // 60)
-                return await ctx.send(embed=discord.Embed(title="⏰ Cooldown", description=f"Volte em {h}h {m}m", color=0xff0000))
-        
-        reward = int(self.daily_reward * multipliers["daily"])
-        success = await self.update_user_data(ctx.author.id, {"balance": data["balance"] + reward, "last_daily": now.isoformat()})
-        
-        if success:
-            is_vip = multipliers["daily"] > 1.0
-            embed = discord.Embed(title="🎁 Recompensa Diária", description=f"Você recebeu {self.format_money(reward)}!", color=0xFFD700 if is_vip else 0x00ff00)
-            if is_vip:
-                embed.add_field(name="👑 Bônus VIP", value="2x recompensa aplicada!", inline=False)
-            await ctx.send(embed=embed)
+        left = self.cooldown_left(data["last_daily"], self.daily_cooldown, now)
+        if left is None:
+            reward = int(self.daily_reward * multipliers["daily"])
+            if await self.db_unavailable(ctx):
+                return
+            success = await self.store.apply(self.user_key(ctx.author.id), {"balance": reward}, set_fields={"last_daily": now.isoformat()}, kind="daily",
+                                             match=self.cooldown_guard("last_daily", self.daily_cooldown, now))
+            if not success:
+                # Outro !daily simultâneo passou pela guarda antes
+                left = timedelta(seconds=self.daily_cooldown)
+        
+        if left is not None:
+            h, m = int(left.total_seconds() // 3600), int((left.total_seconds() % 3600) // 60)
+            return await ctx.send(embed=discord.Embed(title="⏰ Cooldown", description=f"Volte em {h}h {m}m", color=0xff0000))
+        
+        is_vip = multipliers["daily"] > 1.0
+        embed = discord.Embed(title="🎁 Recompensa Diária", description=f"Você recebeu {self.format_money(reward)}!", color=0xFFD700 if is_vip else 0x00ff00)
+        if is_vip:
+            embed.add_field(name="👑 Bônus VIP", value="2x recompensa aplicada!", inline=False)
+        await ctx.send(embed=embed)
 
     @commands.command(name='empregos', aliases=['jobs'])
     async def jobs_list(self, ctx):
@@ -258,24 +433,29 @@ class Economia(commands.Cog):
         if not data["job"]:
             return await ctx.send("❌ Você não tem emprego! Use `!empregos` para ver as opções e `!contratar <emprego>` para se candidatar.")
         
-        if data["last_work"]:
-            last = datetime.fromisoformat(data["last_work"])
-            if now - last < timedelta(seconds=self.work_cooldown):
-                left = timedelta(seconds=self.work_cooldown) - (now - last)
-                m = int(left.total_seconds() // 60)
-                return await ctx.send(embed=discord.Embed(title="⏰ Cooldown", description=f"Volte em {m} min", color=0xff0000))
-        
         job = data["job"]
-        min_sal, max_sal = self.jobs[job]["salary"]
-        earnings = int(random.randint(min_sal, max_sal) * multipliers["work"])
-        
-        success = await self.update_user_data(ctx.author.id, {"balance": data["balance"] + earnings, "last_work": now.isoformat()})
-        if success:
-            is_vip = multipliers["work"] > 1.0
-            embed = discord.Embed(title="💼 Trabalho Concluído", description=f"Trabalhou como {job} e ganhou {self.format_money(earnings)}!", color=0xFFD700 if is_vip else 0x00ff00)
-            if is_vip:
-                embed.add_field(name="👑 Bônus VIP", value="50% extra aplicado!", inline=False)
-            await ctx.send(embed=embed)
+        left = self.cooldown_left(data["last_work"], self.work_cooldown, now)
+        if left is None:
+            min_sal, max_sal = self.jobs[job]["salary"]
+            earnings = int(random.randint(min_sal, max_sal) * multipliers["work"])
+            
+            if await self.db_unavailable(ctx):
+                return
+            success = await self.store.apply(self.user_key(ctx.author.id), {"balance": earnings}, set_fields={"last_work": now.isoformat()}, kind="trabalho",
+                                             match=self.cooldown_guard("last_work", self.work_cooldown, now))
+            if not success:
+                # Outro !trabalhar simultâneo passou pela guarda antes
+                left = timedelta(seconds=self.work_cooldown)
+        
+        if left is not None:
+            m = int(left.total_seconds() // 60)
+            return await ctx.send(embed=discord.Embed(title="⏰ Cooldown", description=f"Volte em {m} min", color=0xff0000))
+        
+        is_vip = multipliers["work"] > 1.0
+        embed = discord.Embed(title="💼 Trabalho Concluído", description=f"Trabalhou como {job} e ganhou {self.format_money(earnings)}!", color=0xFFD700 if is_vip else 0x00ff00)
+        if is_vip:
+            embed.add_field(name="👑 Bônus VIP", value="50% extra aplicado!", inline=False)
+        await ctx.send(embed=embed)
 
     @commands.command(name='crime')
     async def crime(self, ctx):
@@ -283,31 +463,39 @@ class Economia(commands.Cog):
         now = datetime.now()
         multipliers = await self.get_vip_multipliers(ctx.author.id, ctx.guild.id)
         
-        if data["last_crime"]:
-            last = datetime.fromisoformat(data["last_crime"])
-            if now - last < timedelta(seconds=self.crime_cooldown):
-                left = timedelta(seconds=self.crime_cooldown) - (now - last)
-                h = int(left.total_seconds() // 3600)
-                return await ctx.send(embed=discord.Embed(title="⏰ Cooldown", description=f"Volte em {h}h", color=0xff0000))
-        
-        crime = random.choice(list(self.crimes.keys()))
-        crime_data = self.crimes[crime]
-        success_rate = crime_data["success"] + multipliers["crime_success"]
+        left = self.cooldown_left(data["last_crime"], self.crime_cooldown, now)
+        if left is None:
+            if await self.db_unavailable(ctx):
+                return
+            
+            guard = self.cooldown_guard("last_crime", self.crime_cooldown, now)
+            crime = random.choice(list(self.crimes.keys()))
+            crime_data = self.crimes[crime]
+            success_rate = crime_data["success"] + multipliers["crime_success"]
+            
+            if random.randint(1, 100) <= success_rate:
+                reward = random.randint(crime_data["min"], crime_data["max"])
+                success = await self.store.apply(self.user_key(ctx.author.id), {"balance": reward}, set_fields={"last_crime": now.isoformat()}, kind="crime", match=guard)
+                if success:
+                    is_vip = multipliers["crime_success"] > 0
+                    embed = discord.Embed(title="🎭 Crime Bem-sucedido", description=f"Você conseguiu {self.format_money(reward)} com {crime.replace('_', ' ')}!", color=0x00ff00)
+                    if is_vip:
+                        embed.add_field(name="👑 Bônus VIP", value="+15% chance de sucesso!", inline=False)
+            else:
+                fine = random.randint(100, 500)
+                # Multa limitada ao saldo atual (nunca fica negativo)
+                fine = await self.store.debit_up_to(self.user_key(ctx.author.id), "balance", fine, set_fields={"last_crime": now.isoformat()}, kind="multa_crime", match=guard)
+                success = fine is not None
+                if success:
+                    embed = discord.Embed(title="🚔 Crime Fracassou", description=f"Você foi pego e pagou {self.format_money(fine)} de multa!", color=0xff0000)
+            
+            if not success:
+                # Outro !crime simultâneo passou pela guarda antes
+                left = timedelta(seconds=self.crime_cooldown)
         
-        if random.randint(1, 100) <= success_rate:
-            reward = random.randint(crime_data["min"], crime_data["max"])
-            success = await self.update_user_data(ctx.author.id, {"balance": data["balance"] + reward, "last_crime": now.isoformat()})
-            if success:
-                is_vip = multipliers["crime_success"] > 0
-                embed = discord.Embed(title="🎭 Crime Bem-sucedido", description=f"Você conseguiu {self.format_money(reward)} com {crime.replace('_', ' ')}!", color=0x00ff00)
-                if is_vip:
-                    embed.add_field(name="👑 Bônus VIP", value="+15% chance de sucesso!", inline=False)
-        else:
-            fine = random.randint(100, 500)
-            new_balance = max(0, data["balance"] - fine)
-            success = await self.update_user_data(ctx.author.id, {"balance": new_balance, "last_crime": now.isoformat()})
-            if success:
-                embed = discord.Embed(title="🚔 Crime Fracassou", description=f"Você foi pego e pagou {self.format_money(fine)} de multa!", color=0xff0000)
+        if left is not None:
+            h = int(left.total_seconds() // 3600)
+            return await ctx.send(embed=discord.Embed(title="⏰ Cooldown", description=f"Volte em {h}h", color=0xff0000))
         
         await ctx.send(embed=embed)
 
@@ -316,7 +504,9 @@ class Economia(commands.Cog):
         if user == ctx.author:
             return await ctx.send("❌ Você não pode roubar a si mesmo!")
         
-        robber_data = await self.get_user_data(ctx.author.id)
+        if await self.db_unavailable(ctx):
+            return
+        
         victim_data = await self.get_user_data(user.id)
         multipliers = await self.get_vip_multipliers(ctx.author.id, ctx.guild.id)
         
@@ -327,42 +517,49 @@ class Economia(commands.Cog):
         
         if random.randint(1, 100) <= success_rate:
             stolen = min(victim_data["balance"] // 4, 5000)
-            await self.update_user_data(ctx.author.id, {"balance": robber_data["balance"] + stolen})
-            await self.update_user_data(user.id, {"balance": victim_data["balance"] - stolen})
+            # A guarda de saldo é da vítima: se ela gastou nesse meio tempo, o roubo falha
+            moved = await self.store.transfer(self.user_key(user.id), self.user_key(ctx.author.id), "balance", stolen, kind="roubo")
+            if moved is None:
+                return await ctx.send("❌ A vítima já não tem esse dinheiro na carteira!")
             is_vip = multipliers["rob_success"] > 0
             embed = discord.Embed(title="💰 Roubo Bem-sucedido", description=f"Você roubou {self.format_money(stolen)} de {user.display_name}!", color=0x00ff00)
             if is_vip:
                 embed.add_field(name="👑 Bônus VIP", value="+20% chance de sucesso!", inline=False)
         else:
             fine = random.randint(200, 800)
-            new_balance = max(0, robber_data["balance"] - fine)
-            await self.update_user_data(ctx.author.id, {"balance": new_balance})
+            fine = await self.store.debit_up_to(self.user_key(ctx.author.id), "balance", fine, kind="multa_roubo")
             embed = discord.Embed(title="🚔 Roubo Fracassou", description=f"Você foi pego e pagou {self.format_money(fine)}!", color=0xff0000)
         
         await ctx.send(embed=embed)
 
     @commands.command(name='apostar', aliases=['bet'])
     async def bet(self, ctx, amount: int):
-        data = await self.get_user_data(ctx.author.id)
-        multipliers = await self.get_vip_multipliers(ctx.author.id, ctx.guild.id)
-        
-        if amount <= 0 or amount > data["balance"]:
+        if amount <= 0:
             return await ctx.send("❌ Valor inválido ou saldo insuficiente!")
+        if await self.db_unavailable(ctx):
+            return
+        multipliers = await self.get_vip_multipliers(ctx.author.id, ctx.guild.id)
         
         win_chance = 45 + multipliers["bet_luck"]
+        won = random.randint(1, 100) <= win_chance
+        
+        # A aposta só vale se o saldo cobria o valor no momento da atualização
+        result = await self.store.apply(
+            self.user_key(ctx.author.id), {"balance": amount if won else -amount},
+            require={"balance": amount}, kind="aposta"
+        )
+        if result is None:
+            return await ctx.send("❌ Valor inválido ou saldo insuficiente!")
         
-        if random.randint(1, 100) <= win_chance:
+        if won:
             winnings = amount * 2
-            new_balance = data["balance"] + amount
             is_vip = multipliers["bet_luck"] > 0
             embed = discord.Embed(title="🎰 Você Ganhou!", description=f"Ganhou {self.format_money(winnings)}!", color=0x00ff00)
             if is_vip:
                 embed.add_field(name="👑 Bônus VIP", value="+10% chance de vitória!", inline=False)
         else:
-            new_balance = data["balance"] - amount
             embed = discord.Embed(title="🎰 Você Perdeu!", description=f"Perdeu {self.format_money(amount)}!", color=0xff0000)
         
-        await self.update_user_data(ctx.author.id, {"balance": new_balance})
         await ctx.send(embed=embed)
 
     @commands.command(name='inventario', aliases=['inv'])
@@ -395,9 +592,12 @@ class Economia(commands.Cog):
         if amount <= 0 or amount > data["balance"]:
             return await ctx.send("❌ Valor inválido ou saldo insuficiente!")
         
-        success = await self.update_user_data(ctx.author.id, {"balance": data["balance"] - amount, "bank": data["bank"] + amount})
-        if success:
-            await ctx.send(embed=discord.Embed(title="🏦 Depósito", description=f"Depositado {self.format_money(amount)}!", color=0x00ff00))
+        if await self.db_unavailable(ctx):
+            return
+        success = await self.store.move(self.user_key(ctx.author.id), "balance", "bank", amount, kind="deposito")
+        if not success:
+            return await ctx.send("❌ Valor inválido ou saldo insuficiente!")
+        await ctx.send(embed=discord.Embed(title="🏦 Depósito", description=f"Depositado {self.format_money(amount)}!", color=0x00ff00))
 
     @commands.command(name='sacar', aliases=['withdraw'])
     async def withdraw(self, ctx, amount: str):
@@ -414,17 +614,17 @@ class Economia(commands.Cog):
         if amount <= 0 or amount > data["bank"]:
             return await ctx.send("❌ Valor inválido ou saldo bancário insuficiente!")
         
-        success = await self.update_user_data(ctx.author.id, {"balance": data["balance"] + amount, "bank": data["bank"] - amount})
-        if success:
-            await ctx.send(embed=discord.Embed(title="🏦 Saque", description=f"Sacado {self.format_money(amount)}!", color=0x00ff00))
+        if await self.db_unavailable(ctx):
+            return
+        success = await self.store.move(self.user_key(ctx.author.id), "bank", "balance", amount, kind="saque")
+        if not success:
+            return await ctx.send("❌ Valor inválido ou saldo bancário insuficiente!")
+        await ctx.send(embed=discord.Embed(title="🏦 Saque", description=f"Sacado {self.format_money(amount)}!", color=0x00ff00))
 
     @commands.command(name='loja', aliases=['shop'])
     async def shop(self, ctx):
         try:
-            shop_data = {}
-            if await self.ensure_connection():
-                async for item in self.shop_collection.find():
-                    shop_data[item["item"]] = {"price": item["price"], "desc": item["desc"]}
+            shop_data = await self.get_catalog()
             
             embed = discord.Embed(title="🛒 Loja", color=0x0099ff)
             for item, data in shop_data.items():
@@ -436,56 +636,55 @@ class Economia(commands.Cog):
 
     @commands.command(name='comprar', aliases=['buy'])
     async def buy(self, ctx, *, item_name: str):
-        data = await self.get_user_data(ctx.author.id)
         item_name = item_name.lower()
+        if await self.db_unavailable(ctx):
+            return
         
         try:
-            shop_item = await self.shop_collection.find_one({"item": item_name})
+            shop_item = (await self.get_catalog()).get(item_name)
             if not shop_item:
                 return await ctx.send("❌ Item não encontrado!")
             
             price = shop_item["price"]
-            if data["balance"] < price:
+            # Debita e adiciona o item na mesma operação, com guarda de saldo
+            success = await self.store.apply(
+                self.user_key(ctx.author.id),
+                {"balance": -price, f"inventory.{item_name}": 1},
+                require={"balance": price}, kind="compra"
+            )
+            if not success:
                 return await ctx.send("❌ Saldo insuficiente!")
-            
-            inv = data.get("inventory", {})
-            inv[item_name] = inv.get(item_name, 0) + 1
-            
-            success = await self.update_user_data(ctx.author.id, {"balance": data["balance"] - price, "inventory": inv})
-            if success:
-                await ctx.send(embed=discord.Embed(title="🛒 Compra Realizada", description=f"Comprou {item_name} por {self.format_money(price)}!", color=0x00ff00))
+            await ctx.send(embed=discord.Embed(title="🛒 Compra Realizada", description=f"Comprou {item_name} por {self.format_money(price)}!", color=0x00ff00))
         except:
             await ctx.send("❌ Erro na compra")
 
     @commands.command(name='vender', aliases=['sell'])
     async def sell_item(self, ctx, *, item_name: str):
         """Vende um item do inventário"""
-        data = await self.get_user_data(ctx.author.id)
         item_name = item_name.lower()
-        inv = data.get("inventory", {})
-        
-        if item_name not in inv or inv[item_name] <= 0:
-            return await ctx.send("❌ Você não possui este item!")
+        if await self.db_unavailable(ctx):
+            return
         
         try:
-            shop_item = await self.shop_collection.find_one({"item": item_name})
+            shop_item = (await self.get_catalog()).get(item_name)
             if not shop_item:
                 return await ctx.send("❌ Este item não pode ser vendido!")
             
             sell_price = int(shop_item["price"] * 0.6)  # Vende por 60% do preço original
             
-            inv[item_name] -= 1
-            if inv[item_name] == 0:
-                del inv[item_name]
-            
-            success = await self.update_user_data(ctx.author.id, {
-                "balance": data["balance"] + sell_price, 
-                "inventory": inv
-            })
+            # Remove o item e credita na mesma operação, com guarda de quantidade
+            inventory_field = f"inventory.{item_name}"
+            success = await self.store.apply(
+                self.user_key(ctx.author.id),
+                {"balance": sell_price, inventory_field: -1},
+                require={inventory_field: 1}, kind="venda"
+            )
+            if not success:
+                return await ctx.send("❌ Você não possui este item!")
+            await self.store.remove_empty(self.user_key(ctx.author.id), inventory_field)
             
-            if success:
-                embed = discord.Embed(title="💸 Item Vendido", description=f"Você vendeu {item_name} por {self.format_money(sell_price)}!", color=0x00ff00)
-                await ctx.send(embed=embed)
+            embed = discord.Embed(title="💸 Item Vendido", description=f"Você vendeu {item_name} por {self.format_money(sell_price)}!", color=0x00ff00)
+            await ctx.send(embed=embed)
         except:
             await ctx.send("❌ Erro ao vender o item")
 
@@ -505,16 +704,79 @@ class Economia(commands.Cog):
     @commands.has_permissions(administrator=True)
     @commands.command(name='dar', aliases=['give'])
     async def give_money(self, ctx, user: discord.Member, amount: int):
-        data = await self.get_user_data(user.id)
-        success = await self.update_user_data(user.id, {"balance": data["balance"] + amount})
+        if await self.db_unavailable(ctx):
+            return
+        success = await self.store.apply(self.user_key(user.id), {"balance": amount}, kind="admin")
         
         if success:
             embed = discord.Embed(title="💰 Dinheiro Dado", description=f"Você deu {self.format_money(amount)} para {user.display_name}!", color=0x00ff00)
             await ctx.send(embed=embed)
 
-    async def cog_unload(self):
-        if self.client:
-            self.client.close()
+    def valid_item_name(self, item_name):
+        # O nome vira chave do inventário (inventory.<item>)
+        return bool(item_name) and not any(char in item_name for char in ".$")
+
+    @commands.has_permissions(administrator=True)
+    @commands.command(name='adicionaritem', aliases=['additem'])
+    async def add_shop_item(self, ctx, item_name: str, price: int, *, desc: str):
+        """Adiciona um item à loja"""
+        item_name = item_name.lower()
+        if not self.valid_item_name(item_name) or price <= 0:
+            return await ctx.send("❌ Nome ou preço inválido!")
+        if await self.db_unavailable(ctx):
+            return
+        
+        try:
+            result = await self.shop_collection.update_one(
+                {"item": item_name},
+                {"$setOnInsert": {"item": item_name, "price": price, "desc": desc}},
+                upsert=True
+            )
+            if result.upserted_id is None:
+                return await ctx.send("❌ Este item já existe! Use !precoitem para alterar o preço.")
+            await self.publish_catalog_change()
+            await ctx.send(embed=discord.Embed(title="🛒 Item Adicionado", description=f"{item_name.title()} por {self.format_money(price)}", color=0x00ff00))
+        except Exception as e:
+            print(f"❌ Erro ao adicionar item: {e}")
+            await ctx.send("❌ Erro ao adicionar o item")
+
+    @commands.has_permissions(administrator=True)
+    @commands.command(name='removeritem', aliases=['removeitem'])
+    async def remove_shop_item(self, ctx, *, item_name: str):
+        """Remove um item da loja (quem já tem continua com ele)"""
+        item_name = item_name.lower()
+        if await self.db_unavailable(ctx):
+            return
+        
+        try:
+            result = await self.shop_collection.delete_one({"item": item_name})
+            if not result.deleted_count:
+                return await ctx.send("❌ Item não encontrado!")
+            await self.publish_catalog_change()
+            await ctx.send(embed=discord.Embed(title="🗑️ Item Removido", description=f"{item_name.title()} saiu da loja.", color=0x00ff00))
+        except Exception as e:
+            print(f"❌ Erro ao remover item: {e}")
+            await ctx.send("❌ Erro ao remover o item")
+
+    @commands.has_permissions(administrator=True)
+    @commands.command(name='precoitem', aliases=['setprice'])
+    async def reprice_shop_item(self, ctx, item_name: str, price: int):
+        """Altera o preço de um item da loja"""
+        item_name = item_name.lower()
+        if price <= 0:
+            return await ctx.send("❌ Preço inválido!")
+        if await self.db_unavailable(ctx):
+            return
+        
+        try:
+            result = await self.shop_collection.update_one({"item": item_name}, {"$set": {"price": price}})
+            if not result.matched_count:
+                return await ctx.send("❌ Item não encontrado!")
+            await self.publish_catalog_change()
+            await ctx.send(embed=discord.Embed(title="🏷️ Preço Alterado", description=f"{item_name.title()} agora custa {self.format_money(price)}", color=0x00ff00))
+        except Exception as e:
+            print(f"❌ Erro ao alterar preço: {e}")
+            await ctx.send("❌ Erro ao alterar o preço")
 
 async def setup(bot):
     await bot.add_cog(Economia(bot))
\ No newline at end of file
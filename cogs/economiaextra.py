@@ -1,11 +1,10 @@
 import discord
 from discord.ext import commands
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
 import logging
 import random
 from datetime import datetime, timedelta
+from economy import EconomyStore, RichestPages
 
 class EconomySystem(commands.Cog):
     def __init__(self, bot):
@@ -13,23 +12,47 @@ class EconomySystem(commands.Cog):
         self.client = None
         self.db = None
         self.collection = None
+        self.store = None
+        self.richest_pages = RichestPages()
         self._connection_ready = False
+        self._init_lock = asyncio.Lock()
         self.bot.loop.create_task(self.init_database())
 
     async def init_database(self):
-        """Inicializa a conexão com MongoDB"""
+        """Inicializa a conexão com MongoDB uma única vez, mesmo com comandos chegando durante a abertura"""
+        async with self._init_lock:
+            if not self._connection_ready:
+                await self._init_database()
+
+    async def _init_database(self):
         try:
-            mongo_uri = os.getenv("MONGO_URI")
-            if not mongo_uri:
+            if not self.bot.mongo.is_configured:
                 print("❌ MONGO_URI não encontrada nas variáveis de ambiente!")
                 return
             
             print("🔄 Conectando ao MongoDB (Economy)...")
-            self.client = AsyncIOMotorClient(mongo_uri)
-            await self.client.admin.command('ping')
+            self.client = self.bot.mongo.client
+            await self.bot.mongo.ping()
             
-            self.db = self.client['discord_bot']
+            self.db = self.bot.mongo.get_database('discord_bot')
             self.collection = self.db['economy_data']
+            self.store = EconomyStore(
+                self.client, self.collection, {'saldo': 0},
+                ledger=self.bot.economy_ledger, money_fields=('saldo',)
+            )
+            # Preenche net_worth antes de liberar os comandos que o incrementam
+            await self.store.backfill_net_worth()
+            
+            try:
+                await self.collection.create_index([("guild_id", 1), ("user_id", 1)], unique=True)
+            except Exception as e:
+                print(f"⚠️ Não foi possível criar índice único de economy_data (duplicatas?): {e}")
+            await self.collection.create_index([("guild_id", 1), ("net_worth", -1), ("user_id", 1)])
+            try:
+                await self.bot.economy_ledger.open_accounts(self.collection, self.store.money_fields)
+            except Exception as e:
+                print(f"⚠️ Não foi possível registrar saldos de abertura no livro-razão: {e}")
+            # Só libera os comandos depois da abertura: um delta no meio dela seria contado duas vezes
             self._connection_ready = True
             
             print("✅ Conectado ao MongoDB (Economy) com sucesso!")
@@ -40,6 +63,9 @@ class EconomySystem(commands.Cog):
 
     async def ensure_connection(self):
         """Garante que a conexão com MongoDB está ativa"""
+        # Falha rápido enquanto o circuito do MongoDB estiver aberto
+        if not await self.bot.mongo.available():
+            return False
         if not self._connection_ready:
             await self.init_database()
         return self._connection_ready
@@ -76,6 +102,30 @@ class EconomySystem(commands.Cog):
 
 
 
+    def user_key(self, user_id, guild_id):
+        return {"user_id": str(user_id), "guild_id": str(guild_id)}
+
+    async def transfer_saldo(self, ctx, membro, quantia, taxa=0, kind='transferencia'):
+        """Transfere saldo atomicamente; retorna (remetente, destinatário), None sem saldo ou False em erro"""
+        try:
+            if not await self.ensure_connection():
+                return False
+            return await self.store.transfer(
+                self.user_key(ctx.author.id, ctx.guild.id),
+                self.user_key(membro.id, ctx.guild.id),
+                'saldo', quantia, fee=taxa, kind=kind
+            )
+        except Exception as e:
+            print(f"❌ Erro ao transferir saldo: {e}")
+            return False
+
+    def insufficient_embed(self, sender_balance, description):
+        return discord.Embed(
+            title="❌ Saldo Insuficiente",
+            description=f"{description}\nSeu saldo: R$ {sender_balance:,}",
+            color=discord.Color.red()
+        )
+
     @commands.command(name='presentear')
     async def presentear(self, ctx, membro: discord.Member, quantia: int):
         """Presenteia outro membro com dinheiro"""
@@ -97,29 +147,18 @@ class EconomySystem(commands.Cog):
             await ctx.send(embed=embed)
             return
 
-        # Busca dados de ambos usuários
-        sender_data = await self.get_user_data(ctx.author.id, ctx.guild.id)
-        receiver_data = await self.get_user_data(membro.id, ctx.guild.id)
-
-        sender_balance = sender_data.get('saldo', 0)
+        # Débito com guarda de saldo e crédito numa única operação atômica
+        result = await self.transfer_saldo(ctx, membro, quantia, kind='presente')
         
-        if sender_balance < quantia:
-            embed = discord.Embed(
-                title="❌ Saldo Insuficiente",
-                description=f"Você tem apenas R$ {sender_balance:,}!\nQuantia solicitada: R$ {quantia:,}",
-                color=discord.Color.red()
-            )
+        if result is None:
+            sender_data = await self.get_user_data(ctx.author.id, ctx.guild.id)
+            embed = self.insufficient_embed(sender_data.get('saldo', 0), f"Quantia solicitada: R$ {quantia:,}")
             await ctx.send(embed=embed)
             return
 
-        # Realiza a transferência
-        new_sender_balance = sender_balance - quantia
-        new_receiver_balance = receiver_data.get('saldo', 0) + quantia
-
-        sender_success = await self.update_user_data(ctx.author.id, ctx.guild.id, {'saldo': new_sender_balance})
-        receiver_success = await self.update_user_data(membro.id, ctx.guild.id, {'saldo': new_receiver_balance})
-
-        if sender_success and receiver_success:
+        if result:
+            new_sender_balance = result[0]['saldo']
+            new_receiver_balance = result[1]['saldo']
             embed = discord.Embed(
                 title="🎁 Presente Enviado!",
                 description=f"**{ctx.author.mention}** presenteou **{membro.mention}** com R$ {quantia:,}!",
@@ -161,28 +200,21 @@ class EconomySystem(commands.Cog):
         taxa = max(1, int(quantia * 0.02))
         total_necessario = quantia + taxa
 
-        sender_data = await self.get_user_data(ctx.author.id, ctx.guild.id)
-        receiver_data = await self.get_user_data(membro.id, ctx.guild.id)
-
-        sender_balance = sender_data.get('saldo', 0)
+        # Débito (quantia + taxa) com guarda de saldo e crédito numa única operação atômica
+        result = await self.transfer_saldo(ctx, membro, quantia, taxa)
         
-        if sender_balance < total_necessario:
-            embed = discord.Embed(
-                title="❌ Saldo Insuficiente",
-                description=f"Você precisa de R$ {total_necessario:,}!\n(R$ {quantia:,} + R$ {taxa:,} de taxa)\nSeu saldo: R$ {sender_balance:,}",
-                color=discord.Color.red()
+        if result is None:
+            sender_data = await self.get_user_data(ctx.author.id, ctx.guild.id)
+            embed = self.insufficient_embed(
+                sender_data.get('saldo', 0),
+                f"Você precisa de R$ {total_necessario:,}!\n(R$ {quantia:,} + R$ {taxa:,} de taxa)"
             )
             await ctx.send(embed=embed)
             return
 
-        # Realiza a transferência
-        new_sender_balance = sender_balance - total_necessario
-        new_receiver_balance = receiver_data.get('saldo', 0) + quantia
-
-        sender_success = await self.update_user_data(ctx.author.id, ctx.guild.id, {'saldo': new_sender_balance})
-        receiver_success = await self.update_user_data(membro.id, ctx.guild.id, {'saldo': new_receiver_balance})
-
-        if sender_success and receiver_success:
+        if result:
+            new_sender_balance = result[0]['saldo']
+            new_receiver_balance = result[1]['saldo']
             embed = discord.Embed(
                 title="💸 Transferência Realizada!",
                 description=f"**{ctx.author.mention}** transferiu R$ {quantia:,} para **{membro.mention}**",
@@ -200,13 +232,52 @@ class EconomySystem(commands.Cog):
 
         await ctx.send(embed=embed)
 
+    @commands.command(name='ricosservidor', aliases=['topsaldo'])
+    async def ricos_servidor(self, ctx, pagina: int = 1):
+        """Ranking de saldo deste servidor"""
+        if not await self.ensure_connection():
+            embed = discord.Embed(
+                title="❌ Erro",
+                description="Banco de dados indisponível no momento.",
+                color=discord.Color.red()
+            )
+            await ctx.send(embed=embed)
+            return
+        pagina = max(pagina, 1)
 
+        try:
+            rows = await self.richest_pages.page(
+                str(ctx.guild.id), self.collection, {"guild_id": str(ctx.guild.id)}, pagina
+            )
+        except Exception as e:
+            print(f"❌ Erro ao montar ranking do servidor: {e}")
+            rows = None
+
+        if not rows:
+            embed = discord.Embed(
+                title="🏆 Mais Ricos do Servidor",
+                description="Nenhum membro nesta página do ranking!" if rows is not None else "Não foi possível carregar o ranking.",
+                color=discord.Color.red()
+            )
+            await ctx.send(embed=embed)
+            return
+
+        medalhas = {1: "🥇", 2: "🥈", 3: "🥉"}
+        inicio = (pagina - 1) * RichestPages.PAGE_SIZE
+        linhas = []
+        for posicao, row in enumerate(rows, inicio + 1):
+            membro = ctx.guild.get_member(int(row["user_id"]))
+            nome = membro.mention if membro else f"<@{row['user_id']}>"
+            linhas.append(f"{medalhas.get(posicao, '')} **#{posicao}** {nome} • R$ {row['net_worth']:,}")
+
+        embed = discord.Embed(
+            title="🏆 Mais Ricos do Servidor",
+            description="\n".join(linhas),
+            color=discord.Color.gold()
+        )
+        embed.set_footer(text=f"Página {pagina} | Use !ricosservidor {pagina + 1} para a próxima")
+        await ctx.send(embed=embed)
 
-    async def cog_unload(self):
-        """Fecha a conexão com MongoDB quando o cog é descarregado"""
-        if self.client:
-            self.client.close()
-            print("🔌 Conexão com MongoDB (Economy) fechada")
 
 async def setup(bot):
     await bot.add_cog(EconomySystem(bot))
\ No newline at end of file
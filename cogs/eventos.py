@@ -1,19 +1,18 @@
 import discord
 from discord.ext import commands
 import datetime
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
-
-MONGO_URI = os.getenv("MONGO_URI")
 
 class Eventos(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.db = AsyncIOMotorClient(MONGO_URI)["eventos_bot"]
+        self.db = bot.mongo.get_database("eventos_bot")
 
     async def get_config(self, guild_id):
         """Retorna configuração do servidor"""
-        config = await self.db.config.find_one({"guild_id": str(guild_id)})
+        config = await self.bot.mongo.config_cache.get_or_load(
+            self.db.config, guild_id,
+            lambda: self.db.config.find_one({"guild_id": str(guild_id)})
+        )
         return config or {}
 
     async def check_event_channel(self, ctx):
@@ -40,6 +39,7 @@ class Eventos(commands.Cog):
             {"$set": {"event_channel": str(canal.id)}},
             upsert=True
         )
+        self.bot.mongo.config_cache.invalidate(self.db.config, ctx.guild.id)
         
         embed = discord.Embed(
             title="⚙️ Configuração Atualizada",
@@ -60,6 +60,7 @@ class Eventos(commands.Cog):
             {"$set": {"announce_channel": str(canal.id)}},
             upsert=True
         )
+        self.bot.mongo.config_cache.invalidate(self.db.config, ctx.guild.id)
         
         embed = discord.Embed(
             title="📢 Configuração Atualizada",
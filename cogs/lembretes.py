@@ -2,18 +2,205 @@ import discord
 from discord.ext import commands, tasks
 import asyncio
 import datetime
+import heapq
 import os
+from bson import ObjectId
 from dotenv import load_dotenv
 
 # Carrega as variáveis de ambiente
 load_dotenv()
 
 class Lembretes(commands.Cog):
+    # Lembretes com vencimento dentro desta janela ficam na heap em memória
+    JANELA = datetime.timedelta(minutes=10)
+    # Entregas por lote e pausa entre lotes (respeita o rate limit de DMs)
+    LOTE_MAXIMO = 10
+    INTERVALO_LOTE = 1.0
+
     def __init__(self, bot):
         self.bot = bot
+        self.client = None
+        self.db = None
+        self.lembretes_collection = None
+        self._connection_ready = False
+        # Lembretes carregados: id -> documento, e a heap (tempo_execucao, id)
         self.lembretes_ativos = {}
+        self.heap = []
+        # Tudo que vence até aqui já está na heap
+        self.carregado_ate = None
+        self._proxima_carga = datetime.datetime.min
+        self._wakeup = asyncio.Event()
+        self.dispatcher_task = self.bot.loop.create_task(self.dispatcher())
+        self.bot.loop.create_task(self.init_database())
         print("✅ Cog Lembretes carregado com sucesso")
 
+    async def init_database(self):
+        """Inicializa a conexão com MongoDB"""
+        try:
+            if not self.bot.mongo.is_configured:
+                print("❌ MONGO_URI não encontrada! Lembretes ficarão só em memória")
+                return
+            
+            self.client = self.bot.mongo.client
+            await self.bot.mongo.ping()
+            
+            self.db = self.bot.mongo.get_database('discord_bot')
+            self.lembretes_collection = self.db['lembretes']
+            
+            # Índices: vencimento (dispatcher) e usuário (listar/cancelar)
+            await self.lembretes_collection.create_index("tempo_execucao")
+            await self.lembretes_collection.create_index([("user_id", 1), ("tempo_execucao", 1)])
+            
+            self._connection_ready = True
+            self._proxima_carga = datetime.datetime.min
+            self._wakeup.set()
+            print("✅ Lembretes conectado ao MongoDB!")
+        except Exception as e:
+            print(f"❌ Erro ao conectar Lembretes: {e}")
+            self._connection_ready = False
+
+    async def ensure_connection(self):
+        """Garante conexão ativa"""
+        # Falha rápido enquanto o circuito do MongoDB estiver aberto
+        if not await self.bot.mongo.available():
+            return False
+        if not self._connection_ready:
+            await self.init_database()
+        return self._connection_ready
+
+    def agendar(self, lembrete):
+        """Coloca um lembrete na heap (ignora se já estiver carregado)"""
+        lembrete_id = str(lembrete['_id'])
+        if lembrete_id in self.lembretes_ativos:
+            return
+        self.lembretes_ativos[lembrete_id] = lembrete
+        heapq.heappush(self.heap, (lembrete['tempo_execucao'], lembrete_id))
+        # Acorda o dispatcher se esse lembrete for o próximo
+        if self.heap[0][1] == lembrete_id:
+            self._wakeup.set()
+
+    def desagendar(self, lembrete_id):
+        """Remove um lembrete carregado (a entrada antiga na heap é ignorada ao sair)"""
+        self.lembretes_ativos.pop(str(lembrete_id), None)
+
+    async def carregar_janela(self):
+        """Carrega na heap os lembretes que vencem até o fim da próxima janela"""
+        inicio = self.carregado_ate
+        fim = datetime.datetime.now() + self.JANELA
+        # Avança antes da consulta: lembretes criados durante a carga já entram direto na heap
+        self.carregado_ate = fim
+        
+        query = {'tempo_execucao': {'$lte': fim}}
+        if inicio is not None:
+            query['tempo_execucao']['$gt'] = inicio
+        try:
+            async for lembrete in self.lembretes_collection.find(query).sort('tempo_execucao', 1):
+                self.agendar(lembrete)
+        except Exception:
+            self.carregado_ate = inicio
+            raise
+
+    async def dispatcher(self):
+        """Tarefa única que entrega os lembretes vencidos, em lotes"""
+        await self.bot.wait_until_ready()
+        while True:
+            self._wakeup.clear()
+            agora = datetime.datetime.now()
+            
+            # Recarrega a janela um pouco antes de ela acabar
+            limite_carga = self.carregado_ate - self.JANELA / 2 if self.carregado_ate else agora
+            if agora >= max(limite_carga, self._proxima_carga):
+                if await self.ensure_connection():
+                    try:
+                        await self.carregar_janela()
+                    except Exception as e:
+                        print(f"❌ Erro ao carregar lembretes: {e}")
+                        self._proxima_carga = agora + datetime.timedelta(seconds=30)
+                else:
+                    self._proxima_carga = agora + datetime.timedelta(seconds=30)
+                continue
+            
+            lote = []
+            while self.heap and self.heap[0][0] <= agora and len(lote) < self.LOTE_MAXIMO:
+                _, lembrete_id = heapq.heappop(self.heap)
+                lembrete = self.lembretes_ativos.pop(lembrete_id, None)
+                if lembrete:  # None = cancelado depois de agendado
+                    lote.append(lembrete)
+            
+            if lote:
+                await self.entregar_lote(lote)
+                await asyncio.sleep(self.INTERVALO_LOTE)
+                continue
+            if self.heap and self.heap[0][0] <= agora:
+                continue
+            
+            proximos = [max(limite_carga, self._proxima_carga)]
+            if self.heap:
+                proximos.append(self.heap[0][0])
+            delay = min((min(proximos) - agora).total_seconds(), 3600)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(delay, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    async def entregar_lote(self, lote):
+        """Envia um lote de lembretes em paralelo e apaga os entregues do banco"""
+        resultados = await asyncio.gather(
+            *(self._executar_lembrete(lembrete) for lembrete in lote),
+            return_exceptions=True
+        )
+        for lembrete, resultado in zip(lote, resultados):
+            if isinstance(resultado, Exception):
+                print(f"❌ Erro ao executar lembrete {lembrete['_id']}: {resultado}")
+        
+        # Remove mesmo os que falharam (mesmo comportamento de antes)
+        if self._connection_ready:
+            try:
+                await self.lembretes_collection.delete_many(
+                    {'_id': {'$in': [lembrete['_id'] for lembrete in lote]}}
+                )
+            except Exception as e:
+                print(f"❌ Erro ao remover lembretes entregues: {e}")
+
+    async def _executar_lembrete(self, lembrete):
+        """Entrega um lembrete por DM ou no canal original"""
+        user = self.bot.get_user(lembrete['user_id'])
+        if not user:
+            user = await self.bot.fetch_user(lembrete['user_id'])
+        
+        mensagem = f"⏰ **Lembrete:** {lembrete['mensagem']}"
+        
+        # Tenta enviar por DM primeiro
+        try:
+            await user.send(mensagem)
+            print(f"✅ Lembrete enviado por DM: {lembrete['_id']}")
+        except discord.Forbidden:
+            # Se falhar, envia no canal original
+            channel = self.bot.get_channel(lembrete['channel_id'])
+            if channel:
+                await channel.send(f"{user.mention} {mensagem}")
+                print(f"✅ Lembrete enviado no canal: {lembrete['_id']}")
+
+    async def lembretes_do_usuario(self, user_id, limite=None, pular=0):
+        """Lembretes pendentes do usuário em ordem de vencimento"""
+        if await self.ensure_connection():
+            cursor = self.lembretes_collection.find({'user_id': user_id}).sort('tempo_execucao', 1).skip(pular)
+            if limite:
+                cursor = cursor.limit(limite)
+            return await cursor.to_list(length=limite)
+        
+        # Sem banco: só os lembretes em memória
+        lembretes = sorted(
+            (l for l in self.lembretes_ativos.values() if l['user_id'] == user_id),
+            key=lambda l: l['tempo_execucao']
+        )
+        return lembretes[pular:pular + limite] if limite else lembretes[pular:]
+
+    async def contar_lembretes(self, user_id):
+        if await self.ensure_connection():
+            return await self.lembretes_collection.count_documents({'user_id': user_id})
+        return sum(1 for l in self.lembretes_ativos.values() if l['user_id'] == user_id)
+
     @commands.command(name="lembrete")
     async def lembrete(self, ctx, tempo: int, *, mensagem):
         """Define um lembrete que será enviado após X minutos"""
@@ -31,21 +218,26 @@ class Lembretes(commands.Cog):
         agora = datetime.datetime.now()
         tempo_execucao = agora + datetime.timedelta(minutes=tempo)
         
-        # Cria um ID único para o lembrete
-        lembrete_id = f"{ctx.author.id}_{int(agora.timestamp())}"
-        
-        # Armazena o lembrete
-        self.lembretes_ativos[lembrete_id] = {
+        lembrete = {
+            '_id': ObjectId(),
             'user_id': ctx.author.id,
             'channel_id': ctx.channel.id,
             'mensagem': mensagem,
             'tempo_execucao': tempo_execucao,
-            'task': None
+            'criado_em': agora
         }
         
-        # Cria e inicia a task do lembrete
-        task = asyncio.create_task(self._executar_lembrete_task(lembrete_id, tempo * 60))
-        self.lembretes_ativos[lembrete_id]['task'] = task
+        salvo = False
+        if await self.ensure_connection():
+            try:
+                await self.lembretes_collection.insert_one(lembrete)
+                salvo = True
+            except Exception as e:
+                print(f"❌ Erro ao salvar lembrete: {e}")
+        
+        # Fora da janela carregada o dispatcher busca no banco na hora certa
+        if not salvo or (self.carregado_ate is not None and tempo_execucao <= self.carregado_ate):
+            self.agendar(lembrete)
         
         # Confirma que o lembrete foi criado
         embed = discord.Embed(
@@ -63,59 +255,16 @@ class Lembretes(commands.Cog):
             value=f"{tempo} minutos",
             inline=False
         )
+        if not salvo:
+            embed.set_footer(text="⚠️ Banco indisponível: este lembrete não sobrevive a um reinício")
         
         await ctx.send(embed=embed)
-        print(f"📝 Lembrete criado: {lembrete_id} - {mensagem}")
-
-    async def _executar_lembrete_task(self, lembrete_id, segundos):
-        """Task que aguarda e executa o lembrete"""
-        try:
-            # Aguarda o tempo especificado
-            await asyncio.sleep(segundos)
-            
-            # Verifica se o lembrete ainda existe (não foi cancelado)
-            if lembrete_id not in self.lembretes_ativos:
-                return
-            
-            lembrete = self.lembretes_ativos[lembrete_id]
-            
-            # Busca o usuário
-            user = self.bot.get_user(lembrete['user_id'])
-            if not user:
-                user = await self.bot.fetch_user(lembrete['user_id'])
-            
-            mensagem = f"⏰ **Lembrete:** {lembrete['mensagem']}"
-            
-            # Tenta enviar por DM primeiro
-            try:
-                await user.send(mensagem)
-                print(f"✅ Lembrete enviado por DM: {lembrete_id}")
-            except discord.Forbidden:
-                # Se falhar, envia no canal original
-                channel = self.bot.get_channel(lembrete['channel_id'])
-                if channel:
-                    await channel.send(f"{user.mention} {mensagem}")
-                    print(f"✅ Lembrete enviado no canal: {lembrete_id}")
-            
-            # Remove o lembrete da lista de ativos
-            del self.lembretes_ativos[lembrete_id]
-            
-        except asyncio.CancelledError:
-            print(f"❌ Lembrete cancelado: {lembrete_id}")
-        except Exception as e:
-            print(f"❌ Erro ao executar lembrete {lembrete_id}: {e}")
-            # Remove o lembrete mesmo em caso de erro
-            if lembrete_id in self.lembretes_ativos:
-                del self.lembretes_ativos[lembrete_id]
+        print(f"📝 Lembrete criado: {lembrete['_id']} - {mensagem}")
 
     @commands.command(name="meuslembretes")
     async def meuslembretes(self, ctx):
         """Lista todos os lembretes ativos do usuário"""
-        lembretes_usuario = []
-        
-        for lembrete_id, lembrete in self.lembretes_ativos.items():
-            if lembrete['user_id'] == ctx.author.id:
-                lembretes_usuario.append((lembrete_id, lembrete))
+        lembretes_usuario = await self.lembretes_do_usuario(ctx.author.id, limite=5)
         
         if not lembretes_usuario:
             await ctx.send("📭 Você não tem lembretes ativos.")
@@ -126,7 +275,7 @@ class Lembretes(commands.Cog):
             color=0x0099ff
         )
         
-        for i, (lembrete_id, lembrete) in enumerate(lembretes_usuario[:5], 1):
+        for i, lembrete in enumerate(lembretes_usuario, 1):
             mensagem = lembrete['mensagem']
             tempo_execucao = lembrete['tempo_execucao']
             
@@ -140,8 +289,9 @@ class Lembretes(commands.Cog):
                 inline=False
             )
         
-        if len(lembretes_usuario) > 5:
-            embed.set_footer(text=f"Mostrando 5 de {len(lembretes_usuario)} lembretes ativos")
+        total = await self.contar_lembretes(ctx.author.id)
+        if total > 5:
+            embed.set_footer(text=f"Mostrando 5 de {total} lembretes ativos")
         
         await ctx.send(embed=embed)
 
@@ -152,45 +302,41 @@ class Lembretes(commands.Cog):
             await ctx.send("⚠️ Uso: `!cancelarlembrete <número>`\nUse `!meuslembretes` para ver os números.")
             return
         
-        lembretes_usuario = []
-        for lembrete_id, lembrete in self.lembretes_ativos.items():
-            if lembrete['user_id'] == ctx.author.id:
-                lembretes_usuario.append((lembrete_id, lembrete))
+        # Mesma ordem de !meuslembretes (por vencimento)
+        encontrados = await self.lembretes_do_usuario(ctx.author.id, limite=1, pular=numero - 1) if numero >= 1 else []
         
-        if not lembretes_usuario or numero < 1 or numero > len(lembretes_usuario):
+        if not encontrados:
             await ctx.send("❌ Número de lembrete inválido. Use `!meuslembretes` para ver seus lembretes.")
             return
         
-        lembrete_id, lembrete = lembretes_usuario[numero - 1]
-        
-        # Cancela a task
-        if lembrete['task']:
-            lembrete['task'].cancel()
-        
-        # Remove da lista
-        del self.lembretes_ativos[lembrete_id]
+        lembrete = encontrados[0]
+        if await self.ensure_connection():
+            try:
+                await self.lembretes_collection.delete_one({'_id': lembrete['_id']})
+            except Exception as e:
+                # Continua no banco: desagendar agora só o faria voltar na próxima carga
+                print(f"❌ Erro ao cancelar lembrete: {e}")
+                await ctx.send("❌ Não foi possível cancelar o lembrete agora. Tente novamente em instantes.")
+                return
+        self.desagendar(lembrete['_id'])
         
         await ctx.send(f"✅ Lembrete #{numero} cancelado com sucesso!")
 
     @commands.command(name="limparlembretes")
     async def limpar_lembretes(self, ctx):
         """Cancela todos os lembretes do usuário"""
-        cancelados = 0
-        
-        # Cria uma lista dos IDs para evitar modificar durante iteração
-        ids_para_remover = []
-        
-        for lembrete_id, lembrete in self.lembretes_ativos.items():
-            if lembrete['user_id'] == ctx.author.id:
-                ids_para_remover.append(lembrete_id)
-        
-        # Cancela e remove cada lembrete
+        ids_para_remover = [
+            lembrete_id for lembrete_id, lembrete in self.lembretes_ativos.items()
+            if lembrete['user_id'] == ctx.author.id
+        ]
         for lembrete_id in ids_para_remover:
-            lembrete = self.lembretes_ativos[lembrete_id]
-            if lembrete['task']:
-                lembrete['task'].cancel()
-            del self.lembretes_ativos[lembrete_id]
-            cancelados += 1
+            self.desagendar(lembrete_id)
+        cancelados = len(ids_para_remover)
+        
+        if await self.ensure_connection():
+            result = await self.lembretes_collection.delete_many({'user_id': ctx.author.id})
+            # Os carregados em memória também estão no banco
+            cancelados = max(cancelados, result.deleted_count)
         
         if cancelados > 0:
             await ctx.send(f"✅ {cancelados} lembrete(s) cancelado(s) com sucesso!")
@@ -198,12 +344,11 @@ class Lembretes(commands.Cog):
             await ctx.send("📭 Você não tinha lembretes ativos para cancelar.")
 
     def cog_unload(self):
-        """Cancela todas as tasks quando o cog é descarregado"""
+        """Para o dispatcher quando o cog é descarregado (os lembretes ficam no banco)"""
         print("🔄 Descarregando cog Lembretes...")
-        for lembrete in self.lembretes_ativos.values():
-            if lembrete['task']:
-                lembrete['task'].cancel()
+        self.dispatcher_task.cancel()
         self.lembretes_ativos.clear()
+        self.heap.clear()
 
 
 async def setup(bot):
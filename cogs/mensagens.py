@@ -2,9 +2,12 @@ import discord
 from discord.ext import commands, tasks
 import json
 import os
+import time
+import heapq
 from datetime import datetime
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from pymongo.errors import ConnectionFailure
 
 class Mensagens(commands.Cog):
     def __init__(self, bot):
@@ -15,28 +18,36 @@ class Mensagens(commands.Cog):
         self.collection = None
         self._connection_ready = False
         self.mensagens = {}
-        self.tarefas_ativas = {}
+        # Heap (next_run, nome) consumida por um único agendador
+        self.fila = []
+        self._wakeup = asyncio.Event()
+        # Envios ainda não gravados no MongoDB: nome -> {'envios': n, 'next_run': t}
+        self.envios_pendentes = {}
+        self._json_sujo = False
+        self._json_lock = asyncio.Lock()
+        
+        self.load_data()
+        self.agendar_todas()
+        self.agendador_task = self.bot.loop.create_task(self.agendador())
+        self.flush_envios.start()
         
         # Inicializa a conexão com MongoDB
         self.bot.loop.create_task(self.init_database())
-        self.load_data()
     
     async def init_database(self):
         """Inicializa a conexão com MongoDB"""
         try:
-            mongo_uri = os.getenv("MONGO_URI")
-            
-            if not mongo_uri:
+            if not self.bot.mongo.is_configured:
                 print("❌ MONGO_URI não encontrada nas variáveis de ambiente!")
                 return
             
             print("🔄 Conectando ao MongoDB...")
-            self.client = AsyncIOMotorClient(mongo_uri)
+            self.client = self.bot.mongo.client
             
             # Testa a conexão
-            await self.client.admin.command('ping')
+            await self.bot.mongo.ping()
             
-            self.db = self.client['discord_bot']
+            self.db = self.bot.mongo.get_database('discord_bot')
             self.collection = self.db['mensagens_automaticas']
             self._connection_ready = True
             
@@ -44,7 +55,7 @@ class Mensagens(commands.Cog):
             
             # Carrega dados do MongoDB após conexão
             await self.load_from_mongodb()
-            self.iniciar_tarefas()
+            self.agendar_todas()
             
         except Exception as e:
             print(f"❌ Erro ao conectar MongoDB: {e}")
@@ -52,6 +63,9 @@ class Mensagens(commands.Cog):
 
     async def ensure_connection(self):
         """Garante que a conexão com MongoDB está ativa"""
+        # Falha rápido enquanto o circuito do MongoDB estiver aberto
+        if not await self.bot.mongo.available():
+            return False
         if not self._connection_ready:
             await self.init_database()
         return self._connection_ready
@@ -67,8 +81,22 @@ class Mensagens(commands.Cog):
     
     def save_data(self):
         """Salva dados no arquivo JSON (fallback)"""
-        with open(self.data_file, 'w', encoding='utf-8') as f:
-            json.dump(self.mensagens, f, indent=2, ensure_ascii=False)
+        self._write_json(json.dumps(self.mensagens, indent=2, ensure_ascii=False))
+
+    def _write_json(self, conteudo):
+        # Arquivo temporário + replace: um reinício no meio não corrompe o JSON
+        temporario = f"{self.data_file}.tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            f.write(conteudo)
+        os.replace(temporario, self.data_file)
+
+    async def save_data_async(self):
+        """Salva o JSON numa thread, sem bloquear o event loop"""
+        async with self._json_lock:
+            self._json_sujo = False
+            # Serializa no loop (snapshot consistente) e só a escrita vai para a thread
+            conteudo = json.dumps(self.mensagens, indent=2, ensure_ascii=False)
+            await asyncio.to_thread(self._write_json, conteudo)
 
     async def load_from_mongodb(self):
         """Carrega todas as mensagens do MongoDB"""
@@ -80,6 +108,13 @@ class Mensagens(commands.Cog):
             async for documento in cursor:
                 nome = documento['_id']
                 documento.pop('_id')
+                # Envios ainda não gravados no banco continuam valendo
+                pendente = self.envios_pendentes.get(nome)
+                if pendente:
+                    documento['envios'] = documento.get('envios', 0) + pendente['envios']
+                    documento['next_run'] = pendente['next_run']
+                elif nome in self.mensagens and 'next_run' not in documento:
+                    documento['next_run'] = self.mensagens[nome].get('next_run')
                 self.mensagens[nome] = documento
                 
         except Exception as e:
@@ -101,7 +136,8 @@ class Mensagens(commands.Cog):
                 'autor_id': dados['autor_id'],
                 'data_criacao': dados['data_criacao'],
                 'ativo': dados['ativo'],
-                'envios': dados['envios']
+                'envios': dados['envios'],
+                'next_run': dados.get('next_run')
             }
             
             await self.collection.replace_one(
@@ -128,58 +164,132 @@ class Mensagens(commands.Cog):
             print(f"❌ Erro ao deletar do MongoDB: {e}")
             return False
 
-    async def update_envios_mongodb(self, nome, envios):
-        """Atualiza apenas o contador de envios no MongoDB"""
-        try:
-            if not await self.ensure_connection():
-                return
-                
-            await self.collection.update_one(
+    async def flush_envios_pendentes(self):
+        """Grava os contadores de envio e os next_run acumulados num único bulk_write"""
+        if self._json_sujo:
+            await self.save_data_async()
+        
+        if not self.envios_pendentes:
+            return 0
+        
+        # Com o circuito aberto os envios ficam acumulados em memória
+        if not await self.ensure_connection():
+            return 0
+        
+        pendentes, self.envios_pendentes = self.envios_pendentes, {}
+        operacoes = [
+            UpdateOne(
                 {'_id': nome},
-                {'$set': {'envios': envios}}
+                {'$inc': {'envios': pendente['envios']}, '$set': {'next_run': pendente['next_run']}}
             )
-            
+            for nome, pendente in pendentes.items()
+        ]
+        
+        try:
+            await self.collection.bulk_write(operacoes, ordered=False)
+        except asyncio.CancelledError:
+            self.reenfileirar_envios(pendentes)
+            raise
         except Exception as e:
-            print(f"❌ Erro ao atualizar envios: {e}")
-    
-    def iniciar_tarefas(self):
-        """Inicia todas as tarefas automáticas salvas"""
+            print(f"❌ Erro ao atualizar envios ({len(operacoes)} mensagens): {e}")
+            if isinstance(e, ConnectionFailure):
+                self.bot.mongo.record_failure(e)
+            self.reenfileirar_envios(pendentes)
+            return 0
+        
+        return len(operacoes)
+
+    def reenfileirar_envios(self, pendentes):
+        """Devolve envios que não foram gravados, somando com os novos"""
+        for nome, pendente in pendentes.items():
+            if nome not in self.mensagens:
+                continue
+            atual = self.envios_pendentes.get(nome)
+            if atual:
+                atual['envios'] += pendente['envios']
+            else:
+                self.envios_pendentes[nome] = pendente
+
+    @tasks.loop(seconds=30)
+    async def flush_envios(self):
+        await self.flush_envios_pendentes()
+
+    @flush_envios.before_loop
+    async def before_flush_envios(self):
+        await self.bot.wait_until_ready()
+
+    def agendar(self, nome, dados):
+        """Coloca a mensagem na heap, definindo next_run se ainda não existir"""
+        if not dados.get('ativo', True):
+            return
+        if not dados.get('next_run'):
+            # Mensagens antigas (sem next_run) começam a contar agora, e o horário é gravado
+            dados['next_run'] = time.time() + dados['intervalo'] * 3600
+            pendente = self.envios_pendentes.setdefault(nome, {'envios': 0, 'next_run': None})
+            pendente['next_run'] = dados['next_run']
+            self._json_sujo = True
+        heapq.heappush(self.fila, (dados['next_run'], nome))
+        # Acorda o agendador se essa mensagem for a próxima
+        if self.fila[0][1] == nome:
+            self._wakeup.set()
+
+    def agendar_todas(self):
+        """Reconstrói a heap a partir de todas as mensagens carregadas"""
+        self.fila = []
         for nome, dados in self.mensagens.items():
-            if dados.get('ativo', True):
-                self.criar_tarefa(nome, dados)
-    
-    def criar_tarefa(self, nome, dados):
-        """Cria uma tarefa automática para enviar mensagens"""
-        async def enviar_mensagem_automatica():
-            while True:
+            self.agendar(nome, dados)
+        self._wakeup.set()
+
+    def proximo_envio(self, dados, agora):
+        """Próximo horário mantendo a fase do intervalo (pula os perdidos com o bot fora)"""
+        intervalo = dados['intervalo'] * 3600
+        proximo = dados['next_run'] + intervalo
+        if proximo <= agora:
+            proximo += ((agora - proximo) // intervalo + 1) * intervalo
+        return proximo
+
+    async def agendador(self):
+        """Tarefa única que dorme até a próxima mensagem vencer e a envia"""
+        await self.bot.wait_until_ready()
+        while True:
+            self._wakeup.clear()
+            agora = time.time()
+            
+            if not self.fila or self.fila[0][0] > agora:
+                # Limite de 1h para corrigir eventuais ajustes de relógio
+                delay = min(self.fila[0][0] - agora, 3600) if self.fila else None
                 try:
-                    await asyncio.sleep(dados['intervalo'] * 3600)
-                    
-                    if nome not in self.mensagens or not self.mensagens[nome].get('ativo', True):
-                        break
-                    
-                    canal = self.bot.get_channel(dados['canal_id'])
-                    if canal:
-                        await canal.send(dados['mensagem'])
-                        
-                        self.mensagens[nome]['envios'] = self.mensagens[nome].get('envios', 0) + 1
-                        self.save_data()
-                        
-                        await self.update_envios_mongodb(nome, self.mensagens[nome]['envios'])
-                
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            next_run, nome = heapq.heappop(self.fila)
+            dados = self.mensagens.get(nome)
+            
+            # Entrada obsoleta: mensagem removida ou reagendada
+            if not dados or not dados.get('ativo', True) or dados.get('next_run') != next_run:
+                continue
+            
+            # Reagenda antes de enviar: um erro no envio não para a mensagem
+            dados['next_run'] = self.proximo_envio(dados, agora)
+            heapq.heappush(self.fila, (dados['next_run'], nome))
+            
+            canal = self.bot.get_channel(dados['canal_id'])
+            enviado = 0
+            if canal:
+                try:
+                    await canal.send(dados['mensagem'])
+                    enviado = 1
                 except Exception as e:
                     print(f"❌ Erro mensagem automática '{nome}': {e}")
-                    break
-        
-        tarefa = asyncio.create_task(enviar_mensagem_automatica())
-        self.tarefas_ativas[nome] = tarefa
-    
-    def parar_tarefa(self, nome):
-        """Para uma tarefa específica"""
-        if nome in self.tarefas_ativas:
-            self.tarefas_ativas[nome].cancel()
-            del self.tarefas_ativas[nome]
-    
+            
+            dados['envios'] = dados.get('envios', 0) + enviado
+            pendente = self.envios_pendentes.setdefault(nome, {'envios': 0, 'next_run': None})
+            pendente['envios'] += enviado
+            pendente['next_run'] = dados['next_run']
+            self._json_sujo = True
+
     @commands.command(name='adicionarmensagem', aliases=['addmsg'])
     @commands.has_permissions(manage_messages=True)
     async def adicionar_mensagem(self, ctx, horas: float, *, mensagem):
@@ -218,14 +328,12 @@ class Mensagens(commands.Cog):
         }
         
         self.mensagens[nome] = dados_mensagem
-        self.save_data()
+        self.agendar(nome, dados_mensagem)
+        await self.save_data_async()
         
         # Salva no MongoDB
         success = await self.save_to_mongodb(nome, dados_mensagem)
         
-        # Inicia a tarefa
-        self.criar_tarefa(nome, dados_mensagem)
-        
         embed = discord.Embed(
             title="✅ Mensagem Automática Adicionada",
             description=f"Mensagem será enviada a cada **{horas}h** no canal {ctx.channel.mention}",
@@ -272,9 +380,10 @@ class Mensagens(commands.Cog):
             await ctx.send(embed=embed)
             return
         
-        self.parar_tarefa(nome_encontrado)
+        # A entrada na heap fica obsoleta e é ignorada pelo agendador
         del self.mensagens[nome_encontrado]
-        self.save_data()
+        self.envios_pendentes.pop(nome_encontrado, None)
+        await self.save_data_async()
         
         success = await self.delete_from_mongodb(nome_encontrado)
         
@@ -432,13 +541,10 @@ class Mensagens(commands.Cog):
             await ctx.send(embed=embed)
     
     async def cog_unload(self):
-        """Para todas as tarefas quando o cog é descarregado"""
-        for tarefa in self.tarefas_ativas.values():
-            tarefa.cancel()
-        
-        if self.client:
-            self.client.close()
-            print("🔌 Conexão MongoDB fechada - Sistema de Mensagens")
+        """Para o agendador e grava os envios pendentes"""
+        self.agendador_task.cancel()
+        self.flush_envios.cancel()
+        await self.flush_envios_pendentes()
 
 async def setup(bot):
     await bot.add_cog(Mensagens(bot))
\ No newline at end of file
@@ -1,9 +1,10 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import asyncio
+import heapq
 from datetime import datetime, timedelta
-import os
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError
 
 class ModerationSystem(commands.Cog):
     def __init__(self, bot):
@@ -12,30 +13,52 @@ class ModerationSystem(commands.Cog):
         self.db = None
         self.mod_data = None
         self.mod_config = None
+        self.warnings = None
+        self.mutes = None
+        self.actions = None
         self._connection_ready = False
+        # Mutes ativos: (guild_id, user_id) -> expires, e a heap (expires, guild_id, user_id)
+        self.pending_mutes = {}
+        self.mute_heap = []
+        self._mute_wakeup = asyncio.Event()
+        self.mute_task = None
         self.bot.loop.create_task(self.init_database())
-        self.check_mutes.start()
 
     async def init_database(self):
         """Inicializa a conexão com MongoDB"""
         try:
-            mongo_uri = os.getenv("MONGO_URI")
-            if not mongo_uri:
+            if not self.bot.mongo.is_configured:
                 print("❌ MONGO_URI não encontrada!")
                 return
             
             print("🔄 Conectando ao MongoDB...")
-            self.client = AsyncIOMotorClient(mongo_uri)
-            await self.client.admin.command('ping')
+            self.client = self.bot.mongo.client
+            await self.bot.mongo.ping()
             
-            self.db = self.client['discord_bot']
-            self.mod_data = self.db['moderation_data']
+            self.db = self.bot.mongo.get_database('discord_bot')
+            self.mod_data = self.db['moderation_data']  # formato antigo (um documento por guild)
             self.mod_config = self.db['moderation_config']
-            self._connection_ready = True
+            self.warnings = self.db['moderation_warnings']
+            self.mutes = self.db['moderation_mutes']
+            self.actions = self.db['moderation_actions']
             
             # Criar índices
-            await self.mod_data.create_index("guild_id")
             await self.mod_config.create_index("guild_id")
+            user_timeline = [("guild_id", ASCENDING), ("user_id", ASCENDING), ("timestamp", ASCENDING)]
+            await self.warnings.create_index(user_timeline)
+            await self.mutes.create_index(user_timeline)
+            await self.mutes.create_index([("guild_id", ASCENDING), ("user_id", ASCENDING)], unique=True)
+            await self.mutes.create_index("expires")
+            await self.actions.create_index(user_timeline)
+            await self.actions.create_index([("guild_id", ASCENDING), ("timestamp", DESCENDING)])
+            
+            await self.migrate_legacy_data()
+            self._connection_ready = True
+            
+            # Carrega os mutes pendentes e inicia o agendador de desmutes
+            await self.load_pending_mutes()
+            if self.mute_task is None or self.mute_task.done():
+                self.mute_task = asyncio.create_task(self.mute_scheduler())
             
             print("✅ Conectado ao MongoDB!")
         except Exception as e:
@@ -44,40 +67,262 @@ class ModerationSystem(commands.Cog):
 
     async def ensure_connection(self):
         """Garante conexão ativa"""
+        # Falha rápido enquanto o circuito do MongoDB estiver aberto
+        if not await self.bot.mongo.available():
+            return False
         if not self._connection_ready:
             await self.init_database()
         return self._connection_ready
 
-    async def get_guild_data(self, guild_id):
-        """Obtém dados de moderação"""
+    @staticmethod
+    def parse_timestamp(value):
+        """Converte timestamps ISO do formato antigo em datetime"""
+        if isinstance(value, datetime):
+            return value
+        try:
+            return datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            return datetime.now()
+
+    async def migrate_legacy_data(self):
+        """Converte os documentos antigos de moderation_data (uma vez por guild)
+
+        Os _id são derivados da posição no documento antigo, então rodar de novo
+        após uma interrupção não duplica nada.
+        """
+        migrated = 0
+        async for doc in self.mod_data.find({"migrated": {"$ne": True}}):
+            guild_id = str(doc['guild_id'])
+            warnings = []
+            for user_id, user_warnings in (doc.get('warnings') or {}).items():
+                for i, warning in enumerate(user_warnings):
+                    warnings.append({
+                        '_id': f"legacy:{guild_id}:{user_id}:{i}",
+                        'guild_id': guild_id,
+                        'user_id': str(user_id),
+                        'reason': warning.get('reason'),
+                        'moderator': warning.get('moderator'),
+                        'timestamp': self.parse_timestamp(warning.get('timestamp'))
+                    })
+            
+            actions = []
+            for i, entry in enumerate(doc.get('logs') or []):
+                actions.append({
+                    '_id': f"legacy:{guild_id}:{i}",
+                    'guild_id': guild_id,
+                    'user_id': str(entry.get('target_id')),
+                    'action': entry.get('action'),
+                    'moderator_id': entry.get('moderator_id'),
+                    'reason': entry.get('reason'),
+                    'duration': entry.get('duration'),
+                    'timestamp': self.parse_timestamp(entry.get('timestamp'))
+                })
+            
+            for collection, documents in ((self.warnings, warnings), (self.actions, actions)):
+                if not documents:
+                    continue
+                try:
+                    await collection.insert_many(documents, ordered=False)
+                except BulkWriteError as e:
+                    # 11000 = já migrado numa execução anterior
+                    if any(err.get('code') != 11000 for err in e.details.get('writeErrors', [])):
+                        raise
+            
+            for mute_key, mute in (doc.get('mutes') or {}).items():
+                user_id = mute_key.split('_')[-1]
+                await self.mutes.update_one(
+                    {'guild_id': guild_id, 'user_id': user_id},
+                    {'$setOnInsert': {
+                        'reason': mute.get('reason'),
+                        'expires': self.parse_timestamp(mute.get('expires')),
+                        'timestamp': datetime.now()
+                    }},
+                    upsert=True
+                )
+            
+            await self.mod_data.update_one(
+                {'_id': doc['_id']},
+                {'$set': {'migrated': True}, '$unset': {'warnings': "", 'mutes': "", 'logs': ""}}
+            )
+            migrated += 1
+        
+        if migrated:
+            print(f"📦 Moderação: {migrated} guild(s) migrada(s) para o novo formato")
+
+    async def add_warning(self, guild_id, user_id, reason, moderator_id):
+        """Registra um aviso e retorna o total de avisos do usuário"""
         if not await self.ensure_connection():
-            return {'guild_id': str(guild_id), 'warnings': {}, 'mutes': {}, 'logs': []}
+            return 0
         
-        guild_id = str(guild_id)
-        data = await self.mod_data.find_one({"guild_id": guild_id})
+        guild_id, user_id = str(guild_id), str(user_id)
+        await self.warnings.insert_one({
+            'guild_id': guild_id,
+            'user_id': user_id,
+            'reason': reason,
+            'moderator': moderator_id,
+            'timestamp': datetime.now()
+        })
+        return await self.warnings.count_documents({'guild_id': guild_id, 'user_id': user_id})
+
+    async def get_warnings(self, guild_id, user_id, limit=25):
+        """Avisos do usuário em ordem cronológica"""
+        if not await self.ensure_connection():
+            return []
         
-        if not data:
-            default_data = {'guild_id': guild_id, 'warnings': {}, 'mutes': {}, 'logs': []}
-            await self.mod_data.insert_one(default_data)
-            return default_data
-        return data
+        cursor = self.warnings.find(
+            {'guild_id': str(guild_id), 'user_id': str(user_id)}
+        ).sort('timestamp', ASCENDING).limit(limit)
+        return await cursor.to_list(length=limit)
 
-    async def save_guild_data(self, guild_id, data):
-        """Salva dados de moderação"""
+    async def get_warning_counts(self, guild_id, limit=None):
+        """Lista (user_id, total) dos usuários com avisos, do maior para o menor"""
+        if not await self.ensure_connection():
+            return []
+        
+        pipeline = [
+            {'$match': {'guild_id': str(guild_id)}},
+            {'$group': {'_id': '$user_id', 'count': {'$sum': 1}}},
+            {'$sort': {'count': -1}}
+        ]
+        if limit:
+            pipeline.append({'$limit': limit})
+        return [(doc['_id'], doc['count']) async for doc in self.warnings.aggregate(pipeline)]
+
+    async def pop_warning(self, guild_id, user_id, index=None):
+        """Remove o aviso de número index (1 = mais antigo) ou o mais recente
+
+        Retorna (aviso removido, avisos restantes) ou (None, total) se o
+        índice não existir.
+        """
+        if not await self.ensure_connection():
+            return None, 0
+        
+        query = {'guild_id': str(guild_id), 'user_id': str(user_id)}
+        if index is None:
+            cursor = self.warnings.find(query).sort('timestamp', DESCENDING).limit(1)
+        elif index >= 1:
+            cursor = self.warnings.find(query).sort('timestamp', ASCENDING).skip(index - 1).limit(1)
+        else:
+            cursor = None
+        
+        found = await cursor.to_list(length=1) if cursor else []
+        if not found:
+            return None, await self.warnings.count_documents(query)
+        
+        await self.warnings.delete_one({'_id': found[0]['_id']})
+        return found[0], await self.warnings.count_documents(query)
+
+    async def load_pending_mutes(self):
+        """Carrega os mutes ativos (ordenados pelo índice de expires) para a heap"""
+        pending = {}
+        cursor = self.mutes.find({}, {'guild_id': 1, 'user_id': 1, 'expires': 1}).sort('expires', ASCENDING)
+        async for mute in cursor:
+            pending[(mute['guild_id'], mute['user_id'])] = mute['expires']
+        
+        self.mute_heap = [(expires, guild_id, user_id) for (guild_id, user_id), expires in pending.items()]
+        heapq.heapify(self.mute_heap)
+        self.pending_mutes = pending
+        self._mute_wakeup.set()
+        if pending:
+            print(f"🔇 {len(pending)} mutes pendentes carregados")
+
+    def schedule_unmute(self, guild_id, user_id, expires):
+        """Agenda (ou reagenda) o desmute do usuário"""
+        key = (str(guild_id), str(user_id))
+        self.pending_mutes[key] = expires
+        heapq.heappush(self.mute_heap, (expires, key[0], key[1]))
+        # Acorda o agendador se esse desmute for o próximo
+        if self.mute_heap[0][0] == expires:
+            self._mute_wakeup.set()
+
+    def unschedule_unmute(self, guild_id, user_id):
+        """Cancela o desmute agendado (a entrada antiga na heap é ignorada ao sair)"""
+        self.pending_mutes.pop((str(guild_id), str(user_id)), None)
+
+    async def mute_scheduler(self):
+        """Dorme até o próximo mute expirar e desmuta o usuário nesse instante"""
+        await self.bot.wait_until_ready()
+        while True:
+            self._mute_wakeup.clear()
+            
+            if self.mute_heap:
+                # Limite de 1h para corrigir eventuais ajustes de relógio
+                delay = min((self.mute_heap[0][0] - datetime.now()).total_seconds(), 3600)
+            else:
+                delay = None
+            
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._mute_wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            expires, guild_id, user_id = heapq.heappop(self.mute_heap)
+            
+            # Entrada obsoleta: mute renovado ou removido depois de agendado
+            if self.pending_mutes.get((guild_id, user_id)) != expires:
+                continue
+            
+            try:
+                await self.expire_mute(guild_id, user_id, expires)
+            except Exception as e:
+                print(f"❌ Erro ao desmutar {user_id} na guild {guild_id}: {e}")
+
+    async def expire_mute(self, guild_id, user_id, expires):
+        """Remove o cargo de mute e o registro de um mute expirado"""
+        self.unschedule_unmute(guild_id, user_id)
+        
+        guild = self.bot.get_guild(int(guild_id))
+        if guild:
+            member = guild.get_member(int(user_id))
+            mute_role = await self.find_mute_role(guild)
+            if member and mute_role and mute_role in member.roles:
+                try:
+                    await member.remove_roles(mute_role, reason="Mute expirado")
+                except discord.HTTPException:
+                    pass
+        
+        # Só remove se o mute não foi renovado nesse meio tempo
+        if await self.ensure_connection():
+            await self.mutes.delete_one({'guild_id': guild_id, 'user_id': user_id, 'expires': {'$lte': expires}})
+
+    async def set_mute(self, guild_id, user_id, expires, reason):
+        """Registra (ou substitui) o mute ativo do usuário"""
+        # Agenda mesmo com o banco fora: o cargo já foi aplicado
+        self.schedule_unmute(guild_id, user_id, expires)
         if not await self.ensure_connection():
             return False
         
-        guild_id = str(guild_id)
-        data['guild_id'] = guild_id
-        await self.mod_data.replace_one({"guild_id": guild_id}, data, upsert=True)
+        await self.mutes.update_one(
+            {'guild_id': str(guild_id), 'user_id': str(user_id)},
+            {'$set': {'expires': expires, 'reason': reason, 'timestamp': datetime.now()}},
+            upsert=True
+        )
         return True
 
+    async def remove_mute(self, guild_id, user_id):
+        """Remove o mute ativo do usuário"""
+        self.unschedule_unmute(guild_id, user_id)
+        if not await self.ensure_connection():
+            return False
+        
+        result = await self.mutes.delete_one({'guild_id': str(guild_id), 'user_id': str(user_id)})
+        return result.deleted_count > 0
+
     async def get_guild_config(self, guild_id):
         """Obtém configurações do servidor"""
         if not await self.ensure_connection():
             return {'guild_id': str(guild_id), 'mute_role_id': None, 'log_channel_id': None, 'max_warnings': 3, 'auto_punish': True}
         
         guild_id = str(guild_id)
+        return await self.bot.mongo.config_cache.get_or_load(
+            self.mod_config, guild_id,
+            lambda: self.load_guild_config(guild_id)
+        )
+
+    async def load_guild_config(self, guild_id):
+        """Lê configurações do banco, criando as padrão se não existirem"""
         config = await self.mod_config.find_one({"guild_id": guild_id})
         
         if not config:
@@ -93,24 +338,26 @@ class ModerationSystem(commands.Cog):
         
         guild_id = str(guild_id)
         config['guild_id'] = guild_id
-        await self.mod_config.replace_one({"guild_id": guild_id}, config, upsert=True)
+        try:
+            await self.mod_config.replace_one({"guild_id": guild_id}, config, upsert=True)
+        finally:
+            # O dict salvo pode ser o mesmo objeto do cache
+            self.bot.mongo.config_cache.invalidate(self.mod_config, guild_id)
         return True
 
     async def log_action(self, guild, action, moderator, target, reason=None, duration=None):
         config = await self.get_guild_config(guild.id)
-        guild_data = await self.get_guild_data(guild.id)
-        
-        log_entry = {
-            'action': action,
-            'moderator_id': moderator.id,
-            'target_id': target.id,
-            'reason': reason,
-            'duration': duration,
-            'timestamp': datetime.now().isoformat()
-        }
         
-        guild_data['logs'].append(log_entry)
-        await self.save_guild_data(guild.id, guild_data)
+        if await self.ensure_connection():
+            await self.actions.insert_one({
+                'guild_id': str(guild.id),
+                'user_id': str(target.id),
+                'action': action,
+                'moderator_id': moderator.id,
+                'reason': reason,
+                'duration': duration,
+                'timestamp': datetime.now()
+            })
         
         if config['log_channel_id']:
             channel = guild.get_channel(config['log_channel_id'])
@@ -131,22 +378,8 @@ class ModerationSystem(commands.Cog):
     @commands.command(name='aviso')
     @commands.has_permissions(administrator=True)
     async def warn_user(self, ctx, member: discord.Member, *, reason="Não especificado"):
-        guild_data = await self.get_guild_data(ctx.guild.id)
         config = await self.get_guild_config(ctx.guild.id)
-        
-        user_id = str(member.id)
-        if user_id not in guild_data['warnings']:
-            guild_data['warnings'][user_id] = []
-        
-        warning = {
-            'reason': reason,
-            'moderator': ctx.author.id,
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        guild_data['warnings'][user_id].append(warning)
-        warning_count = len(guild_data['warnings'][user_id])
-        await self.save_guild_data(ctx.guild.id, guild_data)
+        warning_count = await self.add_warning(ctx.guild.id, member.id, reason, ctx.author.id)
         
         embed = discord.Embed(
             title="⚠️ Aviso Aplicado",
@@ -167,12 +400,11 @@ class ModerationSystem(commands.Cog):
                 if mute_role:
                     await member.add_roles(mute_role)
                     
-                    mute_key = f"{ctx.guild.id}_{member.id}"
-                    guild_data['mutes'][mute_key] = {
-                        'expires': (datetime.now() + timedelta(hours=1)).isoformat(),
-                        'reason': f"Auto-mute por {config['max_warnings']} avisos"
-                    }
-                    await self.save_guild_data(ctx.guild.id, guild_data)
+                    await self.set_mute(
+                        ctx.guild.id, member.id,
+                        datetime.now() + timedelta(hours=1),
+                        f"Auto-mute por {config['max_warnings']} avisos"
+                    )
                     
                     embed = discord.Embed(
                         title="🔇 Auto-Mute Aplicado",
@@ -197,10 +429,9 @@ class ModerationSystem(commands.Cog):
     @commands.command(name='removeraviso')
     @commands.has_permissions(administrator=True)
     async def remove_warning(self, ctx, member: discord.Member, index: int = None):
-        guild_data = await self.get_guild_data(ctx.guild.id)
-        user_id = str(member.id)
+        removed_warning, remaining = await self.pop_warning(ctx.guild.id, member.id, index)
         
-        if user_id not in guild_data['warnings'] or not guild_data['warnings'][user_id]:
+        if removed_warning is None and remaining == 0:
             embed = discord.Embed(
                 title="❌ Erro",
                 description=f"{member.mention} não possui avisos!",
@@ -209,20 +440,14 @@ class ModerationSystem(commands.Cog):
             await ctx.send(embed=embed)
             return
         
-        if index is None:
-            removed_warning = guild_data['warnings'][user_id].pop()
-        else:
-            if index < 1 or index > len(guild_data['warnings'][user_id]):
-                embed = discord.Embed(
-                    title="❌ Erro",
-                    description="Número do aviso inválido!",
-                    color=discord.Color.red()
-                )
-                await ctx.send(embed=embed)
-                return
-            removed_warning = guild_data['warnings'][user_id].pop(index - 1)
-        
-        await self.save_guild_data(ctx.guild.id, guild_data)
+        if removed_warning is None:
+            embed = discord.Embed(
+                title="❌ Erro",
+                description="Número do aviso inválido!",
+                color=discord.Color.red()
+            )
+            await ctx.send(embed=embed)
+            return
         
         embed = discord.Embed(
             title="✅ Aviso Removido",
@@ -230,7 +455,7 @@ class ModerationSystem(commands.Cog):
             color=discord.Color.green()
         )
         embed.add_field(name="Motivo Removido", value=removed_warning['reason'], inline=False)
-        embed.add_field(name="Avisos Restantes", value=len(guild_data['warnings'][user_id]), inline=True)
+        embed.add_field(name="Avisos Restantes", value=remaining, inline=True)
         
         await ctx.send(embed=embed)
         await self.log_action(ctx.guild, "unwarn", ctx.author, member)
@@ -238,11 +463,9 @@ class ModerationSystem(commands.Cog):
     @commands.command(name='avisos')
     @commands.has_permissions(administrator=True)
     async def list_warnings(self, ctx, member: discord.Member = None):
-        guild_data = await self.get_guild_data(ctx.guild.id)
-        
         if member:
-            user_id = str(member.id)
-            if user_id not in guild_data['warnings'] or not guild_data['warnings'][user_id]:
+            warnings = await self.get_warnings(ctx.guild.id, member.id)
+            if not warnings:
                 embed = discord.Embed(
                     title="📋 Avisos",
                     description=f"{member.mention} não possui avisos!",
@@ -256,10 +479,10 @@ class ModerationSystem(commands.Cog):
                 color=discord.Color.orange()
             )
             
-            for i, warning in enumerate(guild_data['warnings'][user_id], 1):
+            for i, warning in enumerate(warnings, 1):
                 moderator = self.bot.get_user(warning['moderator'])
                 mod_name = moderator.name if moderator else "Desconhecido"
-                date = datetime.fromisoformat(warning['timestamp']).strftime("%d/%m/%Y %H:%M")
+                date = self.parse_timestamp(warning['timestamp']).strftime("%d/%m/%Y %H:%M")
                 
                 embed.add_field(
                     name=f"Aviso #{i}",
@@ -270,11 +493,10 @@ class ModerationSystem(commands.Cog):
             embed.set_thumbnail(url=member.display_avatar.url)
         else:
             all_warnings = []
-            for user_id, warnings in guild_data['warnings'].items():
-                if warnings:
-                    user = ctx.guild.get_member(int(user_id))
-                    if user:
-                        all_warnings.append((user, len(warnings)))
+            for user_id, count in await self.get_warning_counts(ctx.guild.id):
+                user = ctx.guild.get_member(int(user_id))
+                if user:
+                    all_warnings.append((user, count))
             
             if not all_warnings:
                 embed = discord.Embed(
@@ -300,6 +522,13 @@ class ModerationSystem(commands.Cog):
         
         await ctx.send(embed=embed)
 
+    async def find_mute_role(self, guild):
+        """Retorna o cargo de mute existente, sem criar um novo"""
+        config = await self.get_guild_config(guild.id)
+        if config['mute_role_id']:
+            return guild.get_role(config['mute_role_id'])
+        return discord.utils.get(guild.roles, name="Mutado")
+
     async def get_mute_role(self, guild):
         config = await self.get_guild_config(guild.id)
         if config['mute_role_id']:
@@ -345,13 +574,7 @@ class ModerationSystem(commands.Cog):
         try:
             await member.add_roles(mute_role)
             
-            guild_data = await self.get_guild_data(ctx.guild.id)
-            mute_key = f"{ctx.guild.id}_{member.id}"
-            guild_data['mutes'][mute_key] = {
-                'expires': (datetime.now() + duration).isoformat(),
-                'reason': reason
-            }
-            await self.save_guild_data(ctx.guild.id, guild_data)
+            await self.set_mute(ctx.guild.id, member.id, datetime.now() + duration, reason)
             
             embed = discord.Embed(title="🔇 Usuário Mutado", description=f"{member.mention} foi mutado!", color=discord.Color.red())
             embed.add_field(name="Duração", value=tempo, inline=True)
@@ -387,11 +610,7 @@ class ModerationSystem(commands.Cog):
         try:
             await member.remove_roles(mute_role)
             
-            guild_data = await self.get_guild_data(ctx.guild.id)
-            mute_key = f"{ctx.guild.id}_{member.id}"
-            if mute_key in guild_data['mutes']:
-                del guild_data['mutes'][mute_key]
-                await self.save_guild_data(ctx.guild.id, guild_data)
+            await self.remove_mute(ctx.guild.id, member.id)
             
             embed = discord.Embed(title="🔊 Usuário Desmutado", description=f"{member.mention} foi desmutado!", color=discord.Color.green())
             embed.set_thumbnail(url=member.display_avatar.url)
@@ -492,7 +711,6 @@ class ModerationSystem(commands.Cog):
     @commands.has_permissions(administrator=True)
     async def config_moderation(self, ctx):
         config = await self.get_guild_config(ctx.guild.id)
-        guild_data = await self.get_guild_data(ctx.guild.id)
         
         embed = discord.Embed(title="⚙️ Configurações de Moderação", color=discord.Color.blue())
         
@@ -507,8 +725,12 @@ class ModerationSystem(commands.Cog):
         embed.add_field(name="⚠️ Max Avisos", value=config['max_warnings'], inline=True)
         embed.add_field(name="🤖 Auto Punir", value="✅ Ativo" if config['auto_punish'] else "❌ Inativo", inline=True)
         
-        total_warnings = sum(len(warnings) for warnings in guild_data['warnings'].values())
-        active_mutes = len(guild_data['mutes'])
+        total_warnings = 0
+        active_mutes = 0
+        if await self.ensure_connection():
+            guild_filter = {'guild_id': str(ctx.guild.id)}
+            total_warnings = await self.warnings.count_documents(guild_filter)
+            active_mutes = await self.mutes.count_documents(guild_filter)
         
         embed.add_field(name="📊 Avisos Totais", value=total_warnings, inline=True)
         embed.add_field(name="🔇 Mutes Ativos", value=active_mutes, inline=True)
@@ -539,37 +761,10 @@ class ModerationSystem(commands.Cog):
             pass
         return None
 
-    @tasks.loop(minutes=1)
-    async def check_mutes(self):
-        """Verifica mutes expirados"""
-        for guild in self.bot.guilds:
-            guild_data = await self.get_guild_data(guild.id)
-            expired_mutes = []
-            
-            for mute_key, mute_data in guild_data['mutes'].items():
-                expire_time = datetime.fromisoformat(mute_data['expires'])
-                if datetime.now() >= expire_time:
-                    expired_mutes.append(mute_key)
-                    
-                    try:
-                        user_id = int(mute_key.split('_')[1])
-                        member = guild.get_member(user_id)
-                        mute_role = await self.get_mute_role(guild)
-                        
-                        if member and mute_role and mute_role in member.roles:
-                            await member.remove_roles(mute_role)
-                    except:
-                        pass
-            
-            for mute_key in expired_mutes:
-                del guild_data['mutes'][mute_key]
-            
-            if expired_mutes:
-                await self.save_guild_data(guild.id, guild_data)
-
-    @check_mutes.before_loop
-    async def before_check_mutes(self):
-        await self.bot.wait_until_ready()
+    async def cog_unload(self):
+        """Cleanup quando o cog é descarregado"""
+        if self.mute_task:
+            self.mute_task.cancel()
 
     @warn_user.error
     @mute_user.error
@@ -584,11 +779,5 @@ class ModerationSystem(commands.Cog):
             embed = discord.Embed(title="❌ Erro", description="Usuário não encontrado!", color=discord.Color.red())
             await ctx.send(embed=embed)
 
-    async def cog_unload(self):
-        """Fecha conexão MongoDB quando o cog é removido"""
-        if self.client:
-            self.client.close()
-            print("🔌 Conexão com MongoDB fechada")
-
 async def setup(bot):
     await bot.add_cog(ModerationSystem(bot))
\ No newline at end of file
@@ -1,8 +1,11 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
+import asyncio
 import datetime
-import os
-from motor.motor_asyncio import AsyncIOMotorClient
+import time
+from collections import Counter, OrderedDict, deque
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import ConnectionFailure
 
 # Adiciona o load_dotenv aqui
 try:
@@ -11,7 +14,110 @@ try:
 except ImportError:
     pass  # Se não tiver python-dotenv instalado, ignora
 
+class LogChannelQueue:
+    """Fila de saída de um canal de logs"""
+
+    __slots__ = ('channel_id', 'items', 'dropped', 'sent_at', 'task')
+
+    def __init__(self, channel_id, rate_limit):
+        self.channel_id = channel_id
+        # Itens (embed, log_type, log_data) aguardando envio
+        self.items = deque()
+        # log_type -> quantidade descartada por sobrecarga desde o último aviso
+        self.dropped = Counter()
+        # Horários dos últimos envios (bucket do Discord por canal)
+        self.sent_at = deque(maxlen=rate_limit)
+        self.task = None
+
+
+class CachedMessage:
+    """Registro compacto de uma mensagem recente (só o que os logs usam)"""
+
+    __slots__ = ('guild_id', 'channel_id', 'author_id', 'author_name', 'avatar_url', 'content', 'attachments')
+
+    # Custo aproximado de um registro além do texto (objeto, slots, ints, chave do dict)
+    OVERHEAD = 400
+    MAX_CONTENT = 1000
+
+    def __init__(self, guild_id, channel_id, author_id, author_name, avatar_url, content, attachments):
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.author_id = author_id
+        self.author_name = author_name
+        self.avatar_url = avatar_url
+        self.content = content[:self.MAX_CONTENT]
+        self.attachments = attachments
+
+    @classmethod
+    def from_message(cls, message):
+        return cls(
+            message.guild.id,
+            message.channel.id,
+            message.author.id,
+            str(message.author),
+            message.author.display_avatar.url,
+            message.content or "",
+            len(message.attachments)
+        )
+
+    def size(self):
+        return self.OVERHEAD + len(self.content.encode('utf-8')) + len(self.author_name) + len(self.avatar_url)
+
+
+class MessageContentCache:
+    """Cache LRU de mensagens recentes limitado por bytes, não por quantidade"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._records = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._records)
+
+    def put(self, message_id, record):
+        old = self._records.pop(message_id, None)
+        if old is not None:
+            self.bytes -= old.size()
+        self._records[message_id] = record
+        self.bytes += record.size()
+        while self.bytes > self.max_bytes and self._records:
+            _, evicted = self._records.popitem(last=False)
+            self.bytes -= evicted.size()
+            self.evictions += 1
+
+    def get(self, message_id):
+        return self._records.get(message_id)
+
+    def pop(self, message_id):
+        record = self._records.pop(message_id, None)
+        if record is not None:
+            self.bytes -= record.size()
+        return record
+
+
 class AdvancedLogs(commands.Cog):
+    # Discord: até 10 embeds (6000 caracteres no total) por mensagem e 5 mensagens a cada 5s por canal
+    MAX_EMBEDS = 10
+    MAX_EMBED_CHARS = 6000
+    RATE_LIMIT = 5
+    RATE_PERIOD = 5.0
+    LOG_TYPES = (
+        'message_delete', 'bulk_message_delete', 'message_edit', 'member_join', 'member_remove', 'member_ban',
+        'member_unban', 'role_update', 'nickname_update', 'channel_create', 'channel_delete',
+        'channel_update', 'guild_update', 'invite_create', 'invite_delete', 'test_log'
+    )
+    # Máximo de logs aguardando por canal; acima disso os mais antigos são descartados
+    MAX_QUEUE = 200
+    # Histórico: grava a cada segundo ou a cada HISTORY_BATCH entradas
+    HISTORY_BATCH = 100
+    HISTORY_MAX_PENDING = 10000
+    DEFAULT_RETENTION_DAYS = 30
+    # Memória máxima do cache de conteúdo das mensagens (para logs de edição/exclusão)
+    MESSAGE_CACHE_BYTES = 32 * 1024 * 1024
+    MAX_RETENTION_DAYS = 365
+
     def __init__(self, bot):
         self.bot = bot
         self.client = None
@@ -19,28 +125,43 @@ class AdvancedLogs(commands.Cog):
         self.config_collection = None
         self.logs_collection = None
         self._connection_ready = False
+        self.log_queues = {}
+        self.outbound_stats = Counter()
+        self.message_cache = MessageContentCache(self.MESSAGE_CACHE_BYTES)
+        # Entradas do histórico aguardando o próximo insert_many
+        self.pending_entries = []
+        self._flush_lock = asyncio.Lock()
+        # Referência do flush disparado por volume (evita coleta no meio da gravação)
+        self._flush_task = None
+        self.flush_history.start()
         # Inicializa a conexão com MongoDB
         self.bot.loop.create_task(self.init_database())
 
     async def init_database(self):
         """Inicializa a conexão com MongoDB"""
         try:
-            # URL de conexão do MongoDB (vem de variável de ambiente)
-            mongo_uri = os.getenv("MONGO_URI") or os.getenv("MONGODB_URI")
-            
-            if not mongo_uri:
+            # Cliente compartilhado do bot (configurado via variáveis de ambiente)
+            if not self.bot.mongo.is_configured:
                 print("❌ MONGO_URI ou MONGODB_URI não encontrada nas variáveis de ambiente!")
                 return
             
             print("🔄 Conectando ao MongoDB (Logs System)...")
-            self.client = AsyncIOMotorClient(mongo_uri)
+            self.client = self.bot.mongo.client
             
             # Testa a conexão
-            await self.client.admin.command('ping')
+            await self.bot.mongo.ping()
             
-            self.db = self.client['discord_bot']
+            self.db = self.bot.mongo.get_database('discord_bot')
             self.config_collection = self.db['logs_config']
             self.logs_collection = self.db['logs_history']
+            
+            # Retenção por guild: cada entrada expira em expire_at (timestamp + retenção da guild)
+            await self.logs_collection.create_index("expire_at", expireAfterSeconds=0)
+            await self.backfill_expire_at()
+            await self.logs_collection.create_index(
+                [("guild_id", ASCENDING), ("log_type", ASCENDING), ("timestamp", DESCENDING)]
+            )
+            await self.logs_collection.create_index([("guild_id", ASCENDING), ("timestamp", DESCENDING)])
             self._connection_ready = True
             
             print("✅ Conectado ao MongoDB (Logs System) com sucesso!")
@@ -51,28 +172,82 @@ class AdvancedLogs(commands.Cog):
 
     async def ensure_connection(self):
         """Garante que a conexão com MongoDB está ativa"""
+        # Falha rápido enquanto o circuito do MongoDB estiver aberto
+        if not await self.bot.mongo.available():
+            return False
         if not self._connection_ready:
             await self.init_database()
         return self._connection_ready
 
-    async def cog_unload(self):
-        """Fecha a conexão com o MongoDB quando o cog é descarregado"""
-        if self.client:
-            self.client.close()
-            print("🔌 Conexão com MongoDB (Logs) fechada")
-    
-    async def get_log_channel(self, guild_id):
-        """Obtém o canal de logs configurado para o servidor"""
+    async def get_log_config(self, guild_id):
+        """Obtém a configuração de logs do servidor (cacheada)"""
         try:
             if not await self.ensure_connection():
                 print("❌ Conexão com MongoDB não está disponível")
                 return None
                 
-            config = await self.config_collection.find_one({"guild_id": str(guild_id)})
-            return config.get('log_channel') if config else None
+            return await self.bot.mongo.config_cache.get_or_load(
+                self.config_collection, guild_id,
+                lambda: self.config_collection.find_one({"guild_id": str(guild_id)})
+            )
         except Exception as e:
-            print(f"❌ Erro ao buscar canal de log: {e}")
+            print(f"❌ Erro ao buscar configuração de log: {e}")
             return None
+
+    async def get_log_channel(self, guild_id):
+        """Obtém o canal de logs configurado para o servidor"""
+        config = await self.get_log_config(guild_id)
+        return config.get('log_channel') if config else None
+
+    async def get_retention_days(self, guild_id):
+        config = await self.get_log_config(guild_id)
+        return (config or {}).get('retention_days', self.DEFAULT_RETENTION_DAYS)
+
+    async def backfill_expire_at(self):
+        """Dá expire_at às entradas gravadas antes da retenção existir
+
+        Sem o campo o índice TTL nunca as remove. Usa a retenção configurada
+        de cada guild e a padrão para as demais; só toca entradas sem o campo.
+        """
+        missing = {"expire_at": {"$exists": False}}
+        if not await self.logs_collection.find_one(missing, {"_id": 1}):
+            return 0
+        
+        updated = 0
+        async for config in self.config_collection.find({"retention_days": {"$exists": True}}):
+            result = await self.logs_collection.update_many(
+                {**missing, "guild_id": config["guild_id"]},
+                [{"$set": {"expire_at": {"$add": ["$timestamp", config["retention_days"] * 86400000]}}}]
+            )
+            updated += result.modified_count
+        result = await self.logs_collection.update_many(
+            missing,
+            [{"$set": {"expire_at": {"$add": ["$timestamp", self.DEFAULT_RETENTION_DAYS * 86400000]}}}]
+        )
+        updated += result.modified_count
+        print(f"🗓️ Expiração definida para {updated:,} log(s) antigo(s) do histórico")
+        return updated
+
+    async def save_retention_days(self, guild_id, days):
+        """Salva a retenção e recalcula a expiração das entradas já gravadas"""
+        try:
+            if not await self.ensure_connection():
+                return False
+            
+            await self.config_collection.update_one(
+                {"guild_id": str(guild_id)},
+                {"$set": {"retention_days": days, "updated_at": datetime.datetime.utcnow()}},
+                upsert=True
+            )
+            self.bot.mongo.config_cache.invalidate(self.config_collection, guild_id)
+            await self.logs_collection.update_many(
+                {"guild_id": str(guild_id)},
+                [{"$set": {"expire_at": {"$add": ["$timestamp", days * 86400000]}}}]
+            )
+            return True
+        except Exception as e:
+            print(f"❌ Erro ao salvar retenção de logs: {e}")
+            return False
     
     async def save_log_config(self, guild_id, channel_id):
         """Salva a configuração do canal de logs"""
@@ -89,6 +264,7 @@ class AdvancedLogs(commands.Cog):
                 }},
                 upsert=True
             )
+            self.bot.mongo.config_cache.invalidate(self.config_collection, guild_id)
             print(f"✅ Canal de logs salvo: {channel_id} para guild {guild_id}")
             return True
         except Exception as e:
@@ -96,40 +272,188 @@ class AdvancedLogs(commands.Cog):
             return False
     
     async def save_log_entry(self, guild_id, log_type, data):
-        """Salva uma entrada de log no histórico"""
-        try:
+        """Coloca uma entrada de log no buffer do histórico"""
+        now = datetime.datetime.utcnow()
+        retention = await self.get_retention_days(guild_id)
+        self.pending_entries.append({
+            "guild_id": str(guild_id),
+            "log_type": log_type,
+            "timestamp": now,
+            "expire_at": now + datetime.timedelta(days=retention),
+            "data": data
+        })
+        
+        # Banco fora por muito tempo: descarta as mais antigas
+        overflow = len(self.pending_entries) - self.HISTORY_MAX_PENDING
+        if overflow > 0:
+            del self.pending_entries[:overflow]
+            print(f"⚠️ Buffer de histórico cheio: {overflow} entrada(s) descartada(s)")
+        
+        if len(self.pending_entries) >= self.HISTORY_BATCH and not self._flush_lock.locked():
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.create_task(self.flush_log_entries())
+        return True
+
+    async def flush_log_entries(self):
+        """Grava o buffer do histórico com insert_many"""
+        async with self._flush_lock:
+            if not self.pending_entries:
+                return 0
+            
+            # Com o circuito aberto as entradas ficam acumuladas em memória
             if not await self.ensure_connection():
-                return False
-                
-            log_entry = {
-                "guild_id": str(guild_id),
-                "log_type": log_type,
-                "timestamp": datetime.datetime.utcnow(),
-                "data": data
-            }
-            await self.logs_collection.insert_one(log_entry)
-            return True
-        except Exception as e:
-            print(f"❌ Erro ao salvar entrada de log: {e}")
-            return False
+                return 0
+            
+            entries, self.pending_entries = self.pending_entries, []
+            try:
+                await self.logs_collection.insert_many(entries, ordered=False)
+            except asyncio.CancelledError:
+                self.pending_entries[:0] = entries
+                raise
+            except Exception as e:
+                print(f"❌ Erro ao salvar histórico de logs ({len(entries)} entradas): {e}")
+                if isinstance(e, ConnectionFailure):
+                    self.bot.mongo.record_failure(e)
+                    # Só reenvia em falha de conexão (erro de escrita pode já ter gravado parte)
+                    self.pending_entries[:0] = entries
+                return 0
+            return len(entries)
+
+    @tasks.loop(seconds=1)
+    async def flush_history(self):
+        await self.flush_log_entries()
     
     async def send_log(self, guild, embed, log_type=None, log_data=None):
-        """Envia o log para o canal configurado"""
+        """Coloca o log na fila do canal configurado e retorna imediatamente"""
         channel_id = await self.get_log_channel(guild.id)
-        if channel_id:
-            channel = guild.get_channel(channel_id)
-            if channel:
-                try:
-                    await channel.send(embed=embed)
-                    # Salva o log no MongoDB
-                    if log_type and log_data:
-                        await self.save_log_entry(guild.id, log_type, log_data)
-                except discord.Forbidden:
-                    print(f"❌ Sem permissão para enviar logs no canal {channel.name}")
-                except discord.NotFound:
-                    print(f"❌ Canal de logs não encontrado: {channel_id}")
-                except Exception as e:
-                    print(f"❌ Erro ao enviar log: {e}")
+        if channel_id and guild.get_channel(channel_id):
+            self.enqueue_log(channel_id, embed, log_type, log_data)
+
+    def enqueue_log(self, channel_id, embed, log_type=None, log_data=None):
+        """Adiciona um log à fila do canal e garante que o worker está rodando"""
+        queue = self.log_queues.get(channel_id)
+        if queue is None:
+            queue = self.log_queues[channel_id] = LogChannelQueue(channel_id, self.RATE_LIMIT)
+        
+        # Sobrecarga: descarta o mais antigo e registra para o aviso
+        if len(queue.items) >= self.MAX_QUEUE:
+            _, dropped_type, _ = queue.items.popleft()
+            queue.dropped[dropped_type or 'outros'] += 1
+            self.outbound_stats['dropped'] += 1
+        queue.items.append((embed, log_type, log_data))
+        
+        if queue.task is None or queue.task.done():
+            queue.task = asyncio.create_task(self.drain_log_queue(queue))
+
+    def pack_log_batch(self, queue):
+        """Tira da fila o máximo de embeds que cabe em uma mensagem"""
+        embeds = []
+        batch = []
+        size = 0
+        
+        if queue.dropped:
+            total = sum(queue.dropped.values())
+            notice = discord.Embed(
+                title="⚠️ Logs em Sobrecarga",
+                description=f"**{total}** log(s) descartado(s) por excesso de eventos.",
+                color=discord.Color.dark_orange(),
+                timestamp=datetime.datetime.utcnow()
+            )
+            notice.add_field(
+                name="Descartados por tipo",
+                value="\n".join(f"`{log_type}`: {count}" for log_type, count in queue.dropped.most_common(10)),
+                inline=False
+            )
+            queue.dropped.clear()
+            embeds.append(notice)
+            size += len(notice)
+        
+        while queue.items and len(embeds) < self.MAX_EMBEDS:
+            embed = queue.items[0][0]
+            if embeds and size + len(embed) > self.MAX_EMBED_CHARS:
+                break
+            batch.append(queue.items.popleft())
+            embeds.append(embed)
+            size += len(embed)
+        
+        return embeds, batch
+
+    def requeue_log_batch(self, queue, batch, reported):
+        """Devolve ao início da fila um lote que não foi enviado
+
+        O que não couber em MAX_QUEUE conta como descartado, assim como os
+        contadores do aviso de sobrecarga que iam nesse lote.
+        """
+        queue.dropped.update(reported)
+        overflow = max(0, len(queue.items) + len(batch) - self.MAX_QUEUE)
+        for _, dropped_type, _ in batch[:overflow]:
+            queue.dropped[dropped_type or 'outros'] += 1
+        self.outbound_stats['dropped'] += overflow
+        queue.items.extendleft(reversed(batch[overflow:]))
+
+    async def drain_log_queue(self, queue):
+        """Envia a fila de um canal agrupando embeds e respeitando o rate limit"""
+        while queue.items or queue.dropped:
+            # Bucket cheio: espera o envio mais antigo sair da janela (os logs vão se acumulando)
+            if len(queue.sent_at) >= self.RATE_LIMIT:
+                wait = queue.sent_at[0] + self.RATE_PERIOD - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            
+            channel = self.bot.get_channel(queue.channel_id)
+            if channel is None:
+                print(f"❌ Canal de logs não encontrado: {queue.channel_id}")
+                break
+            
+            reported = queue.dropped.copy()
+            embeds, batch = self.pack_log_batch(queue)
+            try:
+                await channel.send(embeds=embeds)
+            except discord.Forbidden:
+                print(f"❌ Sem permissão para enviar logs no canal {channel.name}")
+                break
+            except discord.NotFound:
+                print(f"❌ Canal de logs não encontrado: {queue.channel_id}")
+                break
+            except discord.HTTPException as e:
+                print(f"❌ Erro ao enviar log: {e}")
+                if e.status >= 500:
+                    self.requeue_log_batch(queue, batch, reported)
+                else:
+                    # Lote recusado pelo Discord: reenviar falharia de novo
+                    queue.dropped.update(reported)
+                    for _, dropped_type, _ in batch:
+                        queue.dropped[dropped_type or 'outros'] += 1
+                    self.outbound_stats['dropped'] += len(batch)
+                continue
+            except Exception as e:
+                print(f"❌ Erro ao enviar log: {e}")
+                self.requeue_log_batch(queue, batch, reported)
+                continue
+            finally:
+                queue.sent_at.append(time.monotonic())
+            
+            self.outbound_stats['messages'] += 1
+            self.outbound_stats['embeds'] += len(batch)
+            if len(batch) > 1:
+                self.outbound_stats['merged'] += len(batch) - 1
+            
+            # Salva no MongoDB os logs que foram enviados
+            for _, log_type, log_data in batch:
+                if log_type and log_data:
+                    await self.save_log_entry(channel.guild.id, log_type, log_data)
+        
+        # Canal inacessível: o resto da fila é descartado
+        if queue.items:
+            self.outbound_stats['dropped'] += len(queue.items)
+            queue.items.clear()
+
+    async def cog_unload(self):
+        for queue in self.log_queues.values():
+            if queue.task:
+                queue.task.cancel()
+        self.flush_history.cancel()
+        await self.flush_log_entries()
     
     @commands.command(name='canaldelogs')
     @commands.has_permissions(administrator=True)
@@ -153,6 +477,80 @@ class AdvancedLogs(commands.Cog):
         
         await ctx.send(embed=embed)
     
+    @commands.command(name='retencaologs')
+    @commands.has_permissions(administrator=True)
+    async def set_log_retention(self, ctx, dias: int = None):
+        """Define por quantos dias o histórico de logs é mantido"""
+        if dias is None:
+            atual = await self.get_retention_days(ctx.guild.id)
+            await ctx.send(f"🗓️ O histórico de logs é mantido por **{atual}** dias. Use `!retencaologs <dias>` para alterar.")
+            return
+        
+        if dias < 1 or dias > self.MAX_RETENTION_DAYS:
+            embed = discord.Embed(
+                title="❌ Erro",
+                description=f"A retenção deve ser entre 1 e {self.MAX_RETENTION_DAYS} dias.",
+                color=discord.Color.red()
+            )
+            await ctx.send(embed=embed)
+            return
+        
+        if await self.save_retention_days(ctx.guild.id, dias):
+            embed = discord.Embed(
+                title="✅ Retenção Atualizada",
+                description=f"O histórico de logs será mantido por **{dias}** dias.",
+                color=discord.Color.green(),
+                timestamp=datetime.datetime.utcnow()
+            )
+        else:
+            embed = discord.Embed(
+                title="❌ Erro",
+                description="Não foi possível salvar a configuração. Verifique a conexão com o banco de dados.",
+                color=discord.Color.red()
+            )
+        await ctx.send(embed=embed)
+
+    @commands.command(name='buscarlogs')
+    @commands.has_permissions(administrator=True)
+    async def search_logs(self, ctx, tipo: str = None, horas: int = 24):
+        """Busca no histórico os logs de um tipo nas últimas X horas"""
+        if tipo is None:
+            await ctx.send(
+                "⚠️ Uso: `!buscarlogs <tipo> [horas]`\n"
+                f"Tipos: {', '.join(f'`{t}`' for t in self.LOG_TYPES)}"
+            )
+            return
+        
+        if not await self.ensure_connection():
+            await ctx.send("❌ Conexão com o banco de dados não está disponível.")
+            return
+        
+        # Entradas ainda no buffer também devem aparecer
+        await self.flush_log_entries()
+        
+        since = datetime.datetime.utcnow() - datetime.timedelta(hours=max(1, horas))
+        query = {"guild_id": str(ctx.guild.id), "log_type": tipo, "timestamp": {"$gte": since}}
+        cursor = self.logs_collection.find(query).sort("timestamp", DESCENDING).limit(10)
+        entries = await cursor.to_list(length=10)
+        
+        embed = discord.Embed(
+            title=f"🔎 Logs: {tipo}",
+            color=discord.Color.blue(),
+            timestamp=datetime.datetime.utcnow()
+        )
+        if not entries:
+            embed.description = f"Nenhum log `{tipo}` nas últimas {horas}h."
+        for entry in entries:
+            data = entry.get('data') or {}
+            resumo = ", ".join(f"{k}: {v}" for k, v in data.items() if not k.endswith('_id'))
+            embed.add_field(
+                name=f"<t:{int(entry['timestamp'].replace(tzinfo=datetime.timezone.utc).timestamp())}:f>",
+                value=(resumo[:250] or "Sem dados"),
+                inline=False
+            )
+        embed.set_footer(text=f"Mostrando até 10 entradas das últimas {horas}h")
+        await ctx.send(embed=embed)
+
     @commands.command(name='testelog')
     @commands.has_permissions(administrator=True)
     async def test_log(self, ctx):
@@ -203,45 +601,142 @@ class AdvancedLogs(commands.Cog):
             )
             # Tenta reconectar
             await self.init_database()
-            
+        
+        stats = self.outbound_stats
+        pending = sum(len(queue.items) for queue in self.log_queues.values())
+        embed.add_field(name="📤 Fila de Envio", value=(
+            f"**Mensagens:** {stats['messages']:,} ({stats['embeds']:,} logs)\n"
+            f"**Agrupados:** {stats['merged']:,}\n"
+            f"**Descartados:** {stats['dropped']:,}\n"
+            f"**Aguardando:** {pending:,}"
+        ), inline=False)
+        
+        cache = self.message_cache
+        embed.add_field(name="💬 Cache de Mensagens", value=(
+            f"**Mensagens:** {len(cache):,}\n"
+            f"**Memória:** {cache.bytes / 1024**2:.1f}MB / {cache.max_bytes / 1024**2:.0f}MB\n"
+            f"**Evicções:** {cache.evictions:,}"
+        ), inline=False)
+        
         await ctx.send(embed=embed)
     
     # LOGS DE MENSAGENS
     @commands.Cog.listener()
-    async def on_message_delete(self, message):
+    async def on_message(self, message):
         if message.author.bot or not message.guild:
             return
+        self.message_cache.put(message.id, CachedMessage.from_message(message))
+
+    def cached_record(self, message_id, cached_message=None):
+        """Conteúdo conhecido de uma mensagem (nosso cache ou o do discord.py)"""
+        record = self.message_cache.get(message_id)
+        if record is None and cached_message is not None and cached_message.guild:
+            if cached_message.author.bot:
+                return None
+            record = CachedMessage.from_message(cached_message)
+        return record
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        if not payload.guild_id:
+            return
+        record = self.cached_record(payload.message_id, payload.cached_message)
+        self.message_cache.pop(payload.message_id)
+        guild = self.bot.get_guild(payload.guild_id)
+        if record is None or guild is None:
+            return
         
         embed = discord.Embed(
             title="🗑️ Mensagem Deletada",
             color=discord.Color.red(),
             timestamp=datetime.datetime.utcnow()
         )
-        embed.add_field(name="Autor", value=f"{message.author} ({message.author.id})", inline=True)
-        embed.add_field(name="Canal", value=message.channel.mention, inline=True)
-        embed.add_field(name="Conteúdo", value=message.content[:1000] or "Sem conteúdo de texto", inline=False)
-        if message.attachments:
-            embed.add_field(name="Anexos", value=f"{len(message.attachments)} arquivo(s)", inline=True)
+        embed.add_field(name="Autor", value=f"{record.author_name} ({record.author_id})", inline=True)
+        embed.add_field(name="Canal", value=f"<#{record.channel_id}>", inline=True)
+        embed.add_field(name="Conteúdo", value=record.content or "Sem conteúdo de texto", inline=False)
+        if record.attachments:
+            embed.add_field(name="Anexos", value=f"{record.attachments} arquivo(s)", inline=True)
+        embed.set_author(name=record.author_name, icon_url=record.avatar_url)
         
-        # Verifica se o avatar existe antes de usar
-        avatar_url = message.author.avatar.url if message.author.avatar else message.author.default_avatar.url
-        embed.set_author(name=message.author.display_name, icon_url=avatar_url)
+        channel = guild.get_channel(record.channel_id)
+        log_data = {
+            "author_id": record.author_id,
+            "author_name": record.author_name,
+            "channel_id": record.channel_id,
+            "channel_name": channel.name if channel else None,
+            "content": record.content,
+            "attachments_count": record.attachments,
+            "message_id": payload.message_id
+        }
         
+        await self.send_log(guild, embed, "message_delete", log_data)
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload):
+        if not payload.guild_id:
+            return
+        guild = self.bot.get_guild(payload.guild_id)
+        
+        cached_by_id = {message.id: message for message in payload.cached_messages}
+        records = []
+        for message_id in sorted(payload.message_ids):
+            record = self.cached_record(message_id, cached_by_id.get(message_id))
+            self.message_cache.pop(message_id)
+            if record is not None:
+                records.append((message_id, record))
+        if guild is None:
+            return
+        
+        embed = discord.Embed(
+            title="🧹 Mensagens Deletadas em Massa",
+            description=f"**{len(payload.message_ids)}** mensagens deletadas em <#{payload.channel_id}>",
+            color=discord.Color.dark_red(),
+            timestamp=datetime.datetime.utcnow()
+        )
+        if records:
+            lines = []
+            for _, record in records[-15:]:
+                content = record.content[:80] or f"[{record.attachments} anexo(s)]"
+                lines.append(f"**{record.author_name}:** {content}")
+            embed.add_field(name=f"Conteúdo conhecido ({len(records)})", value="\n".join(lines)[:1024], inline=False)
+        
+        channel = guild.get_channel(payload.channel_id)
         log_data = {
-            "author_id": message.author.id,
-            "author_name": str(message.author),
-            "channel_id": message.channel.id,
-            "channel_name": message.channel.name,
-            "content": message.content,
-            "attachments_count": len(message.attachments) if message.attachments else 0,
-            "message_id": message.id
+            "channel_id": payload.channel_id,
+            "channel_name": channel.name if channel else None,
+            "count": len(payload.message_ids),
+            "messages": [
+                {
+                    "message_id": message_id,
+                    "author_id": record.author_id,
+                    "author_name": record.author_name,
+                    "content": record.content,
+                    "attachments_count": record.attachments
+                }
+                for message_id, record in records
+            ]
         }
         
-        await self.send_log(message.guild, embed, "message_delete", log_data)
-    
+        await self.send_log(guild, embed, "bulk_message_delete", log_data)
+
     @commands.Cog.listener()
-    async def on_message_edit(self, before, after):
-        if before.author.bot or not before.guild or before.content == after.content:
+    async def on_raw_message_edit(self, payload):
+        # Edições sem conteúdo (ex.: embeds de links carregando) não interessam
+        content = payload.data.get('content')
+        if not payload.guild_id or content is None:
+            return
+        
+        before = self.cached_record(payload.message_id, payload.cached_message)
+        if before is None or before.content == content[:CachedMessage.MAX_CONTENT]:
+            return
+        
+        after = CachedMessage(
+            before.guild_id, before.channel_id, before.author_id, before.author_name,
+            before.avatar_url, content, before.attachments
+        )
+        self.message_cache.put(payload.message_id, after)
+        guild = self.bot.get_guild(payload.guild_id)
+        if guild is None:
             return
         
         embed = discord.Embed(
@@ -249,25 +744,24 @@ class AdvancedLogs(commands.Cog):
             color=discord.Color.orange(),
             timestamp=datetime.datetime.utcnow()
         )
-        embed.add_field(name="Autor", value=f"{before.author} ({before.author.id})", inline=True)
-        embed.add_field(name="Canal", value=before.channel.mention, inline=True)
+        embed.add_field(name="Autor", value=f"{before.author_name} ({before.author_id})", inline=True)
+        embed.add_field(name="Canal", value=f"<#{before.channel_id}>", inline=True)
         embed.add_field(name="Antes", value=before.content[:500] or "Sem conteúdo", inline=False)
-        embed.add_field(name="Depois", value=after.content[:500] or "Sem conteúdo", inline=False)
-        
-        avatar_url = before.author.avatar.url if before.author.avatar else before.author.default_avatar.url
-        embed.set_author(name=before.author.display_name, icon_url=avatar_url)
+        embed.add_field(name="Depois", value=content[:500] or "Sem conteúdo", inline=False)
+        embed.set_author(name=before.author_name, icon_url=before.avatar_url)
         
+        channel = guild.get_channel(before.channel_id)
         log_data = {
-            "author_id": before.author.id,
-            "author_name": str(before.author),
-            "channel_id": before.channel.id,
-            "channel_name": before.channel.name,
+            "author_id": before.author_id,
+            "author_name": before.author_name,
+            "channel_id": before.channel_id,
+            "channel_name": channel.name if channel else None,
             "content_before": before.content,
-            "content_after": after.content,
-            "message_id": before.id
+            "content_after": content,
+            "message_id": payload.message_id
         }
         
-        await self.send_log(before.guild, embed, "message_edit", log_data)
+        await self.send_log(guild, embed, "message_edit", log_data)
     
     # LOGS DE MEMBROS
     @commands.Cog.listener()
@@ -616,13 +1110,13 @@ class AdvancedLogs(commands.Cog):
         
         embed.add_field(
             name="🔧 Comandos de Configuração",
-            value="`!canaldelogs #canal` - Define o canal para logs\n`!testelog` - Testa o sistema de logs\n`!statusdblogs` - Verifica conexão com BD",
+            value="`!canaldelogs #canal` - Define o canal para logs\n`!testelog` - Testa o sistema de logs\n`!statusdblogs` - Verifica conexão com BD\n`!retencaologs [dias]` - Define a retenção do histórico\n`!buscarlogs <tipo> [horas]` - Busca no histórico",
             inline=False
         )
         
         embed.add_field(
             name="💬 Logs de Mensagens",
-            value="• Mensagens deletadas\n• Mensagens editadas",
+            value="• Mensagens deletadas\n• Mensagens deletadas em massa\n• Mensagens editadas",
             inline=True
         )
         
@@ -1,10 +1,48 @@
 import discord
-from discord.ext import commands
-import os
+from discord.ext import commands, tasks
 import random
-from datetime import datetime
-from motor.motor_asyncio import AsyncIOMotorClient
+import re
+import heapq
+from datetime import datetime, timedelta, timezone
 import asyncio
+from pymongo import DeleteOne, ReturnDocument, UpdateOne
+from pymongo.errors import ConnectionFailure
+
+EMOJI_SORTEIO = '🎁'
+MAX_VENCEDORES = 20
+MAX_PESO_VIP = 10
+MAX_DURACAO = timedelta(days=30)
+# Opções antes do prêmio: duração (30m, 2h, 1d), vencedores (3v) e peso VIP (vip2)
+OPCAO_DURACAO = re.compile(r'^(\d+)([smhd])$')
+OPCAO_VENCEDORES = re.compile(r'^(\d+)v$')
+OPCAO_PESO_VIP = re.compile(r'^vip(\d+)$')
+UNIDADES = {'s': 'seconds', 'm': 'minutes', 'h': 'hours', 'd': 'days'}
+
+
+def sorteio_ponderado(grupos, quantidade, rng=random):
+    """Sorteia até quantidade ids sem reposição a partir de {peso: ids}
+
+    A chance de cada escolha é proporcional ao peso. Participantes de mesmo
+    peso ficam numa lista só, então cada escolha custa O(pesos distintos) e
+    o total é dominado pela cópia das listas (100k entradas em poucos ms).
+    """
+    grupos = {peso: list(ids) for peso, ids in grupos.items() if ids and peso > 0}
+    vencedores = []
+    while grupos and len(vencedores) < quantidade:
+        alvo = rng.random() * sum(peso * len(ids) for peso, ids in grupos.items())
+        for peso, ids in grupos.items():
+            alvo -= peso * len(ids)
+            if alvo < 0:
+                break
+        
+        # Remove o escolhido trocando com o último (O(1))
+        indice = rng.randrange(len(ids))
+        ids[indice], ids[-1] = ids[-1], ids[indice]
+        vencedores.append(ids.pop())
+        if not ids:
+            del grupos[peso]
+    return vencedores
+
 
 class Sorteio(commands.Cog):
     def __init__(self, bot):
@@ -13,86 +51,407 @@ class Sorteio(commands.Cog):
         self.db = None
         self.sorteios_collection = None
         self.configuracoes_collection = None
+        self.entradas_collection = None
+        self.contadores_collection = None
         self._connection_ready = False
+        # Encerramentos agendados: sorteio_id -> termina_em, e a heap que o agendador consome
+        self.agendados = {}
+        self.fila_encerramento = []
+        self._encerramento_wakeup = asyncio.Event()
+        self.agendador_task = None
+        # Sorteios cujas reações já foram conferidas nesta execução
+        self.reconciliados = set()
+        # Participantes dos sorteios ativos: sorteio_id (id da mensagem) -> {user_id}
+        self.entradas = {}
+        # Alterações ainda não gravadas: (sorteio_id, user_id) -> participa?
+        self.entradas_pendentes = {}
+        # Usuários que reagiram durante uma reconciliação em andamento (não são corrigidos por ela)
+        self._alterados_durante_reconciliacao = {}
+        self._flush_lock = asyncio.Lock()
         # Inicializa a conexão com MongoDB
         self.bot.loop.create_task(self.init_database())
+        self.flush_entradas.start()
     
     async def init_database(self):
         """Inicializa a conexão com MongoDB"""
         try:
-            # URL de conexão do MongoDB (vem de variável de ambiente)
-            mongo_uri = os.getenv("MONGO_URI") or os.getenv('MONGODB_URL', 'mongodb://localhost:27017/')
-            
-            if not mongo_uri:
+            # Cliente compartilhado do bot (configurado via variáveis de ambiente)
+            if not self.bot.mongo.is_configured:
                 print("❌ MONGO_URI não encontrada nas variáveis de ambiente!")
                 return
             
             print("🔄 Conectando ao MongoDB (Sorteios)...")
-            self.client = AsyncIOMotorClient(mongo_uri)
+            self.client = self.bot.mongo.client
             
             # Testa a conexão
-            await self.client.admin.command('ping')
+            await self.bot.mongo.ping()
             
-            self.db = self.client['discord_bot']
+            self.db = self.bot.mongo.get_database('discord_bot')
             self.sorteios_collection = self.db['sorteios']
             self.configuracoes_collection = self.db['configuracoes']
+            self.entradas_collection = self.db['sorteio_entradas']
+            self.contadores_collection = self.db['sorteio_contadores']
             self._connection_ready = True
             
+            await self.entradas_collection.create_index([('sorteio_id', 1), ('user_id', 1)], unique=True)
+            await self.migrar_sorteios_legados()
+            await self.sorteios_collection.create_index(
+                'sorteio_id', unique=True, partialFilterExpression={'sorteio_id': {'$exists': True}}
+            )
+            await self.sorteios_collection.create_index([('guild_id', 1), ('ativo', 1), ('numero', 1)])
+            await self.sorteios_collection.create_index([('ativo', 1), ('termina_em', 1)])
+            
             print("✅ Conectado ao MongoDB (Sorteios) com sucesso!")
             
+            # Carrega os participantes, agenda os encerramentos e confere reações perdidas com o bot offline
+            await self.carregar_entradas()
+            await self.carregar_agenda()
+            if self.agendador_task is None or self.agendador_task.done():
+                self.agendador_task = asyncio.create_task(self.agendador_encerramentos())
+            self.bot.loop.create_task(self.reconciliar_todos())
+            
         except Exception as e:
             print(f"❌ Erro ao conectar com MongoDB (Sorteios): {e}")
             self._connection_ready = False
 
     async def ensure_connection(self):
         """Garante que a conexão com MongoDB está ativa"""
+        # Falha rápido enquanto o circuito do MongoDB estiver aberto
+        if not await self.bot.mongo.available():
+            return False
         if not self._connection_ready:
             await self.init_database()
         return self._connection_ready
     
-    async def get_sorteio(self, guild_id):
-        """Busca sorteio do servidor no MongoDB"""
+    async def migrar_sorteios_legados(self):
+        """Converte o sorteio único por servidor do formato antigo em um sorteio com id"""
+        result = await self.sorteios_collection.update_many(
+            {'sorteio_id': {'$exists': False}, 'mensagem_id': {'$exists': True}},
+            [{'$set': {
+                'sorteio_id': {'$toString': '$mensagem_id'},
+                'numero': 1,
+                'vencedores': 1,
+                'peso_vip': 1,
+                'termina_em': None
+            }}]
+        )
+        if result.modified_count:
+            # O contador do servidor continua depois do sorteio migrado
+            async for sorteio in self.sorteios_collection.find({'numero': 1}, {'guild_id': 1}):
+                await self.contadores_collection.update_one(
+                    {'_id': sorteio['guild_id']}, {'$max': {'seq': 1}}, upsert=True
+                )
+            print(f"🎁 {result.modified_count} sorteio(s) do formato antigo migrado(s)")
+
+    async def proximo_numero(self, guild_id):
+        """Número sequencial do próximo sorteio do servidor"""
+        contador = await self.contadores_collection.find_one_and_update(
+            {'_id': str(guild_id)}, {'$inc': {'seq': 1}},
+            upsert=True, return_document=ReturnDocument.AFTER
+        )
+        return contador['seq']
+
+    async def get_sorteios_ativos(self, guild_id):
+        """Sorteios em andamento no servidor, em ordem de número"""
         try:
             if not await self.ensure_connection():
-                return None
-            return await self.sorteios_collection.find_one({'guild_id': str(guild_id)})
+                return []
+            cursor = self.sorteios_collection.find(
+                {'guild_id': str(guild_id), 'ativo': True, 'sorteio_id': {'$exists': True}}
+            ).sort('numero', 1)
+            return await cursor.to_list(length=None)
         except Exception as e:
-            print(f"❌ Erro ao buscar sorteio: {e}")
-            return None
-    
-    async def save_sorteio(self, guild_id, data):
-        """Salva ou atualiza sorteio no MongoDB"""
-        try:
-            if not await self.ensure_connection():
-                return False
-            data['guild_id'] = str(guild_id)
-            await self.sorteios_collection.replace_one(
-                {'guild_id': str(guild_id)}, 
-                data, 
-                upsert=True
+            print(f"❌ Erro ao buscar sorteios: {e}")
+            return []
+
+    async def canal_do_sorteio(self, sorteio):
+        """Canal onde a mensagem do sorteio foi enviada"""
+        canal = self.bot.get_channel(sorteio.get('canal_id'))
+        if canal is None:
+            # Sorteios migrados não guardam o canal: usa o configurado
+            configs = await self.get_configuracao(sorteio['guild_id'])
+            canal = self.bot.get_channel(configs.get('canal_sorteio'))
+        return canal
+
+    async def carregar_entradas(self):
+        """Carrega em memória os participantes de todos os sorteios ativos"""
+        entradas = {}
+        async for sorteio in self.sorteios_collection.find({'ativo': True, 'sorteio_id': {'$exists': True}}):
+            entradas[sorteio['sorteio_id']] = set()
+        if entradas:
+            cursor = self.entradas_collection.find(
+                {'sorteio_id': {'$in': list(entradas)}}, {'_id': 0, 'sorteio_id': 1, 'user_id': 1}
             )
-            return True
-        except Exception as e:
-            print(f"❌ Erro ao salvar sorteio: {e}")
-            return False
-    
-    async def delete_sorteio(self, guild_id):
-        """Remove sorteio do MongoDB"""
+            async for entrada in cursor:
+                entradas[entrada['sorteio_id']].add(entrada['user_id'])
+        self.entradas = entradas
+        total = sum(len(participantes) for participantes in entradas.values())
+        print(f"🎁 {len(entradas)} sorteio(s) ativo(s) com {total} participante(s) carregado(s)")
+
+    def registrar_entrada(self, sorteio_id, user_id, participa):
+        """Atualiza o conjunto em memória e agenda a gravação"""
+        participantes = self.entradas.get(sorteio_id)
+        if participantes is None:
+            return
+        if participa:
+            participantes.add(user_id)
+        else:
+            participantes.discard(user_id)
+        self.entradas_pendentes[(sorteio_id, user_id)] = participa
+        alterados = self._alterados_durante_reconciliacao.get(sorteio_id)
+        if alterados is not None:
+            alterados.add(user_id)
+
+    async def flush_entradas_pendentes(self):
+        """Grava as entradas pendentes com um único bulk_write"""
+        async with self._flush_lock:
+            if not self.entradas_pendentes or not await self.ensure_connection():
+                return 0
+            
+            pendentes, self.entradas_pendentes = self.entradas_pendentes, {}
+            agora = datetime.utcnow()
+            operacoes = [
+                UpdateOne(
+                    {'sorteio_id': sorteio_id, 'user_id': user_id},
+                    {'$setOnInsert': {'entrou_em': agora}},
+                    upsert=True
+                ) if participa else DeleteOne({'sorteio_id': sorteio_id, 'user_id': user_id})
+                for (sorteio_id, user_id), participa in pendentes.items()
+            ]
+            try:
+                await self.entradas_collection.bulk_write(operacoes, ordered=False)
+            except asyncio.CancelledError:
+                self.reenfileirar_entradas(pendentes)
+                raise
+            except Exception as e:
+                print(f"❌ Erro ao gravar entradas de sorteio ({len(operacoes)}): {e}")
+                if isinstance(e, ConnectionFailure):
+                    self.bot.mongo.record_failure(e)
+                # As operações são idempotentes: reenviar é seguro
+                self.reenfileirar_entradas(pendentes)
+                return 0
+            return len(operacoes)
+
+    def reenfileirar_entradas(self, pendentes):
+        """Devolve alterações não gravadas sem sobrescrever as mais novas"""
+        for chave, participa in pendentes.items():
+            self.entradas_pendentes.setdefault(chave, participa)
+
+    @tasks.loop(seconds=2)
+    async def flush_entradas(self):
+        await self.flush_entradas_pendentes()
+
+    async def reconciliar(self, sorteio_id, canal):
+        """Compara as reações da mensagem com o conjunto salvo e corrige as diferenças"""
+        # Eventos que chegam enquanto as páginas de reações são lidas já estão certos
+        alterados = self._alterados_durante_reconciliacao[sorteio_id] = set()
         try:
-            if not await self.ensure_connection():
-                return False
-            await self.sorteios_collection.delete_one({'guild_id': str(guild_id)})
-            return True
-        except Exception as e:
-            print(f"❌ Erro ao deletar sorteio: {e}")
-            return False
-    
+            msg = await canal.fetch_message(int(sorteio_id))
+            reagiram = set()
+            for reaction in msg.reactions:
+                if str(reaction.emoji) == EMOJI_SORTEIO:
+                    async for user in reaction.users(limit=None):
+                        if not user.bot:
+                            reagiram.add(str(user.id))
+                    break
+        finally:
+            del self._alterados_durante_reconciliacao[sorteio_id]
+        self.reconciliados.add(sorteio_id)
+        
+        participantes = self.entradas.get(sorteio_id)
+        if participantes is None:
+            return 0, 0
+        novos = reagiram - participantes - alterados
+        sairam = participantes - reagiram - alterados
+        for user_id in novos:
+            self.registrar_entrada(sorteio_id, user_id, True)
+        for user_id in sairam:
+            self.registrar_entrada(sorteio_id, user_id, False)
+        return len(novos), len(sairam)
+
+    async def reconciliar_todos(self):
+        """Reconcilia os sorteios ativos depois que o bot fica pronto"""
+        await self.bot.wait_until_ready()
+        async for sorteio in self.sorteios_collection.find({'ativo': True, 'sorteio_id': {'$exists': True}}):
+            sorteio_id = sorteio['sorteio_id']
+            canal = await self.canal_do_sorteio(sorteio)
+            if not canal or sorteio_id in self.reconciliados:
+                continue
+            try:
+                novos, sairam = await self.reconciliar(sorteio_id, canal)
+                if novos or sairam:
+                    print(f"🎁 Sorteio {sorteio_id} reconciliado: +{novos} / -{sairam}")
+            except Exception as e:
+                print(f"❌ Erro ao reconciliar sorteio {sorteio_id}: {e}")
+
+    async def carregar_agenda(self):
+        """Agenda o encerramento de todos os sorteios ativos com prazo"""
+        self.agendados = {}
+        self.fila_encerramento = []
+        async for sorteio in self.sorteios_collection.find({'ativo': True, 'termina_em': {'$ne': None}}):
+            if 'sorteio_id' in sorteio:
+                self.agendar_encerramento(sorteio['sorteio_id'], sorteio['termina_em'])
+
+    def agendar_encerramento(self, sorteio_id, termina_em):
+        """Coloca o encerramento na heap (entradas antigas são ignoradas ao sair)"""
+        self.agendados[sorteio_id] = termina_em
+        heapq.heappush(self.fila_encerramento, (termina_em, sorteio_id))
+        # Acorda o agendador se esse encerramento for o próximo
+        if self.fila_encerramento[0][0] == termina_em:
+            self._encerramento_wakeup.set()
+
+    async def agendador_encerramentos(self):
+        """Dorme até o próximo fim de sorteio da heap e encerra com sorteio dos vencedores"""
+        await self.bot.wait_until_ready()
+        while True:
+            self._encerramento_wakeup.clear()
+            
+            if self.fila_encerramento:
+                # Limite de 1h para corrigir eventuais ajustes de relógio
+                delay = min((self.fila_encerramento[0][0] - datetime.utcnow()).total_seconds(), 3600)
+            else:
+                delay = None
+            
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._encerramento_wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            termina_em, sorteio_id = heapq.heappop(self.fila_encerramento)
+            
+            # Entrada obsoleta: sorteio encerrado manualmente depois de agendado
+            if self.agendados.get(sorteio_id) != termina_em:
+                continue
+            
+            try:
+                if not await self.ensure_connection():
+                    # Banco fora: tenta de novo em 1 minuto
+                    self.agendar_encerramento(sorteio_id, datetime.utcnow() + timedelta(minutes=1))
+                    continue
+                sorteio = await self.sorteios_collection.find_one({'sorteio_id': sorteio_id, 'ativo': True})
+                self.agendados.pop(sorteio_id, None)
+                if sorteio:
+                    await self.finalizar_sorteio(sorteio)
+            except Exception as e:
+                print(f"❌ Erro ao encerrar sorteio {sorteio_id}: {e}")
+
+    def sortear(self, sorteio, participantes):
+        """Escolhe os vencedores; VIPs contam peso_vip vezes se configurado"""
+        grupos = {1: participantes}
+        peso_vip = sorteio.get('peso_vip', 1)
+        if peso_vip > 1:
+            vip_cog = self.bot.get_cog('VIPSystem')
+            vips = vip_cog.vip_users(sorteio['guild_id']) if vip_cog else None
+            if vips:
+                vips_participando = participantes & vips
+                grupos = {1: participantes - vips_participando, peso_vip: vips_participando}
+        return sorteio_ponderado(grupos, sorteio.get('vencedores', 1))
+
+    async def finalizar_sorteio(self, sorteio, sortear=True):
+        """Encerra o sorteio uma única vez e, se pedido, sorteia e anuncia os vencedores
+
+        Os vencedores são gravados no mesmo update que encerra o sorteio, e
+        os participantes só são apagados depois do anúncio (mesmo que ele falhe).
+        Retorna (vencedores, participantes) ou None se outro encerramento chegou antes.
+        """
+        sorteio_id = sorteio['sorteio_id']
+        canal = await self.canal_do_sorteio(sorteio)
+        premio = sorteio['premio']
+        encerramento = {'ativo': False, 'encerrado_em': datetime.utcnow()}
+        
+        participantes = set()
+        vencedores = []
+        if sortear:
+            # Sorteio que vem de antes do reinício: confere as reações antes de sortear
+            if canal and sorteio_id not in self.reconciliados and sorteio_id in self.entradas:
+                try:
+                    await self.reconciliar(sorteio_id, canal)
+                except Exception as e:
+                    print(f"❌ Erro ao reconciliar sorteio {sorteio_id}: {e}")
+            
+            participantes = set(self.entradas.get(sorteio_id, ()))
+            vencedores = self.sortear(sorteio, participantes)
+            encerramento['vencedores_ids'] = vencedores
+        
+        result = await self.sorteios_collection.update_one(
+            {'sorteio_id': sorteio_id, 'ativo': True},
+            {'$set': encerramento}
+        )
+        if not result.modified_count:
+            return None
+        self.agendados.pop(sorteio_id, None)
+        
+        if canal:
+            if not sortear:
+                embed = discord.Embed(
+                    title="🔒 Sorteio Encerrado",
+                    description=f"O sorteio do prêmio **{premio}** foi encerrado.",
+                    color=0xff6666
+                )
+            elif vencedores:
+                mencoes = ", ".join(f"<@{user_id}>" for user_id in vencedores)
+                embed = discord.Embed(
+                    title="🎊 TEMOS UM VENCEDOR!" if len(vencedores) == 1 else "🎊 TEMOS VENCEDORES!",
+                    description=f"🎉 Parabéns {mencoes}!\n\n**Prêmio:** {premio}",
+                    color=0xffd700
+                )
+                embed.set_footer(text=f"Sorteio #{sorteio['numero']} • Sorteado entre {len(participantes)} participantes")
+            else:
+                embed = discord.Embed(
+                    title="❌ Sem Participantes",
+                    description=f"O sorteio do prêmio **{premio}** terminou sem participantes.",
+                    color=0xff4444
+                )
+            try:
+                await canal.send(embed=embed)
+            except Exception as e:
+                # Os vencedores já estão gravados: o sorteio encerra mesmo sem o anúncio
+                print(f"❌ Erro ao anunciar o encerramento do sorteio {sorteio_id}: {e}")
+        
+        await self.encerrar_entradas(sorteio_id)
+        return vencedores, len(participantes)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload):
+        sorteio_id = str(payload.message_id)
+        if sorteio_id not in self.entradas or str(payload.emoji) != EMOJI_SORTEIO:
+            return
+        if payload.member is None or payload.member.bot:
+            return
+        self.registrar_entrada(sorteio_id, str(payload.user_id), True)
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_remove(self, payload):
+        sorteio_id = str(payload.message_id)
+        if sorteio_id not in self.entradas or str(payload.emoji) != EMOJI_SORTEIO:
+            return
+        self.registrar_entrada(sorteio_id, str(payload.user_id), False)
+
+    async def encerrar_entradas(self, sorteio_id):
+        """Descarta os participantes de um sorteio encerrado (memória e banco)"""
+        self.entradas.pop(sorteio_id, None)
+        for chave in [chave for chave in self.entradas_pendentes if chave[0] == sorteio_id]:
+            del self.entradas_pendentes[chave]
+        await self.entradas_collection.delete_many({'sorteio_id': sorteio_id})
+
+    async def cog_unload(self):
+        """Para o agendador e grava as entradas pendentes"""
+        self.flush_entradas.cancel()
+        if self.agendador_task:
+            self.agendador_task.cancel()
+        await self.flush_entradas_pendentes()
+
     async def get_configuracao(self, guild_id):
         """Busca configuração do servidor no MongoDB"""
         try:
             if not await self.ensure_connection():
                 return {}
-            config = await self.configuracoes_collection.find_one({'guild_id': str(guild_id)})
+            config = await self.bot.mongo.config_cache.get_or_load(
+                self.configuracoes_collection, guild_id,
+                lambda: self.configuracoes_collection.find_one({'guild_id': str(guild_id)})
+            )
             return config if config else {}
         except Exception as e:
             print(f"❌ Erro ao buscar configuração: {e}")
@@ -104,38 +463,105 @@ class Sorteio(commands.Cog):
             if not await self.ensure_connection():
                 return False
             data['guild_id'] = str(guild_id)
-            await self.configuracoes_collection.replace_one(
-                {'guild_id': str(guild_id)}, 
-                data, 
-                upsert=True
-            )
+            try:
+                await self.configuracoes_collection.replace_one(
+                    {'guild_id': str(guild_id)}, 
+                    data, 
+                    upsert=True
+                )
+            finally:
+                self.bot.mongo.config_cache.invalidate(self.configuracoes_collection, guild_id)
             return True
         except Exception as e:
             print(f"❌ Erro ao salvar configuração: {e}")
             return False
     
+    async def canal_comando_incorreto(self, ctx, configs):
+        """Avisa e retorna True se o comando foi usado fora do canal de comando"""
+        canal_comando_id = configs.get('canal_comando')
+        if canal_comando_id and ctx.channel.id != canal_comando_id:
+            canal_comando = self.bot.get_channel(canal_comando_id)
+            embed = discord.Embed(
+                title="❌ Canal Incorreto",
+                description=f"Use este comando no canal {canal_comando.mention if canal_comando else 'configurado'}.",
+                color=0xff4444
+            )
+            await ctx.send(embed=embed)
+            return True
+        return False
+
+    def interpretar_opcoes(self, argumentos):
+        """Separa duração, vencedores e peso VIP do início do texto do prêmio"""
+        duracao = None
+        vencedores = 1
+        peso_vip = 1
+        palavras = argumentos.split()
+        while palavras:
+            palavra = palavras[0].lower()
+            duracao_match = OPCAO_DURACAO.match(palavra)
+            vencedores_match = OPCAO_VENCEDORES.match(palavra)
+            peso_match = OPCAO_PESO_VIP.match(palavra)
+            if duracao_match and duracao is None:
+                duracao = timedelta(**{UNIDADES[duracao_match.group(2)]: int(duracao_match.group(1))})
+            elif vencedores_match:
+                vencedores = int(vencedores_match.group(1))
+            elif peso_match:
+                peso_vip = int(peso_match.group(1))
+            else:
+                break
+            palavras.pop(0)
+        return duracao, vencedores, peso_vip, " ".join(palavras)
+
+    async def escolher_sorteio(self, ctx, numero):
+        """Sorteio ativo pelo número; sem número, o único ativo do servidor"""
+        ativos = await self.get_sorteios_ativos(ctx.guild.id)
+        if numero is not None:
+            ativos = [sorteio for sorteio in ativos if sorteio.get('numero') == numero]
+        
+        if len(ativos) == 1:
+            return ativos[0]
+        
+        if not ativos:
+            embed = discord.Embed(
+                title="❌ Nenhum Sorteio Ativo",
+                description="Não há sorteio em andamento com esse número.\nUse `!sorteios` para ver os ativos." if numero is not None
+                            else "Não há sorteio em andamento.\nUse `!comecarsorteio <prêmio>` para iniciar um.",
+                color=0xff4444
+            )
+        else:
+            lista = "\n".join(f"**#{sorteio['numero']}** - {sorteio['premio']}" for sorteio in ativos)
+            embed = discord.Embed(
+                title="⚠️ Vários Sorteios Ativos",
+                description=f"Informe o número do sorteio:\n\n{lista}",
+                color=0xffaa00
+            )
+        await ctx.send(embed=embed)
+        return None
+
     @commands.command(name='comecarsorteio', aliases=['startgw'])
     @commands.has_permissions(administrator=True)
-    async def comecar_sorteio(self, ctx, *, premio):
-        """Inicia um novo sorteio"""
+    async def comecar_sorteio(self, ctx, *, argumentos):
+        """Inicia um novo sorteio: !comecarsorteio [duração] [Nv] [vipN] <prêmio>"""
         guild_id = str(ctx.guild.id)
+        duracao, vencedores, peso_vip, premio = self.interpretar_opcoes(argumentos)
         
         if not premio:
             embed = discord.Embed(
                 title="❌ Erro",
-                description="Você precisa especificar um prêmio.\n**Uso:** `!comecarsorteio <prêmio>`",
+                description="Você precisa especificar um prêmio.\n**Uso:** `!comecarsorteio [duração] [vencedores] [vip] <prêmio>`",
                 color=0xff4444
             )
             await ctx.send(embed=embed)
             return
         
-        # Verifica se já existe um sorteio ativo
-        sorteio_ativo = await self.get_sorteio(guild_id)
-        if sorteio_ativo and sorteio_ativo.get('ativo'):
+        if not (1 <= vencedores <= MAX_VENCEDORES) or not (1 <= peso_vip <= MAX_PESO_VIP) or \
+                (duracao is not None and not (timedelta(seconds=10) <= duracao <= MAX_DURACAO)):
             embed = discord.Embed(
-                title="⚠️ Sorteio Já Ativo",
-                description="Já existe um sorteio em andamento.\nUse `!encerrarsorteio` para encerrar antes de começar outro.",
-                color=0xffaa00
+                title="❌ Opções Inválidas",
+                description=f"• Duração entre 10s e 30d (ex: `30m`, `2h`, `1d`)\n"
+                           f"• Vencedores entre 1 e {MAX_VENCEDORES} (ex: `3v`)\n"
+                           f"• Peso VIP entre 1 e {MAX_PESO_VIP} (ex: `vip2`)",
+                color=0xff4444
             )
             await ctx.send(embed=embed)
             return
@@ -143,7 +569,6 @@ class Sorteio(commands.Cog):
         # Verifica se os canais estão configurados
         configs = await self.get_configuracao(guild_id)
         canal_sorteio_id = configs.get('canal_sorteio')
-        canal_comando_id = configs.get('canal_comando')
         
         if not canal_sorteio_id:
             embed = discord.Embed(
@@ -155,198 +580,165 @@ class Sorteio(commands.Cog):
             return
         
         # Verifica se está no canal correto
-        if canal_comando_id and ctx.channel.id != canal_comando_id:
-            canal_comando = self.bot.get_channel(canal_comando_id)
+        if await self.canal_comando_incorreto(ctx, configs):
+            return
+        
+        canal_sorteio = self.bot.get_channel(canal_sorteio_id)
+        if not canal_sorteio or not await self.ensure_connection():
             embed = discord.Embed(
-                title="❌ Canal Incorreto",
-                description=f"Use este comando no canal {canal_comando.mention if canal_comando else 'configurado'}.",
+                title="❌ Erro",
+                description="Não foi possível iniciar o sorteio. Verifique o canal e a conexão com o banco de dados.",
                 color=0xff4444
             )
             await ctx.send(embed=embed)
             return
         
-        # Cria o sorteio
+        numero = await self.proximo_numero(guild_id)
+        termina_em = datetime.utcnow() + duracao if duracao else None
+        
+        # Envia mensagem no canal do sorteio
+        detalhes = [f"**Prêmio:** {premio}"]
+        if vencedores > 1:
+            detalhes.append(f"**Vencedores:** {vencedores}")
+        if termina_em:
+            termina_ts = int(termina_em.replace(tzinfo=timezone.utc).timestamp())
+            detalhes.append(f"**Termina:** <t:{termina_ts}:R> (<t:{termina_ts}:f>)")
+        if peso_vip > 1:
+            detalhes.append(f"👑 VIPs participam com **{peso_vip}x** mais chances")
+        embed = discord.Embed(
+            title="🎉 SORTEIO INICIADO!",
+            description="\n".join(detalhes) + f"\n\nReaja com {EMOJI_SORTEIO} para participar!",
+            color=0x00ff7f
+        )
+        embed.set_footer(text=f"Sorteio #{numero} • Iniciado por {ctx.author.display_name}")
+        
+        msg = await canal_sorteio.send(embed=embed)
+        sorteio_id = str(msg.id)
+        # Começa a contar as reações antes mesmo de o bot reagir
+        self.entradas[sorteio_id] = set()
+        self.reconciliados.add(sorteio_id)
+        await msg.add_reaction(EMOJI_SORTEIO)
+        
         sorteio_data = {
+            'sorteio_id': sorteio_id,
+            'numero': numero,
+            'guild_id': guild_id,
+            'canal_id': canal_sorteio.id,
+            'mensagem_id': msg.id,
             'premio': premio,
+            'vencedores': vencedores,
+            'peso_vip': peso_vip,
+            'termina_em': termina_em,
             'ativo': True,
-            'participantes': [],
             'criador': ctx.author.display_name,
             'criador_id': ctx.author.id,
             'data_inicio': datetime.now().strftime('%d/%m/%Y %H:%M')
         }
-        
-        # Envia mensagem no canal do sorteio
-        canal_sorteio = self.bot.get_channel(canal_sorteio_id)
-        if canal_sorteio:
-            embed = discord.Embed(
-                title="🎉 SORTEIO INICIADO!",
-                description=f"**Prêmio:** {premio}\n\nReaja com 🎁 para participar!",
-                color=0x00ff7f
-            )
-            embed.set_footer(text=f"Iniciado por {ctx.author.display_name}")
-            
-            msg = await canal_sorteio.send(embed=embed)
-            await msg.add_reaction('🎁')
-            
-            # Salva ID da mensagem
-            sorteio_data['mensagem_id'] = msg.id
-        
-        await self.save_sorteio(guild_id, sorteio_data)
+        await self.sorteios_collection.insert_one(sorteio_data)
+        if termina_em:
+            self.agendar_encerramento(sorteio_id, termina_em)
         
         # Confirmação no canal de comando
         embed = discord.Embed(
             title="✅ Sorteio Iniciado",
-            description=f"Sorteio do prêmio **{premio}** foi iniciado!",
+            description=f"Sorteio **#{numero}** do prêmio **{premio}** foi iniciado!",
             color=0x00ff7f
         )
         await ctx.send(embed=embed)
     
     @commands.command(name='vencedor', aliases=['winner'])
     @commands.has_permissions(administrator=True)
-    async def sortear_vencedor(self, ctx):
-        """Sorteia um vencedor do sorteio ativo"""
-        guild_id = str(ctx.guild.id)
-        
-        sorteio = await self.get_sorteio(guild_id)
-        if not sorteio or not sorteio.get('ativo'):
-            embed = discord.Embed(
-                title="❌ Nenhum Sorteio Ativo",
-                description="Não há sorteio em andamento.\nUse `!comecarsorteio <prêmio>` para iniciar um.",
-                color=0xff4444
-            )
-            await ctx.send(embed=embed)
+    async def sortear_vencedor(self, ctx, numero: int = None):
+        """Encerra o sorteio agora e sorteia os vencedores"""
+        configs = await self.get_configuracao(str(ctx.guild.id))
+        if await self.canal_comando_incorreto(ctx, configs):
             return
         
-        # Verifica canal de comando
-        configs = await self.get_configuracao(guild_id)
-        canal_comando_id = configs.get('canal_comando')
-        
-        if canal_comando_id and ctx.channel.id != canal_comando_id:
-            canal_comando = self.bot.get_channel(canal_comando_id)
-            embed = discord.Embed(
-                title="❌ Canal Incorreto",
-                description=f"Use este comando no canal {canal_comando.mention if canal_comando else 'configurado'}.",
-                color=0xff4444
-            )
-            await ctx.send(embed=embed)
+        sorteio = await self.escolher_sorteio(ctx, numero)
+        if not sorteio:
             return
         
-        # Pega participantes da reação
-        canal_sorteio_id = configs.get('canal_sorteio')
-        canal_sorteio = self.bot.get_channel(canal_sorteio_id)
-        
-        if not canal_sorteio:
+        resultado = await self.finalizar_sorteio(sorteio)
+        if resultado is None:
             embed = discord.Embed(
-                title="❌ Canal do Sorteio Não Encontrado",
-                description="O canal do sorteio foi removido ou não encontrado.",
+                title="❌ Sorteio Já Encerrado",
+                description="Este sorteio acabou de ser encerrado.",
                 color=0xff4444
             )
-            await ctx.send(embed=embed)
-            return
-        
-        try:
-            msg_id = sorteio.get('mensagem_id')
-            if msg_id:
-                msg = await canal_sorteio.fetch_message(msg_id)
-                participantes = []
-                
-                for reaction in msg.reactions:
-                    if str(reaction.emoji) == '🎁':
-                        async for user in reaction.users():
-                            if not user.bot:
-                                participantes.append(user)
-                        break
-            else:
-                participantes = []
-        except:
-            participantes = []
-        
-        if not participantes:
+        elif not resultado[0]:
             embed = discord.Embed(
                 title="❌ Sem Participantes",
                 description="Nenhum participante encontrado no sorteio.",
                 color=0xff4444
             )
-            await ctx.send(embed=embed)
-            return
-        
-        # Sorteia vencedor
-        vencedor = random.choice(participantes)
-        premio = sorteio['premio']
-        
-        # Anuncia no canal do sorteio
-        embed_vencedor = discord.Embed(
-            title="🎊 TEMOS UM VENCEDOR!",
-            description=f"🎉 Parabéns {vencedor.mention}!\n\n**Prêmio:** {premio}",
-            color=0xffd700
-        )
-        embed_vencedor.set_footer(text=f"Sorteado entre {len(participantes)} participantes")
-        
-        await canal_sorteio.send(embed=embed_vencedor)
-        
-        # Confirmação no canal de comando
-        embed = discord.Embed(
-            title="🎊 Vencedor Sorteado",
-            description=f"**Vencedor:** {vencedor.display_name}\n**Participantes:** {len(participantes)}",
-            color=0xffd700
-        )
+        else:
+            vencedores, participantes = resultado
+            nomes = []
+            for user_id in vencedores:
+                membro = ctx.guild.get_member(int(user_id))
+                nomes.append(membro.display_name if membro else user_id)
+            embed = discord.Embed(
+                title="🎊 Vencedor Sorteado" if len(vencedores) == 1 else "🎊 Vencedores Sorteados",
+                description=f"**{'Vencedor' if len(vencedores) == 1 else 'Vencedores'}:** {', '.join(nomes)}\n**Participantes:** {participantes}",
+                color=0xffd700
+            )
         await ctx.send(embed=embed)
     
     @commands.command(name='encerrarsorteio', aliases=['endgw'])
     @commands.has_permissions(administrator=True)
-    async def encerrar_sorteio(self, ctx):
-        """Encerra o sorteio ativo"""
-        guild_id = str(ctx.guild.id)
-        
-        sorteio = await self.get_sorteio(guild_id)
-        if not sorteio or not sorteio.get('ativo'):
-            embed = discord.Embed(
-                title="❌ Nenhum Sorteio Ativo",
-                description="Não há sorteio em andamento para encerrar.",
-                color=0xff4444
-            )
-            await ctx.send(embed=embed)
+    async def encerrar_sorteio(self, ctx, numero: int = None):
+        """Encerra um sorteio sem sortear vencedores"""
+        configs = await self.get_configuracao(str(ctx.guild.id))
+        if await self.canal_comando_incorreto(ctx, configs):
             return
         
-        # Verifica canal de comando
-        configs = await self.get_configuracao(guild_id)
-        canal_comando_id = configs.get('canal_comando')
+        sorteio = await self.escolher_sorteio(ctx, numero)
+        if not sorteio:
+            return
         
-        if canal_comando_id and ctx.channel.id != canal_comando_id:
-            canal_comando = self.bot.get_channel(canal_comando_id)
+        premio = sorteio['premio']
+        if await self.finalizar_sorteio(sorteio, sortear=False) is None:
             embed = discord.Embed(
-                title="❌ Canal Incorreto",
-                description=f"Use este comando no canal {canal_comando.mention if canal_comando else 'configurado'}.",
+                title="❌ Sorteio Já Encerrado",
+                description="Este sorteio acabou de ser encerrado.",
                 color=0xff4444
             )
             await ctx.send(embed=embed)
             return
         
-        # Encerra o sorteio
-        premio = sorteio['premio']
-        sorteio['ativo'] = False
-        await self.save_sorteio(guild_id, sorteio)
-        
-        # Anuncia encerramento no canal do sorteio
-        configs = await self.get_configuracao(guild_id)
-        canal_sorteio_id = configs.get('canal_sorteio')
-        canal_sorteio = self.bot.get_channel(canal_sorteio_id)
-        
-        if canal_sorteio:
-            embed_encerrado = discord.Embed(
-                title="🔒 Sorteio Encerrado",
-                description=f"O sorteio do prêmio **{premio}** foi encerrado.",
-                color=0xff6666
-            )
-            await canal_sorteio.send(embed=embed_encerrado)
-        
         # Confirmação
         embed = discord.Embed(
             title="✅ Sorteio Encerrado",
-            description=f"O sorteio do prêmio **{premio}** foi encerrado com sucesso.",
+            description=f"O sorteio **#{sorteio['numero']}** do prêmio **{premio}** foi encerrado com sucesso.",
             color=0x00ff7f
         )
         await ctx.send(embed=embed)
+
+    @commands.command(name='sorteios', aliases=['gws'])
+    async def listar_sorteios(self, ctx):
+        """Lista os sorteios em andamento no servidor"""
+        ativos = await self.get_sorteios_ativos(ctx.guild.id)
+        if not ativos:
+            embed = discord.Embed(
+                title="🎁 Sorteios",
+                description="Não há sorteios em andamento.",
+                color=0xffaa00
+            )
+            await ctx.send(embed=embed)
+            return
+        
+        embed = discord.Embed(title="🎁 Sorteios em Andamento", color=0x00ff7f)
+        for sorteio in ativos[:25]:
+            linhas = [f"👥 {len(self.entradas.get(sorteio['sorteio_id'], ()))} participantes"]
+            if sorteio.get('vencedores', 1) > 1:
+                linhas.append(f"🏆 {sorteio['vencedores']} vencedores")
+            if sorteio.get('termina_em'):
+                termina_ts = int(sorteio['termina_em'].replace(tzinfo=timezone.utc).timestamp())
+                linhas.append(f"⏰ termina <t:{termina_ts}:R>")
+            if sorteio.get('peso_vip', 1) > 1:
+                linhas.append(f"👑 VIP {sorteio['peso_vip']}x")
+            embed.add_field(name=f"#{sorteio['numero']} - {sorteio['premio']}"[:256], value="\n".join(linhas), inline=False)
+        await ctx.send(embed=embed)
     
     @commands.command(name='canaldecomando', aliases=['cmdchannel'])
     @commands.has_permissions(administrator=True)
@@ -407,11 +799,5 @@ class Sorteio(commands.Cog):
             )
             await ctx.send(embed=embed)
 
-    async def cog_unload(self):
-        """Fecha a conexão com MongoDB quando o cog é descarregado"""
-        if self.client:
-            self.client.close()
-            print("🔌 Conexão com MongoDB (Sorteios) fechada")
-
 async def setup(bot):
     await bot.add_cog(Sorteio(bot))
\ No newline at end of file
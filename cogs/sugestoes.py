@@ -1,18 +1,17 @@
 import discord
 from discord.ext import commands
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
-
-MONGO_URI = os.getenv("MONGO_URI")
 
 class Sugestoes(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.db = AsyncIOMotorClient(MONGO_URI)["sugestoes_bot"]
+        self.db = bot.mongo.get_database("sugestoes_bot")
         
     async def get_config(self, guild_id):
         """Pega a configuração do servidor"""
-        config = await self.db.config.find_one({"guild_id": str(guild_id)})
+        config = await self.bot.mongo.config_cache.get_or_load(
+            self.db.config, guild_id,
+            lambda: self.db.config.find_one({"guild_id": str(guild_id)})
+        )
         return config
     
     @commands.command(name="config_sugestoes")
@@ -31,6 +30,7 @@ class Sugestoes(commands.Cog):
             }},
             upsert=True
         )
+        self.bot.mongo.config_cache.invalidate(self.db.config, ctx.guild.id)
         
         embed = discord.Embed(
             title="⚙️ Configuração Atualizada",
@@ -1,8 +1,6 @@
 import discord
 from discord.ext import commands
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
 
 class TicketSystem(commands.Cog):
     def __init__(self, bot):
@@ -17,20 +15,18 @@ class TicketSystem(commands.Cog):
     async def init_database(self):
         """Inicializa a conexão com MongoDB"""
         try:
-            # URL de conexão do MongoDB (vem de variável de ambiente)
-            mongo_uri = os.getenv("MONGO_URI")
-            
-            if not mongo_uri:
+            # Cliente compartilhado do bot (configurado via variáveis de ambiente)
+            if not self.bot.mongo.is_configured:
                 print("❌ MONGO_URI não encontrada nas variáveis de ambiente!")
                 return
             
             print("🔄 Conectando ao MongoDB...")
-            self.client = AsyncIOMotorClient(mongo_uri)
+            self.client = self.bot.mongo.client
             
             # Testa a conexão
-            await self.client.admin.command('ping')
+            await self.bot.mongo.ping()
             
-            self.db = self.client['discord_bot']
+            self.db = self.bot.mongo.get_database('discord_bot')
             self.collection = self.db['ticket_config']
             self._connection_ready = True
             
@@ -42,6 +38,9 @@ class TicketSystem(commands.Cog):
 
     async def ensure_connection(self):
         """Garante que a conexão com MongoDB está ativa"""
+        # Falha rápido enquanto o circuito do MongoDB estiver aberto
+        if not await self.bot.mongo.available():
+            return False
         if not self._connection_ready:
             await self.init_database()
         return self._connection_ready
@@ -53,7 +52,10 @@ class TicketSystem(commands.Cog):
                 print("❌ Conexão com MongoDB não está disponível")
                 return {}
                 
-            config = await self.collection.find_one({"guild_id": str(guild_id)})
+            config = await self.bot.mongo.config_cache.get_or_load(
+                self.collection, guild_id,
+                lambda: self.collection.find_one({"guild_id": str(guild_id)})
+            )
             return config.get('config', {}) if config else {}
             
         except Exception as e:
@@ -75,6 +77,7 @@ class TicketSystem(commands.Cog):
                 {"$set": {f"config.{key}": value}},
                 upsert=True
             )
+            self.bot.mongo.config_cache.invalidate(self.collection, guild_id)
             
             print(f"✅ Configuração salva: {key} = {value} para guild {guild_id}")
             return True
@@ -281,11 +284,5 @@ class TicketSystem(commands.Cog):
 
         await ctx.send(embed=embed)
 
-    async def cog_unload(self):
-        """Fecha a conexão com MongoDB quando o cog é descarregado"""
-        if self.client:
-            self.client.close()
-            print("🔌 Conexão com MongoDB fechada")
-
 async def setup(bot):
     await bot.add_cog(TicketSystem(bot))
\ No newline at end of file
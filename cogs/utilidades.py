@@ -1,15 +1,205 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import psutil
 import platform
 import datetime
 import time
 import asyncio
+from collections import deque, namedtuple
+
+# Uma amostra do coletor de métricas
+MetricSample = namedtuple('MetricSample', [
+    'timestamp', 'cpu', 'process_cpu', 'rss', 'memory_used', 'memory_total',
+    'memory_percent', 'loop_lag_ms', 'mongo_connections', 'caches'
+])
+
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+
+def sparkline(values, width=40):
+    """Desenha uma série como sparkline, agregando em até width pontos pela média"""
+    values = [v for v in values if v is not None]
+    if not values:
+        return "sem dados"
+    if len(values) > width:
+        step = len(values) / width
+        values = [
+            sum(chunk) / len(chunk)
+            for chunk in (values[int(i * step):int((i + 1) * step)] for i in range(width))
+            if chunk
+        ]
+    low, high = min(values), max(values)
+    span = high - low or 1
+    return "".join(SPARK_CHARS[int((v - low) / span * (len(SPARK_CHARS) - 1))] for v in values)
+
+
+class MemberCounters:
+    """Contadores de membros de uma guild, mantidos pelos eventos"""
+
+    __slots__ = ('humans', 'bots', 'status')
+
+    STATUSES = ('online', 'idle', 'dnd', 'offline')
+
+    def __init__(self):
+        self.humans = 0
+        self.bots = 0
+        self.status = dict.fromkeys(self.STATUSES, 0)
+
+    @classmethod
+    def from_members(cls, members):
+        """Conta tudo numa única passada pelos membros"""
+        counters = cls()
+        for member in members:
+            counters.add(member)
+        return counters
+
+    @staticmethod
+    def status_key(status):
+        # invisible e desconhecidos contam como offline
+        key = str(status)
+        return key if key in MemberCounters.STATUSES else 'offline'
+
+    def add(self, member):
+        if member.bot:
+            self.bots += 1
+        else:
+            self.humans += 1
+        self.status[self.status_key(member.status)] += 1
+
+    def remove(self, member):
+        if member.bot:
+            self.bots = max(0, self.bots - 1)
+        else:
+            self.humans = max(0, self.humans - 1)
+        key = self.status_key(member.status)
+        self.status[key] = max(0, self.status[key] - 1)
+
+    def move_status(self, before, after):
+        before, after = self.status_key(before), self.status_key(after)
+        if before != after:
+            self.status[before] = max(0, self.status[before] - 1)
+            self.status[after] += 1
+
+    @property
+    def online(self):
+        """Todos que não estão offline (online, ausente e ocupado)"""
+        return self.status['online'] + self.status['idle'] + self.status['dnd']
+
 
 class Utilities(commands.Cog):
+    # Intervalo entre amostras e tamanho do histórico (1h)
+    METRICS_INTERVAL = 10
+    METRICS_HISTORY = 360
+
     def __init__(self, bot):
         self.bot = bot
         self.start_time = time.time()
+        self.process = psutil.Process()
+        self.metrics = deque(maxlen=self.METRICS_HISTORY)
+        # guild_id -> MemberCounters (criado sob demanda quando a guild está chunked)
+        self.member_counters = {}
+        self.sample_metrics.start()
+        self.reconcile_member_counters.start()
+
+    def cog_unload(self):
+        self.sample_metrics.cancel()
+        self.reconcile_member_counters.cancel()
+
+    def get_member_counters(self, guild):
+        """Contadores da guild, ou None se os membros ainda não estão em cache"""
+        counters = self.member_counters.get(guild.id)
+        if counters is None and guild.chunked:
+            counters = self.member_counters[guild.id] = MemberCounters.from_members(guild.members)
+        return counters
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        counters = self.member_counters.get(member.guild.id)
+        if counters:
+            counters.add(member)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        counters = self.member_counters.get(member.guild.id)
+        if counters:
+            counters.remove(member)
+
+    @commands.Cog.listener()
+    async def on_presence_update(self, before, after):
+        if before.status == after.status:
+            return
+        counters = self.member_counters.get(after.guild.id)
+        if counters:
+            counters.move_status(before.status, after.status)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.member_counters.pop(guild.id, None)
+
+    @tasks.loop(minutes=30)
+    async def reconcile_member_counters(self):
+        """Recontagem completa para corrigir eventos perdidos (ex.: reconexões)"""
+        for guild_id in list(self.member_counters):
+            guild = self.bot.get_guild(guild_id)
+            if guild is None:
+                self.member_counters.pop(guild_id, None)
+            elif guild.chunked:
+                self.member_counters[guild_id] = MemberCounters.from_members(guild.members)
+            # Cede o loop entre guilds grandes
+            await asyncio.sleep(0)
+
+    @reconcile_member_counters.before_loop
+    async def before_reconcile_member_counters(self):
+        await self.bot.wait_until_ready()
+
+    def cache_sizes(self):
+        """Tamanho dos caches em memória dos cogs carregados"""
+        caches = {
+            'configs': len(self.bot.mongo.config_cache),
+            'mensagens': len(self.bot.cached_messages)
+        }
+        xp = self.bot.get_cog('XPSystem')
+        if xp:
+            caches['xp'] = len(xp.xp_cache)
+            caches['xp_pendente'] = len(xp.pending_xp)
+        logs = self.bot.get_cog('AdvancedLogs')
+        if logs:
+            caches['logs_mensagens'] = len(logs.message_cache)
+        lembretes = self.bot.get_cog('Lembretes')
+        if lembretes:
+            caches['lembretes'] = len(lembretes.lembretes_ativos)
+        return caches
+
+    async def measure_loop_lag(self):
+        """Tempo que um callback espera na fila do event loop, em ms"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        start = loop.time()
+        loop.call_soon(future.set_result, None)
+        await future
+        return (loop.time() - start) * 1000
+
+    @tasks.loop(seconds=METRICS_INTERVAL)
+    async def sample_metrics(self):
+        """Coleta uma amostra sem bloquear (cpu_percent sem intervalo mede desde a última chamada)"""
+        try:
+            memory = psutil.virtual_memory()
+            sample = MetricSample(
+                timestamp=time.time(),
+                cpu=psutil.cpu_percent(interval=None),
+                process_cpu=self.process.cpu_percent(interval=None),
+                rss=self.process.memory_info().rss,
+                memory_used=memory.used,
+                memory_total=memory.total,
+                memory_percent=memory.percent,
+                loop_lag_ms=await self.measure_loop_lag(),
+                mongo_connections=self.bot.mongo.pool.open,
+                caches=self.cache_sizes()
+            )
+        except Exception as e:
+            print(f"⚠️ Erro ao coletar métricas: {e}")
+            return
+        self.metrics.append(sample)
 
     @commands.command(name='botinfo', aliases=['bot'])
     async def mostrar_botinfo(self, ctx):
@@ -22,12 +212,12 @@ class Utilities(commands.Cog):
             total_members = sum(guild.member_count or 0 for guild in self.bot.guilds)
             total_channels = sum(len(guild.channels) for guild in self.bot.guilds)
 
-            # Sistema com tratamento de erro
-            try:
-                cpu_usage = psutil.cpu_percent(interval=1)
-                memory = psutil.virtual_memory()
-                memory_usage = f"{memory.used / 1024**3:.1f}GB / {memory.total / 1024**3:.1f}GB ({memory.percent:.1f}%)"
-            except:
+            # Última amostra do coletor (sem bloquear o event loop)
+            sample = self.metrics[-1] if self.metrics else None
+            if sample:
+                cpu_usage = sample.cpu
+                memory_usage = f"{sample.memory_used / 1024**3:.1f}GB / {sample.memory_total / 1024**3:.1f}GB ({sample.memory_percent:.1f}%)"
+            else:
                 cpu_usage = "N/A"
                 memory_usage = "N/A"
 
@@ -172,10 +362,11 @@ class Utilities(commands.Cog):
 
             # Contadores de membros com verificação
             total_members = guild.member_count or 0
-            if guild.chunked:
-                humans = sum(1 for member in guild.members if not member.bot)
-                bots = total_members - humans
-                online = sum(1 for member in guild.members if member.status != discord.Status.offline)
+            counters = self.get_member_counters(guild)
+            if counters:
+                humans = counters.humans
+                bots = counters.bots
+                online = counters.online
             else:
                 # Se o guild não está chunked, usar aproximações
                 humans = total_members
@@ -437,19 +628,13 @@ class Utilities(commands.Cog):
 
             total = guild.member_count or 0
             
-            # Verificar se o guild está chunked para estatísticas precisas
-            if guild.chunked:
-                humans = sum(1 for member in guild.members if not member.bot)
-                bots = total - humans
-                online = sum(1 for member in guild.members if member.status != discord.Status.offline)
-
-                # Status detalhados
-                status_counts = {
-                    'online': sum(1 for m in guild.members if m.status == discord.Status.online),
-                    'idle': sum(1 for m in guild.members if m.status == discord.Status.idle),
-                    'dnd': sum(1 for m in guild.members if m.status == discord.Status.dnd),
-                    'offline': sum(1 for m in guild.members if m.status == discord.Status.offline)
-                }
+            # Contadores incrementais quando o guild está chunked
+            counters = self.get_member_counters(guild)
+            if counters:
+                humans = counters.humans
+                bots = counters.bots
+                online = counters.online
+                status_counts = dict(counters.status)
             else:
                 # Aproximações se não chunked
                 await ctx.send("⚠️ Carregando membros do servidor... Isso pode levar alguns segundos.")
@@ -457,15 +642,11 @@ class Utilities(commands.Cog):
                     async for member in guild.fetch_members(limit=None):
                         pass
                     # Tentar novamente após fetch
-                    humans = sum(1 for member in guild.members if not member.bot)
+                    fetched = MemberCounters.from_members(guild.members)
+                    humans = fetched.humans
                     bots = total - humans
-                    online = sum(1 for member in guild.members if member.status != discord.Status.offline)
-                    status_counts = {
-                        'online': sum(1 for m in guild.members if m.status == discord.Status.online),
-                        'idle': sum(1 for m in guild.members if m.status == discord.Status.idle),
-                        'dnd': sum(1 for m in guild.members if m.status == discord.Status.dnd),
-                        'offline': sum(1 for m in guild.members if m.status == discord.Status.offline)
-                    }
+                    online = fetched.online
+                    status_counts = dict(fetched.status)
                 except:
                     humans, bots, online = total, 0, 0
                     status_counts = {'online': 0, 'idle': 0, 'dnd': 0, 'offline': total}
@@ -513,6 +694,88 @@ class Utilities(commands.Cog):
         except Exception as e:
             await ctx.send(f"❌ Erro ao contar membros: {str(e)}")
 
+    @commands.command(name='dbstatus', hidden=True)
+    @commands.is_owner()
+    async def mostrar_dbstatus(self, ctx):
+        """Mostra o estado do cliente MongoDB compartilhado (apenas para o dono do bot)"""
+        try:
+            health = await self.bot.mongo.health()
+
+            embed = discord.Embed(
+                title="🗃️ Status do MongoDB",
+                color=discord.Color.green() if health['ok'] else discord.Color.red(),
+                timestamp=datetime.datetime.utcnow()
+            )
+
+            ping = f"{health['ping_ms']:.1f}ms" if health['ping_ms'] is not None else "N/A"
+            embed.add_field(name="📡 Conexão", value=(
+                f"**Configurado:** {'Sim' if health['configured'] else 'Não'}\n"
+                f"**Online:** {'Sim' if health['ok'] else 'Não'}\n"
+                f"**Ping:** {ping}\n"
+                f"**Circuito:** {health['circuit']} ({health['failures']} falhas)"
+            ), inline=True)
+
+            embed.add_field(name="⚙️ Pool", value=(
+                f"**Máx:** {health['max_pool_size']}\n"
+                f"**Mín:** {health['min_pool_size']}\n"
+                f"**Abertas:** {health['open_connections']} | **Em uso:** {health['checked_out_connections']}\n"
+                f"**Timeout:** {health['server_selection_timeout_ms']}ms"
+            ), inline=True)
+
+            cache = health['config_cache']
+            embed.add_field(name="🧠 Cache de Configs", value=(
+                f"**Entradas:** {cache['size']:,}/{cache['max_size']:,}\n"
+                f"**Hits:** {cache['hits']:,} | **Misses:** {cache['misses']:,}\n"
+                f"**Taxa de acerto:** {cache['hit_rate'] * 100:.1f}%\n"
+                f"**TTL:** {cache['ttl']}s | **Evicções:** {cache['evictions']:,}"
+            ), inline=True)
+
+            embed.add_field(name="📚 Bancos", value=", ".join(health['databases']) or "Nenhum", inline=False)
+
+            if health['error']:
+                embed.add_field(name="❌ Último erro", value=f"```{health['error'][:200]}```", inline=False)
+
+            await ctx.send(embed=embed)
+        except Exception as e:
+            await ctx.send(f"❌ Erro ao verificar o banco de dados: {str(e)}")
+
+    @commands.command(name='metricas', aliases=['metrics'], hidden=True)
+    @commands.is_owner()
+    async def mostrar_metricas(self, ctx, minutos: int = 60):
+        """Mostra o histórico recente das métricas em sparklines (apenas para o dono do bot)"""
+        if not self.metrics:
+            await ctx.send("⏳ Nenhuma amostra coletada ainda, tente em alguns segundos.")
+            return
+
+        since = time.time() - max(1, minutos) * 60
+        samples = [s for s in self.metrics if s.timestamp >= since] or [self.metrics[-1]]
+        latest = samples[-1]
+
+        def serie(nome, valores, atual):
+            return f"**{nome}** ({atual})\n`{sparkline(valores)}`\nmín {min(valores):.1f} | máx {max(valores):.1f}"
+
+        lags = [s.loop_lag_ms for s in samples]
+        rss = [s.rss / 1024**2 for s in samples]
+        embed = discord.Embed(
+            title="📈 Métricas do Bot",
+            description="\n\n".join([
+                serie("CPU do sistema %", [s.cpu for s in samples], f"{latest.cpu:.1f}%"),
+                serie("CPU do processo %", [s.process_cpu for s in samples], f"{latest.process_cpu:.1f}%"),
+                serie("RSS MB", rss, f"{rss[-1]:.1f}MB"),
+                serie("Lag do loop ms", lags, f"{latest.loop_lag_ms:.2f}ms"),
+                serie("Conexões MongoDB", [s.mongo_connections for s in samples], str(latest.mongo_connections))
+            ]),
+            color=discord.Color.blue(),
+            timestamp=datetime.datetime.utcnow()
+        )
+        embed.add_field(
+            name="🧠 Caches",
+            value="\n".join(f"**{nome}:** {tamanho:,}" for nome, tamanho in latest.caches.items()),
+            inline=False
+        )
+        embed.set_footer(text=f"{len(samples)} amostras a cada {self.METRICS_INTERVAL}s")
+        await ctx.send(embed=embed)
+
     # Comando adicional para limpeza de cache
     @commands.command(name='reload', hidden=True)
     @commands.is_owner()
@@ -1,9 +1,8 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import asyncio
+import heapq
 from datetime import datetime, timedelta
-from motor.motor_asyncio import AsyncIOMotorClient
-import os
 import logging
 
 # Configuração de logging
@@ -19,26 +18,32 @@ class VIPSystem(commands.Cog):
         self.config_collection = None
         self._connection_ready = False
         
+        # Índice em memória: guild_id -> {user_id: expiry}
+        self.vip_index = {}
+        self._index_ready = False
+        # Heap de expirações (expiry, guild_id, user_id) e o agendador que a consome
+        self.expiry_heap = []
+        self._expiry_wakeup = asyncio.Event()
+        self.expiry_task = None
+        
         # Inicializa a conexão com MongoDB
         self.bot.loop.create_task(self.init_database())
         
     async def init_database(self):
         """Inicializa a conexão com MongoDB"""
         try:
-            # URL de conexão do MongoDB (vem de variável de ambiente)
-            mongo_uri = os.getenv("MONGO_URI")
-            
-            if not mongo_uri:
+            # Cliente compartilhado do bot (configurado via variáveis de ambiente)
+            if not self.bot.mongo.is_configured:
                 print("❌ MONGO_URI não encontrada nas variáveis de ambiente!")
                 return
             
             print("🔄 Conectando ao MongoDB (VIP System)...")
-            self.client = AsyncIOMotorClient(mongo_uri)
+            self.client = self.bot.mongo.client
             
             # Testa a conexão
-            await self.client.admin.command('ping')
+            await self.bot.mongo.ping()
             
-            self.db = self.client['discord_bot']
+            self.db = self.bot.mongo.get_database('discord_bot')
             self.vip_collection = self.db['vip_data']
             self.config_collection = self.db['vip_config']
             self._connection_ready = True
@@ -48,9 +53,10 @@ class VIPSystem(commands.Cog):
             # Cria índices para melhor performance
             await self.create_indexes()
             
-            # Inicia loop de verificação
-            if not self.check_vip_expiry.is_running():
-                self.check_vip_expiry.start()
+            # Carrega os VIPs em memória e inicia o agendador de expirações
+            await self.load_vip_index()
+            if self.expiry_task is None or self.expiry_task.done():
+                self.expiry_task = asyncio.create_task(self.expiry_scheduler())
             
         except Exception as e:
             print(f"❌ Erro ao conectar VIP System com MongoDB: {e}")
@@ -58,6 +64,9 @@ class VIPSystem(commands.Cog):
 
     async def ensure_connection(self):
         """Garante que a conexão com MongoDB está ativa"""
+        # Falha rápido enquanto o circuito do MongoDB estiver aberto
+        if not await self.bot.mongo.available():
+            return False
         if not self._connection_ready:
             await self.init_database()
         return self._connection_ready
@@ -85,6 +94,96 @@ class VIPSystem(commands.Cog):
         except Exception as e:
             print(f"📊 Erro ao criar índices VIP: {e}")
 
+    async def load_vip_index(self):
+        """Carrega todos os VIPs do MongoDB para o índice em memória"""
+        vip_index = {}
+        heap = []
+        cursor = self.vip_collection.find({}, {"user_id": 1, "guild_id": 1, "expiry": 1})
+        async for vip_data in cursor:
+            guild_id = vip_data['guild_id']
+            user_id = vip_data['user_id']
+            vip_index.setdefault(guild_id, {})[user_id] = vip_data['expiry']
+            heap.append((vip_data['expiry'], guild_id, user_id))
+        
+        heapq.heapify(heap)
+        self.vip_index = vip_index
+        self.expiry_heap = heap
+        self._index_ready = True
+        self._expiry_wakeup.set()
+        print(f"👑 {len(heap)} VIPs carregados em memória")
+
+    def index_vip(self, user_id, guild_id, expiry):
+        """Adiciona/atualiza um VIP no índice e agenda sua expiração"""
+        user_id, guild_id = str(user_id), str(guild_id)
+        self.vip_index.setdefault(guild_id, {})[user_id] = expiry
+        heapq.heappush(self.expiry_heap, (expiry, guild_id, user_id))
+        # Acorda o agendador se essa expiração for a próxima
+        if self.expiry_heap[0][0] == expiry:
+            self._expiry_wakeup.set()
+
+    def unindex_vip(self, user_id, guild_id):
+        """Remove um VIP do índice (a entrada antiga na heap é ignorada ao sair)"""
+        guild_vips = self.vip_index.get(str(guild_id))
+        if guild_vips is not None:
+            guild_vips.pop(str(user_id), None)
+            if not guild_vips:
+                del self.vip_index[str(guild_id)]
+
+    async def expiry_scheduler(self):
+        """Dorme até a próxima expiração da heap e remove o VIP nesse instante"""
+        await self.bot.wait_until_ready()
+        while True:
+            self._expiry_wakeup.clear()
+            
+            if self.expiry_heap:
+                # Limite de 1h para corrigir eventuais ajustes de relógio
+                delay = min((self.expiry_heap[0][0] - datetime.now()).total_seconds(), 3600)
+            else:
+                delay = None
+            
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._expiry_wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            expiry, guild_id, user_id = heapq.heappop(self.expiry_heap)
+            
+            # Entrada obsoleta: VIP renovado ou removido depois de agendado
+            if self.vip_index.get(guild_id, {}).get(user_id) != expiry:
+                continue
+            
+            try:
+                await self.expire_vip(guild_id, user_id, expiry)
+            except Exception as e:
+                print(f"❌ Erro ao expirar VIP {user_id} na guild {guild_id}: {e}")
+
+    async def expire_vip(self, guild_id, user_id, expiry):
+        """Remove um VIP expirado do índice, do cargo e do MongoDB"""
+        self.unindex_vip(user_id, guild_id)
+        
+        # Remove cargo VIP se possível
+        try:
+            guild = self.bot.get_guild(int(guild_id))
+            if guild:
+                member = guild.get_member(int(user_id))
+                vip_role = await self.get_vip_role(guild)
+                
+                if member and vip_role and vip_role in member.roles:
+                    await member.remove_roles(vip_role)
+                    print(f"Cargo VIP removido de {member.name} (expirado)")
+        except discord.HTTPException:
+            pass  # Ignora erros de permissão
+        
+        # Só apaga se não foi renovado nesse meio tempo
+        if await self.ensure_connection():
+            await self.vip_collection.delete_one({
+                "user_id": user_id,
+                "guild_id": guild_id,
+                "expiry": {"$lte": expiry}
+            })
+
     async def get_vip_data(self, user_id, guild_id):
         """Obtém dados VIP de um usuário do MongoDB"""
         try:
@@ -125,6 +224,7 @@ class VIPSystem(commands.Cog):
                 data,
                 upsert=True
             )
+            self.index_vip(user_id, guild_id, expiry)
             
             print(f"✅ VIP salvo: User {user_id} - Guild {guild_id}")
             return True
@@ -144,6 +244,7 @@ class VIPSystem(commands.Cog):
                 "user_id": str(user_id),
                 "guild_id": str(guild_id)
             })
+            self.unindex_vip(user_id, guild_id)
             
             if result.deleted_count > 0:
                 print(f"✅ VIP removido: User {user_id} - Guild {guild_id}")
@@ -163,21 +264,28 @@ class VIPSystem(commands.Cog):
                 print("❌ Conexão com MongoDB não está disponível")
                 return self.get_default_config(guild_id)
                 
-            config = await self.config_collection.find_one({"guild_id": str(guild_id)})
-            
-            if not config:
-                # Configuração padrão
-                default_config = self.get_default_config(guild_id)
-                await self.save_vip_config(guild_id, default_config)
-                print(f"📋 Configuração VIP padrão criada para Guild {guild_id}")
-                return default_config
-                
-            return config
+            return await self.bot.mongo.config_cache.get_or_load(
+                self.config_collection, guild_id,
+                lambda: self.load_vip_config(guild_id)
+            )
             
         except Exception as e:
             print(f"❌ Erro ao buscar configuração VIP: {e}")
             return self.get_default_config(guild_id)
 
+    async def load_vip_config(self, guild_id):
+        """Lê a configuração VIP do banco, criando a padrão se não existir"""
+        config = await self.config_collection.find_one({"guild_id": str(guild_id)})
+        
+        if not config:
+            # Configuração padrão
+            default_config = self.get_default_config(guild_id)
+            await self.save_vip_config(guild_id, default_config)
+            print(f"📋 Configuração VIP padrão criada para Guild {guild_id}")
+            return default_config
+            
+        return config
+
     def get_default_config(self, guild_id):
         """Retorna configuração padrão"""
         return {
@@ -214,6 +322,10 @@ class VIPSystem(commands.Cog):
         except Exception as e:
             print(f"❌ Erro ao salvar configuração VIP: {e}")
             return False
+        
+        finally:
+            # O dict salvo pode ser o mesmo objeto do cache
+            self.bot.mongo.config_cache.invalidate(self.config_collection, guild_id)
 
     async def get_vip_role(self, guild):
         """Obtém o cargo VIP configurado para o servidor"""
@@ -224,13 +336,25 @@ class VIPSystem(commands.Cog):
         return None
 
     async def is_vip(self, user_id, guild_id):
-        """Verifica se um usuário é VIP"""
+        """Verifica se um usuário é VIP (consulta O(1) no índice em memória)"""
+        if self._index_ready:
+            expiry = self.vip_index.get(str(guild_id), {}).get(str(user_id))
+            return expiry is not None and datetime.now() < expiry
+        
+        # Índice ainda não carregado: consulta o banco
         vip_data = await self.get_vip_data(user_id, guild_id)
         if vip_data:
             expiry_date = vip_data['expiry']
             return datetime.now() < expiry_date
         return False
 
+    def vip_users(self, guild_id):
+        """IDs dos VIPs ativos do servidor, ou None se o índice ainda não carregou"""
+        if not self._index_ready:
+            return None
+        now = datetime.now()
+        return {user_id for user_id, expiry in self.vip_index.get(str(guild_id), {}).items() if expiry > now}
+
     async def get_vip_multiplier(self, guild_id, type_bonus="xp"):
         """Obtém multiplicador VIP para XP, economia, etc."""
         config = await self.get_vip_config(guild_id)
@@ -540,49 +664,6 @@ class VIPSystem(commands.Cog):
         
         await ctx.send(embed=embed)
 
-    @tasks.loop(hours=1)
-    async def check_vip_expiry(self):
-        """Verifica VIPs expirados a cada hora"""
-        try:
-            if not self._connection_ready:
-                return
-                
-            # Busca VIPs expirados no MongoDB
-            expired_vips = []
-            cursor = self.vip_collection.find({
-                "expiry": {"$lte": datetime.now()}
-            })
-            
-            async for vip_data in cursor:
-                expired_vips.append(vip_data)
-                
-                # Remove cargo VIP se possível
-                try:
-                    guild = self.bot.get_guild(int(vip_data['guild_id']))
-                    if guild:
-                        member = guild.get_member(int(vip_data['user_id']))
-                        vip_role = await self.get_vip_role(guild)
-                        
-                        if member and vip_role and vip_role in member.roles:
-                            await member.remove_roles(vip_role)
-                            print(f"Cargo VIP removido de {member.name} (expirado)")
-                except:
-                    pass  # Ignora erros de permissão
-            
-            # Remove VIPs expirados do MongoDB
-            if expired_vips:
-                result = await self.vip_collection.delete_many({
-                    "expiry": {"$lte": datetime.now()}
-                })
-                print(f"Removidos {result.deleted_count} VIPs expirados")
-                
-        except Exception as e:
-            print(f"❌ Erro ao verificar VIPs expirados: {e}")
-
-    @check_vip_expiry.before_loop
-    async def before_check_vip_expiry(self):
-        await self.bot.wait_until_ready()
-
     # Métodos auxiliares para outros sistemas usarem
     async def apply_vip_bonus_xp(self, user_id, guild_id, base_xp):
         """Aplica bônus VIP no XP"""
@@ -636,12 +717,8 @@ class VIPSystem(commands.Cog):
 
     async def cog_unload(self):
         """Cleanup quando o cog é descarregado"""
-        if self.check_vip_expiry.is_running():
-            self.check_vip_expiry.cancel()
-        
-        if self.client:
-            self.client.close()
-            print("🔌 Conexão VIP System com MongoDB fechada")
+        if self.expiry_task:
+            self.expiry_task.cancel()
 
 async def setup(bot):
     await bot.add_cog(VIPSystem(bot))
\ No newline at end of file
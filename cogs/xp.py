@@ -4,74 +4,135 @@ import asyncio
 from datetime import datetime, timedelta
 import math
 import random
-import os
-from motor.motor_asyncio import AsyncIOMotorClient
+from bisect import bisect_left, insort
+from pymongo import UpdateOne
+from pymongo.errors import ConnectionFailure
+
+class XPLeaderboard:
+    """Ranking ordenado de XP de uma guild (busca de posição em O(log n))"""
+
+    def __init__(self):
+        self.entries = []  # (-xp, user_id) em ordem crescente = maior XP primeiro
+        self.users = {}    # user_id -> (xp, level)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def update(self, user_id, xp, level):
+        """Insere ou move o usuário para a posição do novo XP"""
+        old = self.users.get(user_id)
+        if old is not None:
+            if old[0] == xp:
+                self.users[user_id] = (xp, level)
+                return
+            del self.entries[bisect_left(self.entries, (-old[0], user_id))]
+        insort(self.entries, (-xp, user_id))
+        self.users[user_id] = (xp, level)
+
+    def remove(self, user_id):
+        """Remove o usuário do ranking"""
+        old = self.users.pop(user_id, None)
+        if old is not None:
+            del self.entries[bisect_left(self.entries, (-old[0], user_id))]
+
+    def rank(self, user_id):
+        """Posição (1-based) do usuário ou None se não estiver no ranking"""
+        data = self.users.get(user_id)
+        if data is None:
+            return None
+        return bisect_left(self.entries, (-data[0], user_id)) + 1
+
+    def page(self, start, end):
+        """Fatia do ranking como lista de (user_id, xp, level)"""
+        return [(user_id, -neg_xp, self.users[user_id][1]) for neg_xp, user_id in self.entries[start:end]]
 
 class XPSystem(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.message_cooldowns = {}
         
-        # Configuração do MongoDB usando variável de ambiente
-        mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
-        self.mongo_client = AsyncIOMotorClient(mongo_uri)
-        self.db = self.mongo_client['discord_bot']
+        # Write-behind: totais em memória + incrementos pendentes por user_key
+        self.xp_cache = {}
+        self.pending_xp = {}
+        self.xp_cache_idle = 3600  # segundos sem mensagens até sair do cache
+        
+        # Rankings por guild, montados sob demanda no primeiro !topxp
+        self.leaderboards = {}
+        self._leaderboard_locks = {}
+        
+        # Cliente MongoDB compartilhado do bot
+        self.mongo_client = self.bot.mongo.client
+        self.db = self.bot.mongo.get_database('discord_bot')
         self.xp_collection = self.db['xp_data']
         self.config_collection = self.db['xp_config']
         
         # Verificar conexão no startup
         self.bot.loop.create_task(self.test_db_connection())
+        self.flush_xp.start()
 
     async def test_db_connection(self):
         """Testa a conexão com o banco de dados"""
         try:
             # Tenta fazer uma operação simples para verificar a conexão
-            await self.mongo_client.admin.command('ping')
+            await self.bot.mongo.ping()
             print("✅ Conexão com MongoDB estabelecida com sucesso!")
             
             # Lista as coleções existentes
             collections = await self.db.list_collection_names()
             print(f"📊 Coleções encontradas: {collections}")
             
+            # Índices usados pelo cache de XP e pela montagem do ranking
+            await self.xp_collection.create_index('user_key')
+            await self.xp_collection.create_index([('guild_id', 1), ('xp', -1)])
+            
         except Exception as e:
             print(f"❌ Erro ao conectar com MongoDB: {e}")
 
+    def get_default_config(self, guild_id):
+        """Configuração padrão de XP"""
+        return {
+            'guild_id': str(guild_id),
+            'base_xp': 15,
+            'xp_per_message': 25,
+            'xp_per_level': 100,
+            'cooldown': 60,
+            'vip_cooldown': 30,
+            'vip_multiplier': 2.0
+        }
+
     async def get_guild_config(self, guild_id):
-        """Obtém configuração da guild"""
+        """Obtém configuração da guild (via cache compartilhado)"""
         guild_id = str(guild_id)
+        cache = self.bot.mongo.config_cache
+        
+        # Banco fora: usa o que estiver em cache (mesmo expirado) sem esperar timeout
+        if not await self.bot.mongo.available():
+            return cache.peek(self.config_collection, guild_id) or self.get_default_config(guild_id)
+        
         try:
-            config = await self.config_collection.find_one({'guild_id': guild_id})
-            
-            if not config:
-                default_config = {
-                    'guild_id': guild_id,
-                    'base_xp': 15,
-                    'xp_per_message': 25,
-                    'xp_per_level': 100,
-                    'cooldown': 60,
-                    'vip_cooldown': 30,
-                    'vip_multiplier': 2.0,
-                    'created_at': datetime.now().isoformat(),
-                    'updated_at': datetime.now().isoformat()
-                }
-                await self.config_collection.insert_one(default_config)
-                print(f"🆕 Configuração padrão criada para guild {guild_id}")
-                return default_config
-            
-            return config
+            return await cache.get_or_load(
+                self.config_collection, guild_id,
+                lambda: self.load_guild_config(guild_id)
+            )
             
         except Exception as e:
             print(f"❌ Erro ao buscar config da guild {guild_id}: {e}")
             # Retorna config padrão em caso de erro
-            return {
-                'guild_id': guild_id,
-                'base_xp': 15,
-                'xp_per_message': 25,
-                'xp_per_level': 100,
-                'cooldown': 60,
-                'vip_cooldown': 30,
-                'vip_multiplier': 2.0
-            }
+            return self.get_default_config(guild_id)
+
+    async def load_guild_config(self, guild_id):
+        """Lê a configuração da guild do banco, criando a padrão se não existir"""
+        config = await self.config_collection.find_one({'guild_id': guild_id})
+        
+        if not config:
+            default_config = self.get_default_config(guild_id)
+            default_config['created_at'] = datetime.now().isoformat()
+            default_config['updated_at'] = datetime.now().isoformat()
+            await self.config_collection.insert_one(default_config)
+            print(f"🆕 Configuração padrão criada para guild {guild_id}")
+            return default_config
+        
+        return config
 
     async def save_guild_config(self, guild_id, config):
         """Salva configuração da guild"""
@@ -94,10 +155,16 @@ class XPSystem(commands.Cog):
         except Exception as e:
             print(f"❌ Erro ao salvar config da guild {guild_id}: {e}")
             return False
+        
+        finally:
+            # O dict salvo pode ser o mesmo objeto do cache
+            self.bot.mongo.config_cache.invalidate(self.config_collection, guild_id)
 
     async def get_user_data(self, user_id, guild_id):
         """Obtém dados do usuário"""
         user_key = f"{guild_id}_{user_id}"
+        if user_key in self.xp_cache:
+            return self.xp_cache[user_key]
         try:
             user_data = await self.xp_collection.find_one({'user_key': user_key})
             
@@ -154,6 +221,167 @@ class XPSystem(commands.Cog):
             print(f"❌ Erro ao salvar dados do usuário {user_id}: {e}")
             return False
 
+    async def get_cached_user_data(self, user_id, guild_id):
+        """Obtém dados do usuário do cache (carrega do banco só na primeira vez)
+        
+        Retorna None se o usuário não está em cache e o banco está fora.
+        """
+        user_key = f"{guild_id}_{user_id}"
+        user_data = self.xp_cache.get(user_key)
+        if user_data is None:
+            if not await self.bot.mongo.available():
+                return None
+            user_data = await self.xp_collection.find_one({'user_key': user_key}) or {
+                'user_key': user_key,
+                'user_id': str(user_id),
+                'guild_id': str(guild_id),
+                'xp': 0,
+                'level': 1,
+                'messages': 0,
+                'last_message': None
+            }
+            # Outra mensagem pode ter carregado o mesmo usuário enquanto aguardávamos
+            user_data = self.xp_cache.setdefault(user_key, user_data)
+        return user_data
+
+    def queue_xp(self, user_data, xp, messages=1):
+        """Acumula incrementos de XP para o próximo flush"""
+        pending = self.pending_xp.setdefault(user_data['user_key'], {
+            'user_id': user_data['user_id'],
+            'guild_id': user_data['guild_id'],
+            'xp': 0,
+            'messages': 0
+        })
+        pending['xp'] += xp
+        pending['messages'] += messages
+        pending['level'] = user_data['level']
+        pending['last_message'] = user_data['last_message']
+
+    async def flush_pending_xp(self):
+        """Grava todos os incrementos pendentes em um único bulk_write"""
+        if not self.pending_xp:
+            return 0
+        
+        # Com o circuito aberto os incrementos ficam acumulados em memória
+        if not await self.bot.mongo.available():
+            return 0
+        
+        pending, self.pending_xp = self.pending_xp, {}
+        now = datetime.now().isoformat()
+        operations = [
+            UpdateOne(
+                {'user_key': user_key},
+                {
+                    '$inc': {'xp': delta['xp'], 'messages': delta['messages']},
+                    '$set': {
+                        'level': delta['level'],
+                        'last_message': delta['last_message'],
+                        'updated_at': now
+                    },
+                    '$setOnInsert': {
+                        'user_id': delta['user_id'],
+                        'guild_id': delta['guild_id'],
+                        'created_at': now
+                    }
+                },
+                upsert=True
+            )
+            for user_key, delta in pending.items()
+        ]
+        
+        try:
+            await self.xp_collection.bulk_write(operations, ordered=False)
+        except asyncio.CancelledError:
+            self.requeue_xp(pending)
+            raise
+        except Exception as e:
+            print(f"❌ Erro ao gravar XP pendente ({len(operations)} usuários): {e}")
+            if isinstance(e, ConnectionFailure):
+                self.bot.mongo.record_failure(e)
+            self.requeue_xp(pending)
+            return 0
+        
+        return len(operations)
+
+    def requeue_xp(self, pending):
+        """Devolve incrementos não gravados para a fila sem perder os que chegaram nesse meio tempo"""
+        for user_key, delta in pending.items():
+            current = self.pending_xp.get(user_key)
+            if current:
+                current['xp'] += delta['xp']
+                current['messages'] += delta['messages']
+            else:
+                self.pending_xp[user_key] = delta
+
+    @tasks.loop(seconds=5)
+    async def flush_xp(self):
+        """Flush periódico do XP acumulado"""
+        await self.flush_pending_xp()
+        
+        # Remove do cache usuários inativos que não têm nada pendente
+        cutoff = datetime.now() - timedelta(seconds=self.xp_cache_idle)
+        for user_key, last in list(self.message_cooldowns.items()):
+            if last < cutoff and user_key not in self.pending_xp:
+                self.message_cooldowns.pop(user_key, None)
+                self.xp_cache.pop(user_key, None)
+
+    async def get_leaderboard(self, guild):
+        """Obtém o ranking da guild, montando-o do banco na primeira chamada"""
+        leaderboard = self.leaderboards.get(guild.id)
+        if leaderboard is not None:
+            return leaderboard
+        
+        lock = self._leaderboard_locks.setdefault(guild.id, asyncio.Lock())
+        async with lock:
+            if guild.id in self.leaderboards:
+                return self.leaderboards[guild.id]
+            
+            leaderboard = XPLeaderboard()
+            cursor = self.xp_collection.find(
+                {'guild_id': str(guild.id)},
+                {'user_id': 1, 'xp': 1, 'level': 1}
+            )
+            async for data in cursor:
+                user_id = int(data['user_id'])
+                # Apenas membros que ainda estão no servidor
+                if guild.get_member(user_id):
+                    leaderboard.update(user_id, data.get('xp', 0), data.get('level', 1))
+            
+            # Totais em memória são mais recentes que o banco (XP ainda não gravado)
+            for user_data in list(self.xp_cache.values()):
+                user_id = int(user_data['user_id'])
+                if user_data['guild_id'] == str(guild.id) and guild.get_member(user_id):
+                    leaderboard.update(user_id, user_data['xp'], user_data['level'])
+            
+            self.leaderboards[guild.id] = leaderboard
+            return leaderboard
+
+    def update_leaderboard(self, guild_id, user_data):
+        """Atualiza o ranking da guild se ele já estiver montado"""
+        leaderboard = self.leaderboards.get(guild_id)
+        if leaderboard is not None:
+            leaderboard.update(int(user_data['user_id']), user_data['xp'], user_data['level'])
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member):
+        """Tira do ranking quem saiu do servidor"""
+        leaderboard = self.leaderboards.get(member.guild.id)
+        if leaderboard is not None:
+            leaderboard.remove(member.id)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member):
+        """Devolve ao ranking quem voltou ao servidor com XP salvo"""
+        if member.bot or member.guild.id not in self.leaderboards:
+            return
+        try:
+            user_key = f"{member.guild.id}_{member.id}"
+            user_data = self.xp_cache.get(user_key) or await self.xp_collection.find_one({'user_key': user_key})
+            if user_data and user_data.get('xp', 0) > 0:
+                self.update_leaderboard(member.guild.id, user_data)
+        except Exception as e:
+            print(f"❌ Erro ao atualizar ranking para {member.id}: {e}")
+
     def calculate_level(self, xp, xp_per_level):
         """Calcula o nível baseado no XP"""
         return int(math.sqrt(xp / xp_per_level)) + 1
@@ -201,8 +429,16 @@ class XPSystem(commands.Cog):
         if is_vip:
             base_xp = int(base_xp * config['vip_multiplier'])
         
-        # Atualizar dados do usuário
-        user_data = await self.get_user_data(user_id, guild_id)
+        # Atualizar dados do usuário (em memória; o flush grava no banco)
+        try:
+            user_data = await self.get_cached_user_data(user_id, guild_id)
+        except Exception as e:
+            print(f"⚠️ Falha ao carregar XP do usuário {user_id}: {e}")
+            return
+        
+        if user_data is None:
+            return
+        
         old_level = user_data['level']
         user_data['xp'] += base_xp
         user_data['messages'] += 1
@@ -210,15 +446,10 @@ class XPSystem(commands.Cog):
         
         new_level = self.calculate_level(user_data['xp'], config['xp_per_level'])
         user_data['level'] = new_level
+        self.queue_xp(user_data, base_xp)
+        self.update_leaderboard(guild_id, user_data)
         
-        # Salvar no banco
-        success = await self.save_user_data(user_id, guild_id, user_data)
-        
-        if not success:
-            print(f"⚠️ Falha ao salvar XP para usuário {user_id}")
-            return
-        
-        # Verificar level up
+        # Verificar level up (a partir dos totais em cache)
         if new_level > old_level:
             embed = discord.Embed(
                 title="🎉 Level Up!",
@@ -281,22 +512,10 @@ class XPSystem(commands.Cog):
     async def leaderboard_xp(self, ctx, page: int = 1):
         """Mostra ranking de XP"""
         try:
-            # Buscar todos os usuários do guild ordenados por XP
-            guild_users_cursor = self.xp_collection.find(
-                {'guild_id': str(ctx.guild.id)}
-            ).sort('xp', -1)
-            
-            guild_users_data = await guild_users_cursor.to_list(length=None)
+            # Ranking em memória (montado do banco apenas na primeira vez)
+            leaderboard = await self.get_leaderboard(ctx.guild)
             
-            # Filtrar apenas membros que ainda estão no servidor
-            guild_users = []
-            for data in guild_users_data:
-                user_id = int(data['user_id'])
-                user = ctx.guild.get_member(user_id)
-                if user:
-                    guild_users.append((user, data))
-            
-            if not guild_users:
+            if not len(leaderboard):
                 embed = discord.Embed(
                     title="📊 Top XP",
                     description="Nenhum usuário com XP encontrado!",
@@ -306,7 +525,7 @@ class XPSystem(commands.Cog):
                 return
             
             per_page = 10
-            max_pages = math.ceil(len(guild_users) / per_page)
+            max_pages = math.ceil(len(leaderboard) / per_page)
             if page > max_pages or page < 1:
                 page = 1
             
@@ -320,8 +539,10 @@ class XPSystem(commands.Cog):
             )
             
             leaderboard_text = ""
-            for i, (user, data) in enumerate(guild_users[start:end], start + 1):
-                is_vip = await self.is_user_vip(user.id, ctx.guild.id)
+            for i, (user_id, xp, level) in enumerate(leaderboard.page(start, end), start + 1):
+                user = ctx.guild.get_member(user_id)
+                mention = user.mention if user else f"<@{user_id}>"
+                is_vip = await self.is_user_vip(user_id, ctx.guild.id)
                 vip_icon = "👑" if is_vip else ""
                 
                 medal = ""
@@ -332,11 +553,11 @@ class XPSystem(commands.Cog):
                 elif i == 3:
                     medal = "🥉"
                 
-                leaderboard_text += f"{medal} **#{i}** {vip_icon} {user.mention}\n"
-                leaderboard_text += f"Level **{data['level']}** • **{data['xp']:,}** XP\n\n"
+                leaderboard_text += f"{medal} **#{i}** {vip_icon} {mention}\n"
+                leaderboard_text += f"Level **{level}** • **{xp:,}** XP\n\n"
             
             embed.description = leaderboard_text
-            embed.set_footer(text=f"👑 = VIP | Página {page}/{max_pages} | Total: {len(guild_users)} usuários")
+            embed.set_footer(text=f"👑 = VIP | Página {page}/{max_pages} | Total: {len(leaderboard)} usuários")
             
             await ctx.send(embed=embed)
             
@@ -349,6 +570,53 @@ class XPSystem(commands.Cog):
             )
             await ctx.send(embed=embed)
 
+    @commands.command(name='rankxp', aliases=['meurank'])
+    async def rank_xp(self, ctx, member: discord.Member = None):
+        """Mostra a posição do usuário no ranking de XP"""
+        if not member:
+            member = ctx.author
+        
+        try:
+            leaderboard = await self.get_leaderboard(ctx.guild)
+            position = leaderboard.rank(member.id)
+            
+            if position is None:
+                embed = discord.Embed(
+                    title="📊 Ranking XP",
+                    description=f"{member.mention} ainda não tem XP neste servidor!",
+                    color=discord.Color.red()
+                )
+                await ctx.send(embed=embed)
+                return
+            
+            xp, level = leaderboard.users[member.id]
+            
+            embed = discord.Embed(
+                title=f"🏆 Ranking de {member.display_name}",
+                color=discord.Color.gold()
+            )
+            embed.add_field(name="Posição", value=f"**#{position:,}** de {len(leaderboard):,}", inline=True)
+            embed.add_field(name="Level", value=f"**{level}**", inline=True)
+            embed.add_field(name="XP Total", value=f"**{xp:,}**", inline=True)
+            
+            # Distância para o usuário logo acima
+            if position > 1:
+                _, above_xp, _ = leaderboard.page(position - 2, position - 1)[0]
+                embed.add_field(name="Para subir", value=f"**{above_xp - xp + 1:,}** XP", inline=True)
+            
+            embed.set_footer(text=f"Página no !topxp: {math.ceil(position / 10)}")
+            embed.set_thumbnail(url=member.display_avatar.url)
+            await ctx.send(embed=embed)
+            
+        except Exception as e:
+            print(f"❌ Erro no comando rankxp: {e}")
+            embed = discord.Embed(
+                title="❌ Erro",
+                description="Erro ao buscar posição no ranking. Tente novamente.",
+                color=discord.Color.red()
+            )
+            await ctx.send(embed=embed)
+
     @commands.command(name='testdb3')
     @commands.has_permissions(administrator=True)
     async def test_database(self, ctx):
@@ -635,10 +903,9 @@ class XPSystem(commands.Cog):
             await ctx.send(embed=embed)
 
     async def cog_unload(self):
-        """Cleanup quando o cog é descarregado"""
-        if hasattr(self, 'mongo_client'):
-            self.mongo_client.close()
-            print("🔌 Conexão MongoDB fechada")
+        """Grava o XP pendente quando o cog é descarregado"""
+        self.flush_xp.cancel()
+        await self.flush_pending_xp()
 
 async def setup(bot):
     await bot.add_cog(XPSystem(bot))
\ No newline at end of file
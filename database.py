@@ -0,0 +1,336 @@
+import os
+import time
+import random
+from collections import OrderedDict
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+
+class CircuitBreaker:
+    """Máquina de estados da conexão (fechado -> aberto -> meio-aberto)
+
+    Aberto: o banco está fora e as chamadas falham na hora até retry_at.
+    Meio-aberto: um único ping de teste está em andamento.
+    O tempo de espera dobra a cada falha seguida, até max_delay.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, base_delay=1.0, max_delay=60.0):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.state = self.CLOSED
+        self.failures = 0
+        self.retry_at = 0.0
+        self.opened_at = None
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self.retry_at = 0.0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        delay = min(self.max_delay, self.base_delay * 2 ** (self.failures - 1))
+        # Jitter para os cogs não testarem todos no mesmo instante
+        self.retry_at = time.monotonic() + delay * random.uniform(0.8, 1.2)
+        if self.state == self.CLOSED:
+            self.opened_at = time.time()
+        self.state = self.OPEN
+
+    def should_probe(self):
+        """True se já passou o tempo de espera e nenhum teste está em andamento"""
+        return self.state == self.OPEN and time.monotonic() >= self.retry_at
+
+
+class _TopologyListener(monitoring.TopologyListener):
+    """Abre o circuito quando a topologia fica sem servidor que aceite escrita
+
+    Falhas de um secundário ou de um servidor isolado não importam enquanto
+    houver um primário. Os callbacks rodam na thread de monitoramento do
+    pymongo, então só fazem atribuições simples no breaker.
+    """
+
+    def __init__(self, breaker):
+        self.breaker = breaker
+
+    def opened(self, event):
+        pass
+
+    def description_changed(self, event):
+        had_writable = event.previous_description.has_writable_server()
+        has_writable = event.new_description.has_writable_server()
+        if had_writable and not has_writable:
+            if self.breaker.state == CircuitBreaker.CLOSED:
+                self.breaker.record_failure()
+        elif has_writable and self.breaker.state == CircuitBreaker.OPEN:
+            # Primário de volta: antecipa o próximo ping de teste
+            self.breaker.retry_at = 0.0
+
+    def closed(self, event):
+        pass
+
+
+class _PoolListener(monitoring.ConnectionPoolListener):
+    """Conta as conexões abertas e em uso do pool (roda nas threads do pymongo)"""
+
+    def __init__(self):
+        self.open = 0
+        self.checked_out = 0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.open += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.open = max(0, self.open - 1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        pass
+
+    def connection_checked_out(self, event):
+        self.checked_out += 1
+
+    def connection_checked_in(self, event):
+        self.checked_out = max(0, self.checked_out - 1)
+
+
+class ConfigCache:
+    """Cache read-through (TTL + LRU) de documentos de configuração por guild
+
+    As entradas são indexadas por (coleção, guild_id). Os valores são
+    compartilhados: quem altera uma configuração deve invalidar a entrada.
+    """
+
+    def __init__(self, ttl=300, max_size=5000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(collection, guild_id):
+        return (getattr(collection, 'full_name', collection), str(guild_id))
+
+    async def get_or_load(self, collection, guild_id, loader):
+        """Retorna a entrada em cache ou chama loader() e guarda o resultado
+
+        Se o loader levantar exceção nada é guardado.
+        """
+        key = self._key(collection, guild_id)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        value = await loader()
+        self.set(collection, guild_id, value)
+        return value
+
+    def peek(self, collection, guild_id, default=None):
+        """Retorna a entrada mesmo expirada, sem ir ao banco (usado com o banco fora)"""
+        entry = self._entries.get(self._key(collection, guild_id))
+        return entry[1] if entry is not None else default
+
+    def set(self, collection, guild_id, value):
+        key = self._key(collection, guild_id)
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, collection, guild_id=None):
+        """Remove a entrada da guild (ou todas da coleção se guild_id for None)"""
+        if guild_id is not None:
+            self._entries.pop(self._key(collection, guild_id), None)
+            return
+        name = getattr(collection, 'full_name', collection)
+        for key in [k for k in self._entries if k[0] == name]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+
+class MongoRegistry:
+    """Cliente MongoDB único e compartilhado por todos os cogs"""
+
+    def __init__(self, uri=None, max_pool_size=50, min_pool_size=0,
+                 server_selection_timeout_ms=5000, connect_timeout_ms=10000,
+                 config_cache_ttl=300, config_cache_size=5000,
+                 retry_base_delay=1.0, retry_max_delay=60.0, **client_options):
+        self.uri = uri
+        self.breaker = CircuitBreaker(retry_base_delay, retry_max_delay)
+        self.pool = _PoolListener()
+        self.options = {
+            'maxPoolSize': max_pool_size,
+            'minPoolSize': min_pool_size,
+            'serverSelectionTimeoutMS': server_selection_timeout_ms,
+            'connectTimeoutMS': connect_timeout_ms,
+            'event_listeners': [_TopologyListener(self.breaker), self.pool],
+            **client_options
+        }
+        self._client = None
+        self._databases = {}
+        self.config_cache = ConfigCache(config_cache_ttl, config_cache_size)
+        self.last_ping_ms = None
+        self.last_error = None
+        self.last_check = None
+
+    @classmethod
+    def from_env(cls):
+        """Cria o registro a partir das variáveis de ambiente"""
+        uri = (os.getenv("MONGO_URI") or os.getenv("MONGODB_URI")
+               or os.getenv("MONGO_URL") or os.getenv("MONGODB_URL"))
+        return cls(
+            uri,
+            max_pool_size=int(os.getenv("MONGO_MAX_POOL_SIZE", 50)),
+            min_pool_size=int(os.getenv("MONGO_MIN_POOL_SIZE", 0)),
+            server_selection_timeout_ms=int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000)),
+            connect_timeout_ms=int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 10000)),
+            config_cache_ttl=int(os.getenv("CONFIG_CACHE_TTL", 300)),
+            config_cache_size=int(os.getenv("CONFIG_CACHE_SIZE", 5000)),
+            retry_base_delay=float(os.getenv("MONGO_RETRY_BASE_DELAY", 1.0)),
+            retry_max_delay=float(os.getenv("MONGO_RETRY_MAX_DELAY", 60.0))
+        )
+
+    @property
+    def is_configured(self):
+        return bool(self.uri)
+
+    @property
+    def client(self):
+        """Cliente Motor (criado sob demanda, uma única vez)"""
+        if self._client is None:
+            # Sem URI o Motor usa o servidor local (mesmo comportamento de antes)
+            self._client = AsyncIOMotorClient(self.uri or 'mongodb://localhost:27017/', **self.options)
+        return self._client
+
+    def get_database(self, name):
+        """Retorna o handle do banco pelo nome (cacheado)"""
+        if name not in self._databases:
+            self._databases[name] = self.client[name]
+        return self._databases[name]
+
+    def get_collection(self, database, name):
+        """Retorna uma coleção de um banco registrado"""
+        return self.get_database(database)[name]
+
+    async def ping(self):
+        """Faz ping no servidor e registra latência/erro"""
+        start = time.perf_counter()
+        self.last_check = time.time()
+        try:
+            await self.client.admin.command('ping')
+        except Exception as e:
+            self.record_failure(e)
+            self.last_ping_ms = None
+            raise
+        self.last_ping_ms = (time.perf_counter() - start) * 1000
+        self.last_error = None
+        self.breaker.record_success()
+        return self.last_ping_ms
+
+    def record_failure(self, error=None):
+        """Registra uma falha de operação e abre o circuito"""
+        if error is not None:
+            self.last_error = str(error)
+        self.breaker.record_failure()
+
+    async def available(self):
+        """True se o banco pode ser usado agora (falha rápido com o circuito aberto)"""
+        if not self.is_configured:
+            return False
+        if self.breaker.state == CircuitBreaker.CLOSED:
+            return True
+        if not self.breaker.should_probe():
+            return False
+        
+        # Meio-aberto: só quem chegou primeiro faz o ping de teste
+        self.breaker.state = CircuitBreaker.HALF_OPEN
+        try:
+            await self.ping()
+        except Exception:
+            print(f"⚠️ MongoDB ainda indisponível (tentativa {self.breaker.failures})")
+            return False
+        finally:
+            # Teste interrompido (ex.: cancelado) conta como falha
+            if self.breaker.state == CircuitBreaker.HALF_OPEN:
+                self.breaker.record_failure()
+        print("✅ MongoDB disponível novamente")
+        return True
+
+    async def health(self):
+        """Estado atual da conexão"""
+        ok = False
+        if self.is_configured:
+            try:
+                await self.ping()
+                ok = True
+            except Exception:
+                pass
+        return {
+            'configured': self.is_configured,
+            'ok': ok,
+            'ping_ms': self.last_ping_ms,
+            'error': self.last_error,
+            'databases': sorted(self._databases),
+            'max_pool_size': self.options['maxPoolSize'],
+            'min_pool_size': self.options['minPoolSize'],
+            'server_selection_timeout_ms': self.options['serverSelectionTimeoutMS'],
+            'open_connections': self.pool.open,
+            'checked_out_connections': self.pool.checked_out,
+            'circuit': self.breaker.state,
+            'failures': self.breaker.failures,
+            'retry_in': max(0.0, self.breaker.retry_at - time.monotonic()) if self.breaker.state != CircuitBreaker.CLOSED else 0.0,
+            'config_cache': self.config_cache.stats()
+        }
+
+    def close(self):
+        """Fecha o cliente compartilhado"""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+            self._databases.clear()
+            self.config_cache.clear()
+            print("🔌 Conexão MongoDB compartilhada fechada")
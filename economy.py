@@ -0,0 +1,459 @@
+import asyncio
+import time
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import ConnectionFailure, DuplicateKeyError, OperationFailure
+
+
+def account_of(key):
+    """(livro, usuário) de uma chave: 'global' para Economia, guild_id para EconomySystem"""
+    return str(key.get('guild_id', 'global')), str(key['user_id'])
+
+
+class EconomyLedger:
+    """Livro-razão append-only de todas as movimentações de dinheiro
+
+    As entradas ficam num buffer e são gravadas com insert_many a cada
+    segundo (ou a cada FLUSH_BATCH). Os snapshots de saldo são atualizados
+    de forma incremental somando só as entradas depois da marca d'água.
+    """
+
+    FLUSH_INTERVAL = 1.0
+    FLUSH_BATCH = 500
+    MAX_PENDING = 50000
+    SNAPSHOT_INTERVAL = 60
+    # Código do MongoDB para chave duplicada (_id já gravado)
+    DUPLICATE_KEY = 11000
+
+    def __init__(self, mongo, database='discord_bot'):
+        self.mongo = mongo
+        self.database = database
+        self.pending = []
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._indexes_ready = False
+        self._last_snapshot = 0.0
+        self.dropped = 0
+
+    @property
+    def entries(self):
+        return self.mongo.get_collection(self.database, 'economy_ledger')
+
+    @property
+    def snapshots(self):
+        return self.mongo.get_collection(self.database, 'economy_snapshots')
+
+    @property
+    def meta(self):
+        return self.mongo.get_collection(self.database, 'economy_ledger_meta')
+
+    async def ensure_indexes(self):
+        if self._indexes_ready:
+            return
+        await self.entries.create_index([("ledger", ASCENDING), ("user_id", ASCENDING), ("_id", ASCENDING)])
+        await self.entries.create_index([("kind", ASCENDING), ("timestamp", ASCENDING)])
+        await self.entries.create_index("ref", sparse=True)
+        await self.snapshots.create_index([("ledger", ASCENDING), ("user_id", ASCENDING)], unique=True)
+        self._indexes_ready = True
+
+    def record(self, key, deltas, kind, ref=None):
+        """Adiciona uma movimentação ao buffer (deltas: campo -> valor)"""
+        deltas = {field: amount for field, amount in deltas.items() if amount}
+        if not deltas:
+            return
+        ledger, user_id = account_of(key)
+        # _id gerado aqui: a ordem dos ObjectIds é a ordem das operações
+        self.pending.append({
+            '_id': ObjectId(),
+            'ledger': ledger,
+            'user_id': user_id,
+            'deltas': deltas,
+            'kind': kind,
+            'ref': ref,
+            'timestamp': datetime.utcnow()
+        })
+        
+        # Banco fora por muito tempo: descarta as mais antigas
+        overflow = len(self.pending) - self.MAX_PENDING
+        if overflow > 0:
+            del self.pending[:overflow]
+            self.dropped += overflow
+            print(f"⚠️ Buffer do livro-razão cheio: {overflow} entrada(s) descartada(s)")
+        
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.FLUSH_INTERVAL)
+            try:
+                await self.flush()
+                if time.monotonic() - self._last_snapshot >= self.SNAPSHOT_INTERVAL:
+                    await self.refresh_snapshots()
+            except Exception as e:
+                print(f"❌ Erro no livro-razão da economia: {e}")
+
+    async def flush(self):
+        """Grava o buffer com insert_many (em lotes de FLUSH_BATCH)"""
+        async with self._lock:
+            written = 0
+            while self.pending:
+                if not await self.mongo.available():
+                    return written
+                await self.ensure_indexes()
+                batch, self.pending = self.pending[:self.FLUSH_BATCH], self.pending[self.FLUSH_BATCH:]
+                try:
+                    await self.entries.insert_many(batch, ordered=False)
+                except asyncio.CancelledError:
+                    self.pending[:0] = batch
+                    raise
+                except Exception as e:
+                    if isinstance(e, ConnectionFailure):
+                        self.mongo.record_failure(e)
+                        # Não dá para saber o que chegou ao servidor: reenvia tudo
+                        failed = batch
+                    else:
+                        failed = self._not_written(e, batch)
+                    self.pending[:0] = failed
+                    if failed:
+                        print(f"❌ Erro ao gravar livro-razão ({len(failed)} de {len(batch)} entradas): {e}")
+                        return written
+                    # Só _id repetido: a tentativa anterior já tinha gravado o lote
+                written += len(batch)
+            return written
+
+    @classmethod
+    def _not_written(cls, error, batch):
+        """Entradas que falharam por outro motivo que não _id já gravado
+
+        Com ordered=False o servidor tenta todas; as com E11000 vieram de um
+        reenvio depois de erro de rede e já estão no livro-razão.
+        """
+        details = getattr(error, 'details', None) or {}
+        errors = details.get('writeErrors')
+        if errors is None:
+            return batch
+        failed = {item['index'] for item in errors if item.get('code') != cls.DUPLICATE_KEY}
+        return [entry for index, entry in enumerate(batch) if index in failed]
+
+    async def refresh_snapshots(self):
+        """Soma nos snapshots as entradas gravadas desde a última atualização"""
+        async with self._lock:
+            if not await self.mongo.available():
+                return 0
+            self._last_snapshot = time.monotonic()
+            
+            meta = await self.meta.find_one({'_id': 'snapshot_watermark'}) or {}
+            watermark = meta.get('last_id')
+            # Entradas reenfileiradas têm _id antigo: a marca não pode passar delas
+            # antes de serem gravadas, senão nunca entrariam nos snapshots
+            query = {}
+            if self.pending:
+                query['_id'] = {'$lt': min(entry['_id'] for entry in self.pending)}
+            newest = await self.entries.find_one(query, {'_id': 1}, sort=[('_id', -1)])
+            if newest is None or newest['_id'] == watermark:
+                return 0
+            
+            match = {'_id': {'$lte': newest['_id']}}
+            if watermark is not None:
+                match['_id']['$gt'] = watermark
+            pipeline = [
+                {'$match': match},
+                {'$project': {'ledger': 1, 'user_id': 1, 'delta': {'$objectToArray': '$deltas'}}},
+                {'$unwind': '$delta'},
+                {'$group': {
+                    '_id': {'ledger': '$ledger', 'user_id': '$user_id', 'field': '$delta.k'},
+                    'total': {'$sum': '$delta.v'}
+                }}
+            ]
+            changes = {}
+            async for row in self.entries.aggregate(pipeline, allowDiskUse=True):
+                account = (row['_id']['ledger'], row['_id']['user_id'])
+                changes.setdefault(account, {})[f"balances.{row['_id']['field']}"] = row['total']
+            
+            now = datetime.utcnow()
+            operations = [
+                UpdateOne(
+                    {'ledger': ledger, 'user_id': user_id},
+                    {'$inc': inc, '$set': {'updated_at': now}},
+                    upsert=True
+                )
+                for (ledger, user_id), inc in changes.items()
+            ]
+            if operations:
+                await self.snapshots.bulk_write(operations, ordered=False)
+            # A marca só avança depois dos snapshots gravados
+            await self.meta.update_one(
+                {'_id': 'snapshot_watermark'},
+                {'$set': {'last_id': newest['_id'], 'updated_at': now}},
+                upsert=True
+            )
+            return len(operations)
+
+    async def open_accounts(self, collection, fields):
+        """Registra uma vez os saldos existentes antes do livro-razão como abertura"""
+        marker = f"opened:{collection.full_name}"
+        if await self.meta.find_one({'_id': marker}):
+            return 0
+        
+        opened = 0
+        projection = {field: 1 for field in ('user_id', 'guild_id', *fields)}
+        async for doc in collection.find({}, projection):
+            if 'user_id' not in doc:
+                continue
+            self.record(doc, {field: doc.get(field, 0) for field in fields}, 'abertura')
+            opened += 1
+        await self.flush()
+        await self.meta.insert_one({'_id': marker, 'accounts': opened, 'timestamp': datetime.utcnow()})
+        print(f"📒 Livro-razão: saldos de abertura de {opened} conta(s) em {collection.name}")
+        return opened
+
+    async def history(self, key, limit=10):
+        """Últimas movimentações de uma conta (mais recentes primeiro)"""
+        ledger, user_id = account_of(key)
+        # Entradas ainda no buffer também aparecem
+        await self.flush()
+        cursor = self.entries.find({'ledger': ledger, 'user_id': user_id}).sort('_id', -1).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def close(self):
+        """Para o flush periódico e grava o que restou no buffer"""
+        if self._task:
+            self._task.cancel()
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"❌ Erro ao gravar livro-razão no encerramento: {e}")
+
+
+class RichestPages:
+    """Paginação por cursor do ranking de net_worth
+
+    Cada página começa depois da última linha da anterior (net_worth, user_id),
+    sem skip. As fronteiras de página ficam em memória por alguns segundos
+    para que !ricos 2, 3... não refaçam o caminho desde o topo.
+    """
+
+    PAGE_SIZE = 10
+    TTL = 60
+
+    def __init__(self):
+        self._bounds = {}
+
+    @staticmethod
+    def _after(cursor):
+        net_worth, user_id = cursor
+        return {'$or': [
+            {'net_worth': {'$lt': net_worth}},
+            {'net_worth': net_worth, 'user_id': {'$gt': user_id}}
+        ]}
+
+    async def _fetch(self, collection, query, after, limit):
+        query = dict(query, net_worth={'$gt': 0})
+        if after is not None:
+            query = {'$and': [query, self._after(after)]}
+        cursor = collection.find(query, {'_id': 0, 'user_id': 1, 'net_worth': 1})
+        cursor = cursor.sort([('net_worth', -1), ('user_id', 1)]).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def page(self, scope, collection, query, number):
+        """Linhas da página number (1-based) ou [] se ela não existe"""
+        created, bounds = self._bounds.get(scope, (0.0, []))
+        if time.monotonic() - created > self.TTL:
+            created, bounds = time.monotonic(), []
+            self._bounds[scope] = (created, bounds)
+        
+        # Avança das fronteiras conhecidas até o início da página pedida numa só consulta
+        missing = number - 1 - len(bounds)
+        if missing > 0:
+            rows = await self._fetch(collection, query, bounds[-1] if bounds else None, missing * self.PAGE_SIZE)
+            for end in range(self.PAGE_SIZE - 1, len(rows), self.PAGE_SIZE):
+                bounds.append((rows[end]['net_worth'], rows[end]['user_id']))
+            if len(bounds) < number - 1:
+                return []
+        
+        rows = await self._fetch(collection, query, bounds[number - 2] if number > 1 else None, self.PAGE_SIZE)
+        if len(rows) == self.PAGE_SIZE and len(bounds) == number - 1:
+            bounds.append((rows[-1]['net_worth'], rows[-1]['user_id']))
+        return rows
+
+
+class EconomyStore:
+    """Operações atômicas de saldo/inventário sobre uma coleção da economia
+
+    Cada mutação é um único find_one_and_update com $inc e uma guarda de
+    saldo na própria query ({campo: {$gte: valor}}), então dois comandos
+    concorrentes nunca sobrescrevem o resultado um do outro. O campo
+    net_worth (soma de money_fields) é mantido no mesmo update.
+    """
+
+    # Código do MongoDB para "transações só em replica set/mongos"
+    ILLEGAL_OPERATION = 20
+
+    def __init__(self, client, collection, defaults=None, ledger=None, money_fields=('balance', 'bank')):
+        self.client = client
+        self.collection = collection
+        self.defaults = defaults or {}
+        # Livro-razão opcional: cada movimentação de money_fields vira uma entrada
+        self.ledger = ledger
+        self.money_fields = money_fields
+        # Descoberto na primeira transferência (servidor standalone não tem transações)
+        self.supports_transactions = None
+
+    def _insert_defaults(self, key, paths):
+        """Campos padrão de um documento novo que não conflitam com o update"""
+        return {
+            field: value for field, value in self.defaults.items()
+            if field not in key and not any(path == field or path.startswith(field + '.') for path in paths)
+        }
+
+    def _net_worth_expression(self):
+        return {'$add': [{'$ifNull': ['$' + field, 0]} for field in self.money_fields]}
+
+    async def backfill_net_worth(self):
+        """Calcula net_worth dos documentos criados antes do campo existir"""
+        result = await self.collection.update_many(
+            {'net_worth': {'$exists': False}},
+            [{'$set': {'net_worth': self._net_worth_expression()}}]
+        )
+        return result.modified_count
+
+    def _record(self, key, inc, kind, ref=None):
+        if self.ledger is not None:
+            money = {field: amount for field, amount in inc.items() if field in self.money_fields}
+            self.ledger.record(key, money, kind, ref)
+
+    async def apply(self, key, inc, require=None, set_fields=None, kind='ajuste', match=None):
+        """Aplica $inc (e $set) se os mínimos de require forem atendidos
+
+        Retorna o documento depois da alteração, ou None se a guarda falhou
+        (saldo/quantidade insuficiente, condição de match ou usuário
+        inexistente). Sem guarda o documento é criado se não existir. kind
+        identifica a operação no livro-razão.
+        """
+        doc = await self._apply(key, inc, require, set_fields, match=match)
+        if doc is not None:
+            self._record(key, inc, kind)
+        return doc
+
+    async def _apply(self, key, inc, require=None, set_fields=None, session=None, match=None):
+        query = dict(key)
+        for field, minimum in (require or {}).items():
+            query[field] = {'$gte': minimum}
+        if match:
+            query.update(match)
+
+        net_change = sum(amount for field, amount in inc.items() if field in self.money_fields)
+        if net_change:
+            inc = {**inc, 'net_worth': net_change}
+        update = {'$inc': inc}
+        if set_fields:
+            update['$set'] = set_fields
+
+        # Com guarda não há upsert: um documento que não casa não deve ser criado
+        upsert = not require and not match
+        if upsert:
+            on_insert = self._insert_defaults(key, list(inc) + list(set_fields or {}))
+            if on_insert:
+                update['$setOnInsert'] = on_insert
+
+        try:
+            return await self.collection.find_one_and_update(
+                query, update, upsert=upsert,
+                return_document=ReturnDocument.AFTER, session=session
+            )
+        except DuplicateKeyError:
+            # Dois upserts simultâneos do mesmo usuário: o perdedor repete como update
+            return await self.collection.find_one_and_update(
+                query, update, return_document=ReturnDocument.AFTER, session=session
+            )
+
+    async def debit_up_to(self, key, field, amount, set_fields=None, kind='multa', match=None):
+        """Tira até amount de field sem deixar negativo; retorna o valor realmente debitado
+
+        Com match o documento precisa casar a condição (sem upsert) e o
+        retorno é None quando não casa.
+        """
+        current = {'$ifNull': ['$' + field, 0]}
+        stage = {field: {'$max': [0, {'$subtract': [current, amount]}]}}
+        for name, value in (set_fields or {}).items():
+            stage[name] = {'$literal': value}
+        if not match:
+            # Pipeline não aceita $setOnInsert: os padrões só entram nos campos ausentes
+            for name, value in self._insert_defaults(key, list(stage) + ['net_worth']).items():
+                stage[name] = {'$ifNull': ['$' + name, {'$literal': value}]}
+
+        before = await self.collection.find_one_and_update(
+            {**key, **(match or {})}, [{'$set': stage}, {'$set': {'net_worth': self._net_worth_expression()}}],
+            upsert=not match, return_document=ReturnDocument.BEFORE
+        )
+        if before is None and match:
+            return None
+        debited = min(amount, (before or {}).get(field, 0))
+        self._record(key, {field: -debited}, kind)
+        return debited
+
+    async def move(self, key, from_field, to_field, amount, kind='movimentacao'):
+        """Move amount entre dois campos do mesmo documento (ex.: carteira -> banco)"""
+        return await self.apply(
+            key, {from_field: -amount, to_field: amount},
+            require={from_field: amount}, kind=kind
+        )
+
+    async def transfer(self, from_key, to_key, field, amount, fee=0, kind='transferencia'):
+        """Debita amount + fee de from_key e credita amount em to_key
+
+        Usa uma transação quando o servidor suporta; senão faz débito
+        guardado seguido do crédito, estornando o débito se o crédito falhar.
+        Retorna (remetente, destinatário) depois da operação ou None se o
+        saldo do remetente não cobre o total.
+        """
+        result = None
+        if self.supports_transactions is not False:
+            try:
+                result = await self._transfer_in_transaction(from_key, to_key, field, amount, fee)
+                self.supports_transactions = True
+            except OperationFailure as e:
+                if e.code != self.ILLEGAL_OPERATION:
+                    raise
+                self.supports_transactions = False
+        if self.supports_transactions is False:
+            result = await self._transfer_two_phase(from_key, to_key, field, amount, fee)
+        
+        if result is not None:
+            # As duas pontas compartilham a mesma referência no livro-razão
+            ref = str(ObjectId())
+            self._record(from_key, {field: -(amount + fee)}, kind, ref)
+            self._record(to_key, {field: amount}, kind, ref)
+        return result
+
+    async def _transfer_in_transaction(self, from_key, to_key, field, amount, fee):
+        async def body(session):
+            sender = await self._apply(from_key, {field: -(amount + fee)}, require={field: amount + fee}, session=session)
+            if sender is None:
+                return None
+            receiver = await self._apply(to_key, {field: amount}, session=session)
+            return sender, receiver
+
+        async with await self.client.start_session() as session:
+            # with_transaction repete sozinho em erros transitórios
+            return await session.with_transaction(body)
+
+    async def _transfer_two_phase(self, from_key, to_key, field, amount, fee):
+        sender = await self._apply(from_key, {field: -(amount + fee)}, require={field: amount + fee})
+        if sender is None:
+            return None
+        try:
+            receiver = await self._apply(to_key, {field: amount})
+        except BaseException:
+            # Estorna o débito: a transferência não aconteceu
+            await self._apply(from_key, {field: amount + fee})
+            raise
+        return sender, receiver
+
+    async def remove_empty(self, key, field):
+        """Remove um contador que chegou a zero (ex.: item do inventário)"""
+        query = dict(key)
+        query[field] = {'$lte': 0}
+        await self.collection.update_one(query, {'$unset': {field: ""}})
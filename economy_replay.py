@@ -0,0 +1,166 @@
+"""Reprocessa o livro-razão da economia (precisa de um MongoDB acessível)
+
+Soma todas as entradas de economy_ledger no próprio servidor, grava o
+resultado em economy_snapshots_replay e compara com os saldos atuais de
+users (Economia) e economy_data (EconomySystem), listando as contas que
+divergem. Com o bot rodando, movimentações ainda no buffer (até ~1s)
+podem aparecer como divergência; rode de novo para confirmar.
+
+Uso: MONGO_URI=mongodb://... python economy_replay.py [--ate ISO] [--snapshots] [--aplicar]
+
+  --ate ISO     reprocessa só as entradas até essa data (ex.: 2024-05-01T12:00)
+  --snapshots   substitui economy_snapshots pelo resultado e reinicia a marca d'água
+  --aplicar     grava nos saldos atuais os valores do livro-razão (com o bot parado)
+"""
+import argparse
+import asyncio
+import os
+from datetime import datetime
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+DATABASE = "discord_bot"
+REPLAY = "economy_snapshots_replay"
+# Contas comparadas por consulta aos saldos atuais
+COMPARE_BATCH = 1000
+# livro -> (coleção, campos de dinheiro)
+LIVE = {
+    "global": ("users", ("balance", "bank")),
+    "guild": ("economy_data", ("saldo",)),
+}
+
+
+def replay_pipeline(last_id):
+    """Agrupa as entradas até last_id por conta e campo e monta um documento por conta"""
+    return [
+        {"$match": {"_id": {"$lte": last_id}}},
+        {"$project": {"ledger": 1, "user_id": 1, "delta": {"$objectToArray": "$deltas"}}},
+        {"$unwind": "$delta"},
+        {"$group": {
+            "_id": {"ledger": "$ledger", "user_id": "$user_id", "field": "$delta.k"},
+            "total": {"$sum": "$delta.v"},
+        }},
+        {"$group": {
+            "_id": {"ledger": "$_id.ledger", "user_id": "$_id.user_id"},
+            "balances": {"$push": {"k": "$_id.field", "v": "$total"}},
+        }},
+        {"$project": {
+            "_id": 0,
+            "ledger": "$_id.ledger",
+            "user_id": "$_id.user_id",
+            "balances": {"$arrayToObject": "$balances"},
+            "updated_at": "$$NOW",
+        }},
+        {"$out": REPLAY},
+    ]
+
+
+async def compare(db, docs):
+    """Retorna [(livro, usuário, campo, atual, livro-razão)] das contas divergentes do lote
+
+    Os saldos atuais vêm de uma consulta $in por livro, não de uma por conta.
+    """
+    by_ledger = {}
+    for doc in docs:
+        by_ledger.setdefault(doc["ledger"], []).append(doc)
+    
+    mismatches = []
+    for ledger, group in by_ledger.items():
+        collection_name, fields = LIVE["global" if ledger == "global" else "guild"]
+        query = {"user_id": {"$in": [doc["user_id"] for doc in group]}}
+        if ledger != "global":
+            query["guild_id"] = ledger
+        projection = {"user_id": 1, **{field: 1 for field in fields}}
+        live = {row["user_id"]: row async for row in db[collection_name].find(query, projection)}
+        for doc in group:
+            current = live.get(doc["user_id"], {})
+            mismatches += [
+                (ledger, doc["user_id"], field, current.get(field, 0), doc["balances"].get(field, 0))
+                for field in fields
+                if current.get(field, 0) != doc["balances"].get(field, 0)
+            ]
+    return mismatches
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Reprocessa o livro-razão da economia")
+    parser.add_argument("--ate", type=datetime.fromisoformat, default=None)
+    parser.add_argument("--snapshots", action="store_true")
+    parser.add_argument("--aplicar", action="store_true")
+    args = parser.parse_args()
+
+    uri = os.getenv("MONGO_URI") or os.getenv("MONGODB_URI") or "mongodb://localhost:27017/"
+    client = AsyncIOMotorClient(uri)
+    db = client[DATABASE]
+
+    try:
+        if args.ate is not None and (args.snapshots or args.aplicar):
+            # Um corte no tempo não pode substituir os saldos de agora
+            print("❌ --snapshots e --aplicar não podem ser usados com --ate")
+            return
+
+        # O corte é fixado antes: entradas gravadas durante o replay ficam para o próximo refresh
+        if args.ate is not None:
+            last_id = ObjectId.from_datetime(args.ate)
+        else:
+            newest = await db["economy_ledger"].find_one({}, {"_id": 1}, sort=[("_id", -1)])
+            if newest is None:
+                print("📒 Livro-razão vazio, nada para reprocessar")
+                return
+            last_id = newest["_id"]
+
+        total = await db["economy_ledger"].count_documents({"_id": {"$lte": last_id}})
+        print(f"📒 Reprocessando {total:,} entradas do livro-razão...")
+        await db["economy_ledger"].aggregate(replay_pipeline(last_id), allowDiskUse=True).to_list(length=None)
+
+        mismatches = []
+        accounts = 0
+        batch = []
+        async for doc in db[REPLAY].find({}):
+            accounts += 1
+            batch.append(doc)
+            if len(batch) >= COMPARE_BATCH:
+                mismatches += await compare(db, batch)
+                batch = []
+        if batch:
+            mismatches += await compare(db, batch)
+
+        print(f"👥 {accounts:,} contas reprocessadas, {len(mismatches)} divergência(s)")
+        for ledger, user_id, field, current, expected in mismatches[:50]:
+            print(f"  ⚠️ {ledger}/{user_id} {field}: atual {current:,} | livro-razão {expected:,}")
+        if args.aplicar and mismatches:
+            operations = {}
+            for ledger, user_id, field, current, expected in mismatches:
+                query = {"user_id": user_id}
+                kind = "global"
+                if ledger != "global":
+                    query["guild_id"] = ledger
+                    kind = "guild"
+                name, fields = LIVE[kind]
+                # net_worth é recalculado junto para o ranking continuar certo
+                net_worth = {"$add": [{"$ifNull": ["$" + money, 0]} for money in fields]}
+                operations.setdefault(name, []).append(
+                    UpdateOne(query, [{"$set": {field: expected}}, {"$set": {"net_worth": net_worth}}])
+                )
+            for name, batch in operations.items():
+                await db[name].bulk_write(batch, ordered=False)
+            print(f"✅ {len(mismatches)} saldo(s) corrigido(s) a partir do livro-razão")
+
+        if args.snapshots:
+            await db[REPLAY].create_index([("ledger", 1), ("user_id", 1)], unique=True)
+            await db[REPLAY].rename("economy_snapshots", dropTarget=True)
+            await db["economy_ledger_meta"].update_one(
+                {"_id": "snapshot_watermark"},
+                {"$set": {"last_id": last_id, "updated_at": datetime.utcnow()}},
+                upsert=True,
+            )
+            print("✅ economy_snapshots reconstruída a partir do livro-razão")
+    finally:
+        await db[REPLAY].drop()
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+"""Teste de estresse das operações da economia (precisa de um MongoDB acessível)
+
+Dispara milhares de transferências, apostas e compras concorrentes sobre
+poucos usuários e confere que nenhum dinheiro sumiu ou apareceu, comparando
+com o padrão antigo de ler, calcular e gravar com $set.
+
+Uso: MONGO_URI=mongodb://... python economy_stress.py [usuarios] [operacoes] [concorrencia]
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from economy import EconomyStore
+
+INITIAL_BALANCE = 10_000
+ITEM_PRICE = 150
+
+
+async def reset(collection, users):
+    await collection.delete_many({})
+    await collection.create_index("user_id", unique=True)
+    await collection.insert_many([
+        {"user_id": str(i), "balance": INITIAL_BALANCE, "inventory": {}} for i in range(users)
+    ])
+
+
+async def totals(collection):
+    """Dinheiro total em circulação, itens comprados e saldos negativos"""
+    money = items = negatives = 0
+    async for doc in collection.find({}):
+        money += doc["balance"]
+        items += sum((doc.get("inventory") or {}).values())
+        negatives += doc["balance"] < 0
+    return money, items, negatives
+
+
+async def legacy_operation(collection, users, fees):
+    """Padrão antigo: lê os dois lados, calcula em Python e grava com $set"""
+    a, b = random.sample(range(users), 2)
+    amount = random.randint(1, 500)
+    sender = await collection.find_one({"user_id": str(a)})
+    receiver = await collection.find_one({"user_id": str(b)})
+    if sender["balance"] < amount:
+        return
+    await asyncio.sleep(0)  # o comando real faz outras awaits aqui (VIP, embeds...)
+    await collection.update_one({"user_id": str(a)}, {"$set": {"balance": sender["balance"] - amount}})
+    await collection.update_one({"user_id": str(b)}, {"$set": {"balance": receiver["balance"] + amount}})
+
+
+async def atomic_operation(store, users, fees):
+    key = lambda user: {"user_id": str(user)}
+    kind = random.random()
+    user = random.randrange(users)
+    if kind < 0.6:
+        other = random.choice([u for u in range(users) if u != user])
+        amount = random.randint(1, 500)
+        fee = max(1, int(amount * 0.02))
+        if await store.transfer(key(user), key(other), "balance", amount, fee=fee):
+            fees.append(fee)
+    elif kind < 0.8:
+        # Aposta: ganha ou perde o valor, só se o saldo cobre
+        amount = random.randint(1, 300)
+        won = random.random() < 0.5
+        result = await store.apply(key(user), {"balance": amount if won else -amount}, require={"balance": amount})
+        if result is not None:
+            fees.append(-amount if won else amount)
+    else:
+        # Compra: o preço some da economia e vira item
+        await store.apply(key(user), {"balance": -ITEM_PRICE, "inventory.item": 1}, require={"balance": ITEM_PRICE})
+
+
+async def run(label, operation, collection, users, operations, concurrency):
+    await reset(collection, users)
+    fees = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def worker():
+        async with semaphore:
+            await operation(fees)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(operations)))
+    elapsed = time.perf_counter() - start
+
+    money, items, negatives = await totals(collection)
+    # Dinheiro que saiu de circulação de forma legítima: taxas, apostas e compras
+    expected = users * INITIAL_BALANCE - sum(fees) - items * ITEM_PRICE
+    drift = money - expected
+    print(f"{label:>8}: {operations} ops em {elapsed:.2f}s ({operations / elapsed:,.0f} ops/s) | "
+          f"diferença no total: {drift:+,} | saldos negativos: {negatives}")
+    return drift, negatives
+
+
+async def main():
+    uri = os.getenv("MONGO_URI") or os.getenv("MONGODB_URI") or "mongodb://localhost:27017/"
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    operations = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    concurrency = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+
+    client = AsyncIOMotorClient(uri, maxPoolSize=concurrency)
+    collection = client["economy_stress"]["users"]
+    store = EconomyStore(client, collection, {"balance": 0, "inventory": {}})
+
+    try:
+        print(f"👥 {users} usuários, {operations} operações, {concurrency} concorrentes")
+        await run("legado", lambda fees: legacy_operation(collection, users, fees),
+                  collection, users, operations, concurrency)
+        drift, negatives = await run("atômico", lambda fees: atomic_operation(store, users, fees),
+                                     collection, users, operations, concurrency)
+        print(f"🔁 Transações: {'sim' if store.supports_transactions else 'não (débito + crédito com estorno)'}")
+        if drift or negatives:
+            print("❌ Operações atômicas perderam ou criaram dinheiro!")
+            sys.exit(1)
+        print("✅ Nenhuma atualização perdida nas operações atômicas")
+    finally:
+        await client.drop_database("economy_stress")
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
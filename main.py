@@ -4,14 +4,14 @@ from discord.ext import commands
 from flask import Flask
 import asyncio
 from dotenv import load_dotenv
-from motor.motor_asyncio import AsyncIOMotorClient  # MongoDB
+from database import MongoRegistry  # MongoDB compartilhado
+from economy import EconomyLedger  # Livro-razão das economias
 
 # Carregar variáveis do .env
 load_dotenv()
 
 TOKEN = os.getenv("TOKEN")
 AUTOPING = os.getenv("AUTOPING")
-MONGO_URL = os.getenv("MONGO_URL")  # URL de conexão MongoDB Atlas
 YT_API_KEY = os.getenv("YT_API_KEY")  # Chave da API do YouTube
 
 # Intents e prefixo
@@ -40,8 +40,10 @@ async def auto_ping():
 class CustomBot(commands.Bot):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.db_client = AsyncIOMotorClient(MONGO_URL, tls=True, tlsAllowInvalidCertificates=True)
-        self.db = self.db_client["natanbot"]  # Nome do banco de dados
+        # Um único pool de conexões para todos os cogs
+        self.mongo = MongoRegistry.from_env()
+        # Livro-razão único para Economia e EconomySystem
+        self.economy_ledger = EconomyLedger(self.mongo)
 
     async def setup_hook(self):
         for filename in os.listdir("./cogs"):
@@ -54,6 +56,11 @@ class CustomBot(commands.Bot):
 
         self.loop.create_task(auto_ping())
 
+    async def close(self):
+        await super().close()
+        await self.economy_ledger.close()
+        self.mongo.close()
+
 # Instância do bot
 bot = CustomBot(command_prefix="!", intents=intents)
 